@@ -0,0 +1,276 @@
+"""
+Micro-benchmarks for the parser, calculator and Excel builder.
+
+    python bench.py                          # sizes 10, 1000, 50000
+    python bench.py --sizes 10 1000 --json before.json
+    python bench.py --sizes 10 1000 --compare before.json
+
+Inputs come from synthetic.py (EXAMPLE_TEXT with varied values) and are
+seeded, so runs on different commits measure the same work. Each result
+is the best of --repeat runs; --compare flags anything slower than the
+saved run by more than --threshold.
+"""
+import argparse
+import datetime
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from parser import num_or_none, parse_message
+from excel_builder import (
+    _row_from_data,
+    build_excel_from_sheet_dict,
+    calculate_fields,
+    choose_sheet_name,
+    round2,
+    round_weight,
+)
+from csv_export import build_csv_file
+from pricing import PriceBook
+from synthetic import product_blocks
+
+
+DEFAULT_SIZES = (10, 1000, 50000)
+
+# name -> setup(inputs) returning the zero-argument callable to time
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+class Inputs:
+    """Lazily built, shared inputs for one size."""
+
+    def __init__(self, n: int, seed: int = 0):
+        self.n = n
+        self.seed = seed
+        self._cache = {}
+
+    def _get(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    @property
+    def blocks(self):
+        return self._get("blocks", lambda: product_blocks(self.n, self.seed))
+
+    @property
+    def parsed(self):
+        return self._get("parsed", lambda: [parse_message(b) for b in self.blocks])
+
+    @property
+    def calcs(self):
+        return self._get("calcs", lambda: [calculate_fields(p) for p in self.parsed])
+
+    @property
+    def sheet_rows(self):
+        def build():
+            sheet_rows = {}
+            for calc in self.calcs:
+                sheet_rows.setdefault(choose_sheet_name(calc), []).append(
+                    _row_from_data(calc)
+                )
+            return sheet_rows
+
+        return self._get("sheet_rows", build)
+
+    @property
+    def money_strings(self):
+        def build():
+            rng = random.Random(self.seed)
+            forms = ("{:.2f}$", "{:,.0f} KHR", " {:.1f} ", "{:.2f}", "$ {:.2f}")
+            return [
+                rng.choice(forms).format(rng.uniform(0, 50000)) for _ in range(self.n)
+            ]
+
+        return self._get("money", build)
+
+    @property
+    def floats(self):
+        def build():
+            rng = random.Random(self.seed)
+            return [rng.uniform(0, 1000) for _ in range(self.n)]
+
+        return self._get("floats", build)
+
+
+@benchmark("parse_message")
+def _(inputs):
+    blocks = inputs.blocks
+    return lambda: [parse_message(b) for b in blocks]
+
+
+@benchmark("num_or_none")
+def _(inputs):
+    values = inputs.money_strings
+    return lambda: [num_or_none(v) for v in values]
+
+
+@benchmark("round2")
+def _(inputs):
+    values = inputs.floats
+    return lambda: [round2(v) for v in values]
+
+
+@benchmark("round_weight")
+def _(inputs):
+    values = inputs.floats
+    return lambda: [round_weight(v) for v in values]
+
+
+@benchmark("choose_sheet_name")
+def _(inputs):
+    calcs = inputs.calcs
+    return lambda: [choose_sheet_name(c) for c in calcs]
+
+
+@benchmark("calculate_fields")
+def _(inputs):
+    parsed = inputs.parsed
+    return lambda: [calculate_fields(p) for p in parsed]
+
+
+@benchmark("_row_from_data")
+def _(inputs):
+    calcs = inputs.calcs
+    return lambda: [_row_from_data(c) for c in calcs]
+
+
+@benchmark("build_excel_from_sheet_dict")
+def _(inputs):
+    sheet_rows = inputs.sheet_rows
+    return lambda: build_excel_from_sheet_dict(sheet_rows, backend="openpyxl")
+
+
+@benchmark("build_excel_native")
+def _(inputs):
+    sheet_rows = inputs.sheet_rows
+    return lambda: build_excel_from_sheet_dict(sheet_rows, backend="native")
+
+
+@benchmark("build_csv")
+def _(inputs):
+    sheet_rows = inputs.sheet_rows
+    return lambda: build_csv_file(sheet_rows).close()
+
+
+@benchmark("build_csv_gz")
+def _(inputs):
+    sheet_rows = inputs.sheet_rows
+    return lambda: build_csv_file(sheet_rows, compress=True).close()
+
+
+@benchmark("reprice")
+def _(inputs):
+    book = PriceBook()
+    for seq, calc in enumerate(inputs.calcs):
+        book.add(seq, choose_sheet_name(calc), _row_from_data(calc))
+    return lambda: book.sheet_totals(book.reprice(4100.0, markup_delta=0.25))
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, names, repeat: int, seed: int) -> dict:
+    results = []
+    for n in sizes:
+        inputs = Inputs(n, seed)
+        for name in names:
+            fn = BENCHMARKS[name](inputs)
+            # large sizes are slow enough that one run is representative
+            runs = repeat if n < 10000 else 1
+            if runs > 1:
+                fn()  # warm-up: lazy imports, caches
+            best = float("inf")
+            for _ in range(runs):
+                t0 = time.perf_counter()
+                fn()
+                best = min(best, time.perf_counter() - t0)
+            results.append(
+                {
+                    "name": name,
+                    "n": n,
+                    "seconds": best,
+                    "us_per_item": best / n * 1e6,
+                }
+            )
+            print(
+                f"{name:<30} n={n:<7} {best * 1000:>11.2f} ms "
+                f"{best / n * 1e6:>10.2f} us/item"
+            )
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "seed": seed,
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> int:
+    """Print old/new ratios; return the number of regressions."""
+    old = {(r["name"], r["n"]): r["seconds"] for r in baseline["results"]}
+    regressions = 0
+    print(f"\nvs {baseline.get('commit') or 'baseline'} (threshold {threshold:.0%}):")
+    for r in current["results"]:
+        before = old.get((r["name"], r["n"]))
+        if not before:
+            continue
+        ratio = r["seconds"] / before
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{r['name']:<30} n={r['n']:<7} x{ratio:6.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Micro-benchmarks")
+    ap.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    ap.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="subset to run")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--compare", help="results file of an earlier run")
+    ap.add_argument("--threshold", type=float, default=0.10)
+    args = ap.parse_args(argv)
+
+    names = args.only or list(BENCHMARKS)
+    current = run(args.sizes, names, args.repeat, args.seed)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        return 1 if compare(current, baseline, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
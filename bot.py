@@ -2,29 +2,79 @@ import logging
 from collections import defaultdict
 
 
+import asyncio
+import bisect
+import datetime
+import functools
+import io
+import math
+import signal
+import sys
+
+
 from telegram import (
     Update,
-    InputFile,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
     ReplyKeyboardMarkup,
-    KeyboardButton,
 )
+from telegram.error import BadRequest
 from telegram.ext import (
     ApplicationBuilder,
     MessageHandler,
     CommandHandler,
+    CallbackQueryHandler,
     ContextTypes,
     filters,
 )
 
 
-from config import BOT_TOKEN, EXCHANGE_RATE_DEFAULT
-from parser import parse_message
+import metrics
+import profiling
+from config import (
+    ADMIN_IDS,
+    BOT_API_URL,
+    BOT_TOKEN,
+    EXCHANGE_RATE_DEFAULT,
+    EXPORT_CACHE_MAX_BYTES,
+    HOT_RELOAD,
+    MAX_CONCURRENT_UPDATES,
+    METRICS_LISTEN,
+    METRICS_PORT,
+    OUTBOUND_POOL_SIZE,
+    OUTBOUND_WRITE_TIMEOUT,
+    SHUTDOWN_DRAIN_SECONDS,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+)
+from parser import ParseError, parse_blocks, split_blocks
+from csv_export import FORMATS as CSV_FORMATS, build_csv_file
+from dedup_index import (
+    DEFAULT_MODE as DEFAULT_DUPLICATE_MODE,
+    MODES as DUPLICATE_MODES,
+    DuplicateIndex,
+)
 from excel_builder import (
     calculate_fields,
     choose_sheet_name,
     _row_from_data,
-    build_excel_from_sheet_dict,
+    build_excel_file,
 )
+from excel_importer import load_products_from_workbook
+from hot_reload import RESTART_EXIT_CODE, HotReloader
+from export_cache import ExportCache, sheet_rows_digest
+from mini_http import HttpServer, Response
+from outbound import OutboundLimiter
+import pricing
+from price_history import PriceHistory
+from rollups import SummaryRollups
+from search_index import ProductIndex, parse_query
+import ui
+from update_processor import PerChatUpdateProcessor
+from webhook_server import WebhookServer
 
 
 logging.basicConfig(level=logging.INFO)
@@ -35,49 +85,61 @@ logger = logging.getLogger(__name__)
 SHEET_ROWS: dict[str, list[dict]] = {}
 # flat list of all parsed products in input order
 ALL_PRODUCTS: list[dict] = []
+# per-sheet products kept sorted by Date (then input order), maintained on
+# add/delete; a product's Id in /list and /delete is its position here + 1
+SHEET_INDEX: dict[str, list[dict]] = {}
+
+
+# inverted index over brand/category/... and dates for /find
+SEARCH_INDEX = ProductIndex()
+# stored products by normalized identity, to catch re-sent products
+DUPLICATE_INDEX = DuplicateIndex()
+# rate-independent price columns of every stored product, for /whatif
+PRICE_BOOK = pricing.PriceBook()
+# per-sheet / per-brand totals for /summary
+SUMMARY = SummaryRollups()
+# Buy-in / Price Unit of every saved product by date, for /trend; not
+# cleared by /restart or deletes
+PRICE_HISTORY = PriceHistory()
+
+
+# products per /list page, keeps a page well under Telegram's 4096 chars
+LIST_PAGE_SIZE = 25
 
 
 # per-user settings (simple in‑memory example)
 USER_SETTINGS: dict[int, dict] = {}
 
 
-EXAMPLE_TEXT = (
-    "--- product 1 ---\n"
-    "Date: 24.11.2025\n"
-    "Address: ចំការគ\n"
-    "Category: Oil\n"
-    "Sub-Category: Soybean\n"
-    "Brand: Health Pro\n"
-    "Packaging: Bottle\n"
-    "Size: 1000ml\n"
-    "Packs: 12\n"
-    "Buy-in: 22.50$                 # ត្រូវតែបំពេញ\n"
-    "Scheme(base): 4\n"
-    "FOC: 0\n"
-    "Direct Disc.(%): 0.0%          # បំពេញក៏បាន អត់ក៏បាន\n"
-    "Mark - up: 0.50$               # ត្រូវតែបំពេញ\n"
-    "Price Unit: 9000               # ត្រូវតែបំពេញ\n"
-    "\n"
-    "--- product 2 ---\n"
-    "Date: 24.11.2025\n"
-    "Address: ចំការគ\n"
-    "Category: Milk\n"
-    "Sub-Category: Condensed\n"
-    "Brand: Phka Chhouk\n"
-    "Packaging: Can\n"
-    "Size: 390g\n"
-    "Packs: 48\n"
-    "Buy-in: 28.60$                 # ត្រូវតែបំពេញ\n"
-    "Scheme(base): 1\n"
-    "FOC: 0\n"
-    "Direct Disc.(%): 0.0%          # បំពេញក៏បាន អត់ក៏បាន\n"
-    "Mark - up: 1.00$               # ត្រូវតែបំពេញ\n"
-    "Price Unit: 3000               # ត្រូវតែបំពេញ\n"
+# every stored product gets an increasing "seq" number when it is added
+_NEXT_SEQ = 1
+# per-chat high-water mark: highest "seq" already sent in a workbook
+EXPORT_MARKS: dict[int, int] = {}
+
+
+# built workbooks by (rows hash, filename), shared by all chats
+EXPORT_CACHE = ExportCache(EXPORT_CACHE_MAX_BYTES)
+
+
+# globals hot_reload.py carries over into a reloaded bot module; the
+# export cache is left behind since it holds output of the old builder,
+# and the indexes derived from ALL_PRODUCTS are rebuilt with the reloaded
+# classes (rebuild_indexes)
+RELOAD_STATE = (
+    "SHEET_ROWS",
+    "ALL_PRODUCTS",
+    "SHEET_INDEX",
+    "PRICE_HISTORY",
+    "USER_SETTINGS",
+    "_NEXT_SEQ",
+    "EXPORT_MARKS",
 )
 
 
 
 
+
+
 def normalize_sheet(name: str) -> str:
     """Lowercase + strip for robust sheet comparison."""
     return (name or "").strip().lower()
@@ -85,88 +147,72 @@ def normalize_sheet(name: str) -> str:
 
 
 
-def main_menu_keyboard() -> ReplyKeyboardMarkup:
-    keyboard = [
-        [KeyboardButton("🆕 New calculation (/start)")],
-        [KeyboardButton("📄 Show products (/list)")],
-        [
-            KeyboardButton("ℹ️ Help (/help)"),
-            KeyboardButton("⚙️ Settings (/settings)"),
-        ],
-        [
-            KeyboardButton("📦 About (/about)"),
-            KeyboardButton("📊 Summary (/summary)"),
-        ],
-        [KeyboardButton("🔄 Restart Bot (/restart)")],
-    ]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+def main_menu_keyboard(lang: str = ui.DEFAULT_LANGUAGE) -> ReplyKeyboardMarkup:
+    """The shared, prebuilt main menu for `lang` (see ui.py)."""
+    return ui.keyboard(lang)
+
+
+
+
+def _lang(update: Update) -> str:
+    """Reply language of the user behind `update`, without creating settings."""
+    user = update.effective_user
+    settings = USER_SETTINGS.get(user.id) if user is not None else None
+    return settings["language"] if settings else ui.DEFAULT_LANGUAGE
+
+
+
+
+def _rate(update: Update) -> float:
+    """Exchange rate (/settings rate=) of the user behind `update`."""
+    user = update.effective_user
+    settings = USER_SETTINGS.get(user.id) if user is not None else None
+    return settings["default_exchange_rate"] if settings else EXCHANGE_RATE_DEFAULT
 
 
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    lang = _lang(update)
     await update.message.reply_text(
-        "Welcome to Price Calculator Bot.\n\n"
-        "Send one or many products.\n"
-        "Separate products with '--- product N ---' lines.\n\n"
-        "Example:\n\n" + EXAMPLE_TEXT + "\n\n"
-        "Use /help to see all features.",
-        reply_markup=main_menu_keyboard(),
+        ui.text("start", lang), reply_markup=main_menu_keyboard(lang)
     )
 
 
 
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    text = (
-        "📘 Help – Price Calculator Bot\n\n"
-        "Commands:\n"
-        "/start – Show example format and how to start.\n"
-        "/help – Show this help message.\n"
-        "/restart – Delete ALL products and start fresh.\n"
-        "/settings – Change language, rate, etc.\n"
-        "/about – Show bot information.\n"
-        "/list – Show all products with Ids.\n"
-        "/delete <Sheet> <Id> – Delete one row (Ex: /delete Milk 1).\n"
-        "/delete_sheet <Sheet> – Delete all in a sheet.\n"
-        "/summary – Show counts per sheet.\n\n"
-        "Input format (one product):\n"
-        "Date: 24.11.2025\n"
-        "Address: ចំការគ\n"
-        "Category: Detergent\n"
-        "Sub-Category: Powder\n"
-        "Brand: Viso\n"
-        "Packaging: Pouch\n"
-        "Size: 3700 g\n"
-        "Packs: 4\n"
-        "Buy-in: 21.68$\n"
-        "Scheme(base): 1\n"
-        "FOC: 0\n"
-        "Direct Disc.(%): 12.00%\n"
-        "Mark - up: 1.00$\n"
-        "Price Unit: 22000\n\n"
+    lang = _lang(update)
+    await update.message.reply_text(
+        ui.text("help", lang), reply_markup=main_menu_keyboard(lang)
     )
-    await update.message.reply_text(text, reply_markup=main_menu_keyboard())
 
 
 
 
-async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Very simple /settings: show and allow basic changes with arguments."""
-    user_id = update.effective_user.id
-    settings = USER_SETTINGS.setdefault(
+def _get_settings(user_id: int) -> dict:
+    return USER_SETTINGS.setdefault(
         user_id,
         {
-            "language": "km",
+            "language": ui.DEFAULT_LANGUAGE,
             "default_exchange_rate": EXCHANGE_RATE_DEFAULT,
             "default_outlet_type": "WS",
             "rounding_mode": "custom",  # your 3rd-decimal rule
+            "export_mode": "full",  # "delta" = only rows since last export
+            "duplicates": DEFAULT_DUPLICATE_MODE,  # re-sent products: skip / replace / flag
         },
     )
 
 
+
+
+async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Very simple /settings: show and allow basic changes with arguments."""
+    settings = _get_settings(update.effective_user.id)
+
+
     # If user sends arguments, allow quick updates, e.g.
-    # /settings outlet=RT rate=4100 lang=en
+    # /settings outlet=RT rate=4100 lang=en export=delta dupes=replace
     for arg in context.args:
         if arg.startswith("outlet="):
             settings["default_outlet_type"] = arg.split("=", 1)[1].upper()
@@ -176,7 +222,17 @@ async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             except ValueError:
                 pass
         elif arg.startswith("lang="):
-            settings["language"] = arg.split("=", 1)[1].lower()
+            lang = arg.split("=", 1)[1].lower()
+            if lang in ui.LANGUAGES:
+                settings["language"] = lang
+        elif arg.startswith("export="):
+            mode = arg.split("=", 1)[1].lower()
+            if mode in {"full", "delta"}:
+                settings["export_mode"] = mode
+        elif arg.startswith("dupes="):
+            mode = arg.split("=", 1)[1].lower()
+            if mode in DUPLICATE_MODES:
+                settings["duplicates"] = mode
 
 
     await update.message.reply_text(
@@ -184,38 +240,177 @@ async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"Language: {settings['language']}\n"
         f"Default exchange rate: {settings['default_exchange_rate']}\n"
         f"Default outlet type: {settings['default_outlet_type']}\n"
-        f"Rounding mode: {settings['rounding_mode']}\n\n"
+        f"Rounding mode: {settings['rounding_mode']}\n"
+        f"Export mode: {settings['export_mode']}\n"
+        f"Duplicates: {settings.get('duplicates', DEFAULT_DUPLICATE_MODE)}\n\n"
         "Change values with, for example:\n"
-        "/settings outlet=RT rate=4100 lang=en",
-        reply_markup=main_menu_keyboard(),
+        "/settings outlet=RT rate=4100 lang=en export=delta dupes=replace",
+        reply_markup=main_menu_keyboard(_lang(update)),
     )
 
 
 
 
 async def about_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    lang = _lang(update)
     await update.message.reply_text(
-        "📦 Price Calculator Bot v2.0\n"
-        "For sales / pricing calculations of WS/RT items.\n"
-        "• Parses text to Excel rows\n"
-        "• Calculates Net Buy-in, Sell Out, margins with custom rounding\n"
-        "• Groups products by sheet (Oil, Detergent, Milk, etc.)\n\n"
-        "For support, contact: raphearom077@gmail.com or https://t.me/Phearom252005",
-        reply_markup=main_menu_keyboard(),
+        ui.text("about", lang), reply_markup=main_menu_keyboard(lang)
     )
 
 
 
 
-def _rebuild_sheet_rows() -> dict[str, list[dict]]:
-    """Rebuild SHEET_ROWS from ALL_PRODUCTS (used after delete)."""
-    sheet_rows: dict[str, list[dict]] = {}
+def _sheet_sort_key(parsed: dict):
+    date = parsed.get("date")
+    return (date is None, date or datetime.date.min, parsed.get("seq", 0))
+
+
+
+
+def _index_add(parsed: dict) -> None:
+    rows = SHEET_INDEX.setdefault(parsed["sheet"], [])
+    bisect.insort(rows, parsed, key=_sheet_sort_key)
+    SEARCH_INDEX.add(parsed)
+    DUPLICATE_INDEX.add(parsed)
+
+
+
+
+def _index_remove(parsed: dict) -> None:
+    SEARCH_INDEX.remove(parsed)
+    DUPLICATE_INDEX.remove(parsed)
+    PRICE_BOOK.remove(parsed["seq"])
+    SUMMARY.remove(parsed["seq"])
+    rows = SHEET_INDEX.get(parsed["sheet"])
+    if not rows:
+        return
+    pos = bisect.bisect_left(rows, _sheet_sort_key(parsed), key=_sheet_sort_key)
+    if pos < len(rows) and rows[pos] is parsed:
+        del rows[pos]
+    if not rows:
+        del SHEET_INDEX[parsed["sheet"]]
+
+
+
+
+def _sheet_id(parsed: dict) -> int:
+    """Id of a stored product inside its sheet (as shown by /list)."""
+    rows = SHEET_INDEX[parsed["sheet"]]
+    pos = bisect.bisect_left(rows, _sheet_sort_key(parsed), key=_sheet_sort_key)
+    return pos + 1
+
+
+
+
+def _find_sheet(name: str) -> str | None:
+    """Sheet name as stored in SHEET_INDEX for user input like 'powder detergent'."""
+    key = normalize_sheet(name)
+    for sheet in SHEET_INDEX:
+        if normalize_sheet(sheet) == key:
+            return sheet
+    return None
+
+
+
+
+def _add_products(records: list[dict], duplicates: str = DEFAULT_DUPLICATE_MODE) -> dict[str, int]:
+    """
+    Append parsed records to ALL_PRODUCTS, stamping each with its seq and
+    sheet, and add them to SHEET_INDEX.
+    A record whose identity is already stored (DUPLICATE_INDEX) is, by
+    `duplicates`: "skip"ped, stored in place of the old one ("replace"),
+    or stored anyway and counted ("flag"). Returns the counts; "saved"
+    includes the replaced and flagged ones.
+    """
+    global _NEXT_SEQ
+    # resolve sheets first so one bad block does not leave half a batch stored
+    calcs = [calculate_fields(parsed) for parsed in records]
+    sheets = [choose_sheet_name(calc) for calc in calcs]
+    counts = dict.fromkeys(("saved", "skipped", "replaced", "flagged"), 0)
+    replaced: list[dict] = []
+    for parsed, calc, sheet in zip(records, calcs, sheets):
+        stored = DUPLICATE_INDEX.find(parsed)
+        if stored and duplicates == "skip":
+            counts["skipped"] += 1
+            continue
+        if stored and duplicates == "replace":
+            for old in stored:
+                _index_remove(old)
+            replaced.extend(stored)
+            counts["replaced"] += 1
+        elif stored:
+            counts["flagged"] += 1
+        counts["saved"] += 1
+        parsed["seq"] = _NEXT_SEQ
+        parsed["sheet"] = sheet
+        _NEXT_SEQ += 1
+        ALL_PRODUCTS.append(parsed)
+        _index_add(parsed)
+        row = _row_from_data(calc)
+        PRICE_BOOK.add(parsed["seq"], sheet, row)
+        SUMMARY.add(parsed["seq"], sheet, row)
+        PRICE_HISTORY.add(parsed)
+    if replaced:
+        # one pass over the store for the whole batch
+        gone = {id(p) for p in replaced}
+        ALL_PRODUCTS[:] = [p for p in ALL_PRODUCTS if id(p) not in gone]
+    return counts
+
+
+
+
+def rebuild_indexes() -> None:
+    """
+    Re-stamp every product's sheet and fill SHEET_INDEX, SEARCH_INDEX,
+    DUPLICATE_INDEX, PRICE_BOOK and SUMMARY from ALL_PRODUCTS.
+    hot_reload.py calls this on a reloaded bot module, whose indexes are
+    new (empty) objects of the reloaded classes; the sheet is chosen again
+    because the reloaded choose_sheet_name may place products elsewhere,
+    as _rebuild_sheet_rows (the export) would. SHEET_ROWS is rebuilt too.
+    """
+    global SHEET_ROWS
+    SHEET_ROWS = _rebuild_sheet_rows()
+    SHEET_INDEX.clear()
     for parsed in ALL_PRODUCTS:
         calc = calculate_fields(parsed)
-        sheet_name = choose_sheet_name(calc)
-        sheet_rows.setdefault(sheet_name, [])
-        row_dict = _row_from_data(calc)
-        sheet_rows[sheet_name].append(row_dict)
+        parsed["sheet"] = sheet = choose_sheet_name(calc)
+        SHEET_INDEX.setdefault(sheet, []).append(parsed)
+        SEARCH_INDEX.add(parsed)
+        DUPLICATE_INDEX.add(parsed)
+        row = _row_from_data(calc)
+        PRICE_BOOK.add(parsed["seq"], sheet, row)
+        SUMMARY.add(parsed["seq"], sheet, row)
+    for rows in SHEET_INDEX.values():
+        rows.sort(key=_sheet_sort_key)
+
+
+
+
+def _remove_product(parsed: dict) -> None:
+    for idx, p in enumerate(ALL_PRODUCTS):
+        if p is parsed:
+            del ALL_PRODUCTS[idx]
+            break
+    _index_remove(parsed)
+
+
+
+
+def _rebuild_sheet_rows(products: list[dict] | None = None) -> dict[str, list[dict]]:
+    """
+    Rebuild SHEET_ROWS from ALL_PRODUCTS (used after delete).
+    Pass `products` to build the same layout for a subset (delta export).
+    """
+    if products is None:
+        products = ALL_PRODUCTS
+    sheet_rows: dict[str, list[dict]] = {}
+    with metrics.span("rebuild_sheet_rows"):
+        for parsed in products:
+            calc = calculate_fields(parsed)
+            sheet_name = choose_sheet_name(calc)
+            sheet_rows.setdefault(sheet_name, [])
+            row_dict = _row_from_data(calc)
+            sheet_rows[sheet_name].append(row_dict)
     return sheet_rows
 
 
@@ -257,40 +452,394 @@ def _build_index_by_sheet() -> dict[str, list[tuple[int, int]]]:
 
 
 
+# brands listed by /summary brand, most products first
+SUMMARY_MAX_BRANDS = 30
+
+
+
+
+def _summary_lines(rollup) -> list[str]:
+    lines = [f"• {rollup.name}: {rollup.products} product(s)"]
+    if rollup.margin_mean is not None:
+        lines.append(f"  Avg margin/unit: {rollup.margin_mean:,.0f} KHR")
+    lines.append(f"  Carton value: {rollup.carton_value:,.0f} KHR")
+    if rollup.buy_in_min is not None:
+        lines.append(f"  Buy-in: {rollup.buy_in_min:,.2f}$ – {rollup.buy_in_max:,.2f}$")
+    return lines
+
+
+
+
 async def summary_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show count of products per sheet."""
+    """
+    Products, average margin per unit, carton value and buy-in range per
+    sheet (/summary) or per brand (/summary brand), from SUMMARY.
+    """
     if not ALL_PRODUCTS:
         await update.message.reply_text(
             "No products saved yet.\nSend some products first.",
-            reply_markup=main_menu_keyboard(),
+            reply_markup=main_menu_keyboard(_lang(update)),
         )
         return
 
 
+    # menu buttons come without args
+    by_brand = [a.lower() for a in context.args or []] == ["brand"]
+    if by_brand:
+        rollups = sorted(SUMMARY.brands.values(), key=lambda r: -r.products)
+        title = "📊 Summary – per brand:"
+    else:
+        rollups = list(SUMMARY.sheets.values())
+        title = "📊 Summary – products per sheet:"
+
+
+    lines = [title, ""]
+    for rollup in rollups[:SUMMARY_MAX_BRANDS] if by_brand else rollups:
+        lines += _summary_lines(rollup)
+    if by_brand and len(rollups) > SUMMARY_MAX_BRANDS:
+        lines.append(f"… and {len(rollups) - SUMMARY_MAX_BRANDS} more brand(s).")
+    lines += [
+        "",
+        f"Total: {len(SUMMARY)} product(s).",
+        "Margins use the Exchange Rate saved with each product.",
+    ]
+    # the rollups are kept at the saved rates, not at anyone's /settings rate
+    rate = _rate(update)
+    if rate != EXCHANGE_RATE_DEFAULT:
+        lines.append(
+            f"Your /settings rate ({rate:g}) is not applied here; "
+            f"/whatif rate={rate:g} shows the margins at it."
+        )
+    else:
+        lines.append("See /whatif for another rate.")
+    if not by_brand:
+        lines.append("Use /summary brand for the totals per brand.")
+
+
+
+    await update.message.reply_text(
+        "\n".join(lines),
+        reply_markup=main_menu_keyboard(_lang(update)),
+    )
+
 
-    counts: dict[str, int] = {}
-    for parsed in ALL_PRODUCTS:
-        calc = calculate_fields(parsed)
-        sheet = choose_sheet_name(calc)
-        counts[sheet] = counts.get(sheet, 0) + 1
+
+
+WHATIF_USAGE = (
+    "Usage: /whatif rate=4100 markup=+0.25\n"
+    "markup=+x / -x moves every Mark-up, markup=x replaces it.\n"
+    "Shows the margins, nothing is changed."
+)
 
 
 
-    total = sum(counts.values())
-    lines = [f"• {sheet}: {count} product(s)" for sheet, count in counts.items()]
 
+def _parse_whatif(args: list[str]) -> tuple[float | None, float, float | None] | None:
+    """(rate, markup_delta, markup) from /whatif arguments, None if invalid."""
+    rate, delta, markup = None, 0.0, None
+    for arg in args:
+        name, _, value = arg.partition("=")
+        try:
+            if name == "rate":
+                rate = float(value)
+            elif name == "markup" and value[:1] in ("+", "-"):
+                delta = float(value)
+            elif name == "markup":
+                markup = float(value)
+            else:
+                return None
+        except ValueError:
+            return None
+    if rate is None and markup is None and not delta:
+        return None
+    return rate, delta, markup
 
 
+
+
+async def whatif_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /whatif rate=4100 markup=+0.25: margins per sheet now and with another
+    exchange rate and/or mark-up. A preview only, nothing stored changes.
+    """
+    parsed_args = _parse_whatif(context.args)
+    if parsed_args is None:
+        await update.message.reply_text(
+            WHATIF_USAGE, reply_markup=main_menu_keyboard(_lang(update))
+        )
+        return
+    if not len(PRICE_BOOK):
+        await update.message.reply_text(
+            "No products saved yet.\nSend some products first.",
+            reply_markup=main_menu_keyboard(_lang(update)),
+        )
+        return
+
+
+    current_rate = _rate(update)
+    rate, delta, markup = parsed_args
+    if rate is None:
+        rate = current_rate
+    with metrics.span("reprice"):
+        now = PRICE_BOOK.sheet_totals(PRICE_BOOK.reprice(current_rate))
+        then = PRICE_BOOK.sheet_totals(PRICE_BOOK.reprice(rate, delta, markup))
+
+
+    change = [f"rate {current_rate:g} → {rate:g}"]
+    if markup is not None:
+        change.append(f"mark-up = {markup:g}")
+    elif delta:
+        change.append(f"mark-up {delta:+g}")
+    lines = [f"🔮 What-if: {', '.join(change)}", ""]
+    for sheet, before in now.items():
+        after = then[sheet]
+        lines += [
+            f"• {sheet}: {before['products']} product(s)",
+            f"  Margin/Unit avg: {before['margin_unit_mean']:,.0f} → "
+            f"{after['margin_unit_mean']:,.0f} KHR",
+            f"  Margin/Ctn total: {before['margin_ctn_total']:,.0f} → "
+            f"{after['margin_ctn_total']:,.0f} KHR",
+            f"  Negative margins: {before['negative']} → {after['negative']}",
+        ]
+    lines += ["", "Nothing was changed."]
     await update.message.reply_text(
-        "📊 Summary – products per sheet:\n\n"
-        + "\n".join(lines)
-        + f"\n\nTotal: {total} product(s).",
-        reply_markup=main_menu_keyboard(),
+        "\n".join(lines), reply_markup=main_menu_keyboard(_lang(update))
     )
 
 
 
 
+# /trend: series shown, and the latest points shown per series
+TREND_MAX_SERIES = 10
+TREND_MAX_POINTS = 15
+
+
+
+
+def _trend_value(value: float, fmt: str) -> str:
+    return "?" if math.isnan(value) else fmt.format(value)
+
+
+
+
+async def trend_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /trend <brand> [date>=01.10.2025] [date<=31.10.2025]
+    Buy-in and Price Unit per date for every (category, size, address) of
+    the brand, from PRICE_HISTORY.
+    """
+    args = list(context.args or [])
+    date_args = [a for a in args if a.lower().startswith("date")]
+    brand = " ".join(a for a in args if not a.lower().startswith("date"))
+    if not brand:
+        await update.message.reply_text(
+            "Usage: /trend <brand> [date>=01.10.2025] [date<=31.10.2025]",
+            reply_markup=main_menu_keyboard(_lang(update)),
+        )
+        return
+
+
+    start = end = None
+    try:
+        for _field, op, value in parse_query(" ".join(date_args)) if date_args else ():
+            if op in (">=", "=", ">"):
+                start = value + datetime.timedelta(days=1) if op == ">" else value
+            if op in ("<=", "=", "<"):
+                end = value - datetime.timedelta(days=1) if op == "<" else value
+    except ValueError as e:
+        await update.message.reply_text(
+            f"Error: {e}", reply_markup=main_menu_keyboard(_lang(update))
+        )
+        return
+
+
+    series = PRICE_HISTORY.trend(brand, start, end)
+    if not series:
+        await update.message.reply_text(
+            f"No price history for {brand}.",
+            reply_markup=main_menu_keyboard(_lang(update)),
+        )
+        return
+
+
+    lines = [f"📈 Price history – {_clip(series[0][0][0])}", ""]
+    for (_brand, category, size, address), points in series[:TREND_MAX_SERIES]:
+        lines.append(f"• {_clip(category)} {_clip(size)} – {_clip(address)}")
+        if len(points) > TREND_MAX_POINTS:
+            lines.append(f"  … {len(points) - TREND_MAX_POINTS} earlier date(s)")
+        for date, buy_in, price_unit in points[-TREND_MAX_POINTS:]:
+            lines.append(
+                f"  {date:%d.%m.%Y}  Buy-in {_trend_value(buy_in, '{:,.2f}$')}"
+                f"  Price Unit {_trend_value(price_unit, '{:,.0f}')}"
+            )
+    if len(series) > TREND_MAX_SERIES:
+        lines.append(f"\n… and {len(series) - TREND_MAX_SERIES} more series.")
+    await update.message.reply_text(
+        "\n".join(lines), reply_markup=main_menu_keyboard(_lang(update))
+    )
+
+
+
+
+async def _reply_workbook(
+    update: Update, caption: str, full: bool = False
+) -> None:
+    """
+    Send the workbook for this chat and move its high-water mark.
+    In "delta" export mode only products newer than the mark are sent,
+    using the same sheet layout as the full workbook.
+    """
+    chat_id = update.effective_chat.id
+    mode = _get_settings(update.effective_user.id)["export_mode"]
+    last_seq = EXPORT_MARKS.get(chat_id, 0)
+
+
+    if mode == "delta" and not full:
+        new_products = [p for p in ALL_PRODUCTS if p.get("seq", 0) > last_seq]
+        sheet_rows = _rebuild_sheet_rows(new_products)
+        filename = "calculation_delta.xlsx"
+        caption += (
+            f"\nThis file has only the {len(new_products)} new product(s); "
+            f"use /export for the full Excel."
+        )
+    else:
+        sheet_rows = SHEET_ROWS
+        filename = "calculation_result.xlsx"
+
+
+    # other chats may add products while this one is uploading
+    mark = _NEXT_SEQ - 1
+    await _send_sheet_rows(update, sheet_rows, filename, caption)
+    EXPORT_MARKS[chat_id] = mark
+
+
+
+
+async def _send_sheet_rows(
+    update: Update,
+    sheet_rows: dict,
+    filename: str,
+    caption: str,
+    build=build_excel_file,
+    span: str = "build_excel",
+) -> None:
+    """
+    Build (or fetch from EXPORT_CACHE) the workbook for sheet_rows and send it.
+    Identical rows -> identical workbook: skip the build, and when the
+    bytes were uploaded before, resend Telegram's file_id instead.
+    `build(sheet_rows)` makes the file (build_csv_file for CSV exports).
+    Rows are exported at the user's /settings rate.
+    """
+    sheet_rows = pricing.with_rate(sheet_rows, _rate(update))
+    key = (sheet_rows_digest(sheet_rows), filename)
+    entry = EXPORT_CACHE.get(key)
+    message = None
+    if entry is not None and entry.file_id:
+        try:
+            with metrics.span("upload"):
+                message = await update.message.reply_document(
+                    document=entry.file_id,
+                    caption=caption,
+                    reply_markup=main_menu_keyboard(_lang(update)),
+                )
+            metrics.incr("file_id_reuses")
+        except BadRequest:
+            logger.warning("Cached file_id rejected, uploading again")
+            entry.file_id = None
+
+
+    if message is None:
+        if entry is None:
+            # CPU-bound: run off the event loop so other chats keep going
+            with metrics.span(span):
+                excel_file = await profiling.to_thread(build, sheet_rows)
+            entry = EXPORT_CACHE.put(key, excel_file)
+        else:
+            metrics.incr("export_cache_hits")
+        with metrics.span("upload"):
+            message = await update.message.reply_document(
+                document=entry.input_file(filename),
+                caption=caption,
+                reply_markup=main_menu_keyboard(_lang(update)),
+            )
+        metrics.incr("upload_bytes", entry.size)
+        if message is not None and message.document is not None:
+            entry.file_id = message.document.file_id
+
+
+
+
+async def export_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /export – always send the full workbook, whatever the export mode.
+    /export csv|tsv [gz] – all products as plain values instead (csv_export.py).
+    """
+    if not ALL_PRODUCTS:
+        await update.message.reply_text(
+            "No products saved yet.\nSend some products first.",
+            reply_markup=main_menu_keyboard(_lang(update)),
+        )
+        return
+
+
+    args = [arg.lower() for arg in context.args or []]
+    fmt = next((arg for arg in args if arg in CSV_FORMATS), None)
+    compress = "gz" in args
+    if set(args) - set(CSV_FORMATS) - {"gz", "xlsx"} or (compress and fmt is None):
+        await update.message.reply_text(
+            "Usage: /export [csv|tsv] [gz]\n"
+            "Without arguments you get the full Excel.",
+            reply_markup=main_menu_keyboard(_lang(update)),
+        )
+        return
+
+
+    total_rows = sum(len(v) for v in SHEET_ROWS.values())
+    if fmt is not None:
+        await _send_sheet_rows(
+            update,
+            SHEET_ROWS,
+            f"calculation_result.{fmt}" + (".gz" if compress else ""),
+            f"All {total_rows} product(s) as {fmt.upper()}.",
+            build=functools.partial(build_csv_file, fmt=fmt, compress=compress),
+            span="build_csv",
+        )
+        return
+
+
+    await _reply_workbook(
+        update,
+        f"Full Excel with {total_rows} product(s).",
+        full=True,
+    )
+
+
+
+
+def _duplicate_mode(update: Update) -> str:
+    """What to do with re-sent products (/settings dupes=), default skip."""
+    return _get_settings(update.effective_user.id).get("duplicates", DEFAULT_DUPLICATE_MODE)
+
+
+
+
+def _duplicates_note(counts: dict[str, int]) -> str:
+    """Reply text for the duplicate counts of _add_products, "" if none."""
+    notes = []
+    if counts["skipped"]:
+        notes.append(f"Skipped {counts['skipped']} product(s) already saved")
+    if counts["replaced"]:
+        notes.append(f"replaced {counts['replaced']} product(s) already saved")
+    if counts["flagged"]:
+        notes.append(f"flagged {counts['flagged']} possible duplicate(s), saved anyway")
+    if not notes:
+        return ""
+    text = ", ".join(notes)
+    return text[0].upper() + text[1:] + ". "
+
+
+
+
 async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.message or not update.message.text:
         return
@@ -302,8 +851,15 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 
+    # menu buttons (any language) send their exact label
+    command = ui.BUTTON_COMMANDS.get(text.strip())
+    if command is not None:
+        await _BUTTON_HANDLERS[command](update, context)
+        return
+
+
     lower = text.lower().strip()
-    # Button shortcuts
+    # typed shortcuts
     if "new calculation" in lower:
         await start(update, context)
         return
@@ -311,9 +867,9 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await restart_command(update, context)
         return
     if lower in {"hi", "hello", "hey", "/hi", "/hello", "/hey"}:
+        lang = _lang(update)
         await update.message.reply_text(
-            "Hi! Send product data in the template format shown in /start.",
-            reply_markup=main_menu_keyboard(),
+            ui.text("greeting", lang), reply_markup=main_menu_keyboard(lang)
         )
         return
     if "show products" in lower:
@@ -334,99 +890,377 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 
-    parts = text.split("---")
-    blocks = [b for b in parts if "Date:" in b]
+    try:
+        global SHEET_ROWS, ALL_PRODUCTS
 
 
 
-    if not blocks:
-        return
+        blocks = split_blocks(text)
+        if not blocks:
+            return
+        with metrics.span("parse"):
+            parsed_blocks = parse_blocks(blocks)
+        counts = _add_products(parsed_blocks, _duplicate_mode(update))
+        metrics.set_gauge("products", len(ALL_PRODUCTS))
+        if not counts["saved"]:
+            await update.message.reply_text(
+                f"All {len(blocks)} product(s) are already saved; nothing changed.",
+                reply_markup=main_menu_keyboard(_lang(update)),
+            )
+            return
 
 
 
-    try:
-        global SHEET_ROWS, ALL_PRODUCTS
+        SHEET_ROWS = _rebuild_sheet_rows()
+        total_rows = sum(len(v) for v in SHEET_ROWS.values())
 
 
 
-        for block in blocks:
-            parsed = parse_message(block)
-            ALL_PRODUCTS.append(parsed)
+        await _reply_workbook(
+            update,
+            (
+                f"Saved {counts['saved']} new product(s). "
+                + _duplicates_note(counts)
+                + f"Excel now has {total_rows} product(s). "
+                f"Use /list to see Ids, /delete <Sheet> <Id> to delete one "
+                f"(example: /delete Milk 2), /delete_sheet <Sheet> to "
+                f"delete all in a sheet."
+            ),
+        )
+    except ParseError as e:
+        metrics.incr("parse_rejected")
+        await update.message.reply_text(f"Error: {e}")
+    except Exception as e:
+        logger.exception("Error processing message")
+        await update.message.reply_text(f"Error: {e}")
 
 
 
-        SHEET_ROWS = _rebuild_sheet_rows()
-        new_count = len(blocks)
 
+async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Import a previously exported calculation_result.xlsx and keep adding to it.
+    """
+    document = update.message.document if update.message else None
+    if not document:
+        return
 
 
-        excel_bytes = build_excel_from_sheet_dict(SHEET_ROWS)
-        total_rows = sum(len(v) for v in SHEET_ROWS.values())
+    try:
+        global SHEET_ROWS, ALL_PRODUCTS
 
 
+        tg_file = await document.get_file()
+        buf = io.BytesIO()
+        await tg_file.download_to_memory(buf)
+        buf.seek(0)
 
-        await update.message.reply_document(
-            document=InputFile(excel_bytes, filename="calculation_result.xlsx"),
-            caption=(
-                f"Saved {new_count} new product(s). "
-                f"Excel now has {total_rows} product(s). "
-                f"Use /list to see Ids, /delete <Sheet> <Id> to delete one "
-                f"(example: /delete Milk 2), /delete_sheet <Sheet> to "
-                f"delete all in a sheet."
+
+        with metrics.span("import_workbook"):
+            imported = load_products_from_workbook(buf)
+        if not imported:
+            await update.message.reply_text(
+                "No products found in this workbook.",
+                reply_markup=main_menu_keyboard(_lang(update)),
+            )
+            return
+
+
+        counts = _add_products(imported, _duplicate_mode(update))
+        if not counts["saved"]:
+            await update.message.reply_text(
+                f"All {len(imported)} product(s) in {document.file_name} are "
+                f"already saved; nothing changed.",
+                reply_markup=main_menu_keyboard(_lang(update)),
+            )
+            return
+        SHEET_ROWS = _rebuild_sheet_rows()
+        total_rows = sum(len(v) for v in SHEET_ROWS.values())
+
+
+        await _reply_workbook(
+            update,
+            (
+                f"Imported {counts['saved']} product(s) from {document.file_name}. "
+                + _duplicates_note(counts)
+                + f"Excel now has {total_rows} product(s). "
+                f"Send new products to keep adding."
             ),
-            reply_markup=main_menu_keyboard(),
         )
     except Exception as e:
-        logger.exception("Error processing message")
+        logger.exception("Error importing workbook")
         await update.message.reply_text(f"Error: {e}")
 
 
 
 
+def _clip(value, width: int = 32) -> str:
+    text = "?" if value is None else str(value)
+    return text if len(text) <= width else text[: width - 1] + "…"
+
+
+
+
+def _list_page(sheet: str | None, page: int) -> tuple[str, InlineKeyboardMarkup]:
+    """
+    Render one /list page from SHEET_INDEX. Sheets before the page are
+    skipped by length, so a page costs O(page size + number of sheets).
+    """
+    sheets = [sheet] if sheet else list(SHEET_INDEX)
+    total = sum(len(SHEET_INDEX[s]) for s in sheets)
+    pages = max(1, -(-total // LIST_PAGE_SIZE))
+    page = min(max(page, 0), pages - 1)
+    start = page * LIST_PAGE_SIZE
+    end = start + LIST_PAGE_SIZE
+
+
+    lines: list[str] = [
+        "Current products\n[Sheet]\n(Id – Date | Category | Brand):\n"
+    ]
+    offset = 0
+    for s in sheets:
+        rows = SHEET_INDEX[s]
+        if offset >= end:
+            break
+        if offset + len(rows) > start:
+            lines.append(f"[{s}]")
+            for i in range(max(start - offset, 0), min(end - offset, len(rows))):
+                parsed = rows[i]
+                lines.append(
+                    f"{i + 1}. {_clip(parsed.get('date'))} | "
+                    f"{_clip(parsed.get('category'))} | {_clip(parsed.get('brand'))}"
+                )
+            lines.append("")
+        offset += len(rows)
+    lines.append(f"Page {page + 1}/{pages} – {total} product(s)")
+
+
+    # callback data: "list:<page>:<sheet or empty for all>"
+    sheet_arg = sheet or ""
+    nav = []
+    if page > 0:
+        nav.append(
+            InlineKeyboardButton("◀ Prev", callback_data=f"list:{page - 1}:{sheet_arg}")
+        )
+    if page < pages - 1:
+        nav.append(
+            InlineKeyboardButton("Next ▶", callback_data=f"list:{page + 1}:{sheet_arg}")
+        )
+    keyboard = [nav] if nav else []
+    if sheet:
+        keyboard.append([InlineKeyboardButton("All sheets", callback_data="list:0:")])
+    else:
+        buttons = [
+            InlineKeyboardButton(s, callback_data=f"list:0:{s}") for s in SHEET_INDEX
+        ]
+        keyboard.extend(buttons[i : i + 3] for i in range(0, len(buttons), 3))
+    return "\n".join(lines), InlineKeyboardMarkup(keyboard)
+
+
+
+
 async def list_products(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /list [Sheet] [Page] – paginated product list, e.g. /list Milk 2
+    """
     if not ALL_PRODUCTS:
         await update.message.reply_text(
             "No products saved yet.",
-            reply_markup=main_menu_keyboard(),
+            reply_markup=main_menu_keyboard(_lang(update)),
         )
         return
 
 
 
-    grouped: dict[str, list[dict]] = {}
-    for parsed in ALL_PRODUCTS:
-        calc = calculate_fields(parsed)
-        sheet = choose_sheet_name(calc)
-        grouped.setdefault(sheet, []).append(parsed)
+    args = list(context.args or [])
+    page = 0
+    if args and args[-1].isdigit():
+        page = int(args.pop()) - 1
+    sheet = None
+    if args:
+        sheet_name_input = " ".join(args).strip()
+        sheet = _find_sheet(sheet_name_input)
+        if sheet is None:
+            await update.message.reply_text(
+                f"Sheet '{sheet_name_input}' not found.",
+                reply_markup=main_menu_keyboard(_lang(update)),
+            )
+            return
 
 
 
-    for sheet in grouped:
-        grouped[sheet].sort(key=lambda p: p.get("date") or "")
+    text, markup = _list_page(sheet, page)
+    await update.message.reply_text(text, reply_markup=markup)
 
 
 
-    lines: list[str] = [
-        "Current products\n[Sheet]\n(Id – Date | Category | Brand):\n"
+
+async def list_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Inline Prev/Next and sheet filter buttons of /list."""
+    query = update.callback_query
+    await query.answer()
+    _, page, sheet = query.data.split(":", 2)
+    sheet = sheet if sheet in SHEET_INDEX else None
+    text, markup = _list_page(sheet, int(page))
+    try:
+        await query.edit_message_text(text, reply_markup=markup)
+    except BadRequest:
+        # "message is not modified" when the page did not change
+        pass
+
+
+
+async def find_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /find brand=Viso date>=01.11.2025 sheet=Milk [export]
+    Answered from SEARCH_INDEX; add 'export' to get the matches as Excel.
+    """
+    args = list(context.args or [])
+    export = bool(args) and args[-1].lower() == "export"
+    if export:
+        args.pop()
+    if not args:
+        await update.message.reply_text(
+            "Usage: /find brand=Viso date>=01.11.2025 sheet=Milk [export]\n"
+            "Keys: brand, category, sub_category, address, packaging, sheet, date\n"
+            "Date also supports >=, <=, >, <.",
+            reply_markup=main_menu_keyboard(_lang(update)),
+        )
+        return
+
+
+    try:
+        terms = parse_query(" ".join(args))
+    except ValueError as e:
+        await update.message.reply_text(
+            f"Error: {e}", reply_markup=main_menu_keyboard(_lang(update))
+        )
+        return
+
+
+    matches = SEARCH_INDEX.search(terms)
+    if not matches:
+        await update.message.reply_text(
+            "No matching products.", reply_markup=main_menu_keyboard(_lang(update))
+        )
+        return
+
+
+    if export:
+        await _send_sheet_rows(
+            update,
+            _rebuild_sheet_rows(matches),
+            "calculation_filtered.xlsx",
+            f"{len(matches)} matching product(s).",
+        )
+        return
+
+
+    lines = [
+        f"Found {len(matches)} product(s)\n"
+        "([Sheet] Id – Date | Category | Brand):\n"
     ]
-    for sheet, rows in grouped.items():
-        lines.append(f"[{sheet}]")
-        for i, parsed in enumerate(rows, start=1):
-            date = parsed.get("date", "?")
-            cat = parsed.get("category", "?")
-            brand = parsed.get("brand", "?")
-            lines.append(f"{i}. {date} | {cat} | {brand}")
-        lines.append("")
+    for parsed in matches[:LIST_PAGE_SIZE]:
+        lines.append(
+            f"[{parsed['sheet']}] {_sheet_id(parsed)}. {_clip(parsed.get('date'))} | "
+            f"{_clip(parsed.get('category'))} | {_clip(parsed.get('brand'))}"
+        )
+    if len(matches) > LIST_PAGE_SIZE:
+        lines.append(
+            f"\n… and {len(matches) - LIST_PAGE_SIZE} more. "
+            f"Add 'export' to get all of them as Excel."
+        )
+    await update.message.reply_text(
+        "\n".join(lines), reply_markup=main_menu_keyboard(_lang(update))
+    )
+
 
 
 
+async def _require_admin(update: Update) -> bool:
+    if update.effective_user.id in ADMIN_IDS:
+        return True
     await update.message.reply_text(
-        "\n".join(lines),
-        reply_markup=main_menu_keyboard(),
+        "This command is for bot admins only.",
+        reply_markup=main_menu_keyboard(_lang(update)),
+    )
+    return False
+
+
+
+
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/stats – admin only: per-handler / per-stage timings and counters."""
+    if not await _require_admin(update):
+        return
+
+
+    metrics.set_gauge("products", len(ALL_PRODUCTS))
+    metrics.set_gauge("export_cache_bytes", EXPORT_CACHE.total_bytes)
+    await update.message.reply_text(
+        metrics.stats_text(), reply_markup=main_menu_keyboard(_lang(update))
     )
 
 
 
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /profile <N> – cProfile the next N updates
+    /profile <T>s – cProfile for T seconds
+    /profile stop – finish now
+    Admin only. The top functions per handler are sent back to this chat.
+    """
+    if not await _require_admin(update):
+        return
+
+
+    arg = (context.args or [""])[0].lower()
+    if arg == "stop":
+        if not profiling.active():
+            await update.message.reply_text("No profile is running.")
+        else:
+            await profiling.finish("stopped by admin")
+        return
+
+
+    updates = seconds = None
+    try:
+        if arg.endswith("s"):
+            seconds = float(arg[:-1])
+        else:
+            updates = int(arg)
+    except ValueError:
+        await update.message.reply_text(
+            "Usage: /profile <updates> | /profile <seconds>s | /profile stop\n"
+            "Example: /profile 20 or /profile 30s"
+        )
+        return
+    if (updates is not None and updates < 1) or (seconds is not None and seconds <= 0):
+        await update.message.reply_text("Give a positive number of updates or seconds.")
+        return
+
+
+    chat_id = update.effective_chat.id
+
+
+    async def notify(text: str) -> None:
+        await context.bot.send_message(chat_id=chat_id, text=text)
+
+
+    try:
+        session = profiling.start(updates=updates, seconds=seconds, notify=notify)
+    except RuntimeError as e:
+        await update.message.reply_text(str(e))
+        return
+    await update.message.reply_text(
+        f"🔬 Profiling the {session.describe()}. "
+        "The summary will be sent here when it is done."
+    )
+
+
+
+
 async def restart_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     NEW FEATURE: Clears all stored products and resets the Excel state.
@@ -435,10 +1269,15 @@ async def restart_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     count = len(ALL_PRODUCTS)
     ALL_PRODUCTS = []
     SHEET_ROWS = {}
+    SHEET_INDEX.clear()
+    SEARCH_INDEX.clear()
+    DUPLICATE_INDEX.clear()
+    PRICE_BOOK.clear()
+    SUMMARY.clear()
     
     await update.message.reply_text(
         f"🔄 Bot Restarted!\nAll {count} products have been cleared.\nYou can start a new calculation now.",
-        reply_markup=main_menu_keyboard()
+        reply_markup=main_menu_keyboard(_lang(update))
     )
 
 
@@ -452,7 +1291,7 @@ async def delete_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if len(context.args) < 2:
         await update.message.reply_text(
             "Usage: /delete <SheetName> <Id>\nExample: /delete Powder detergent 1",
-            reply_markup=main_menu_keyboard(),
+            reply_markup=main_menu_keyboard(_lang(update)),
         )
         return
 
@@ -466,63 +1305,44 @@ async def delete_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except ValueError:
         await update.message.reply_text(
             "Id must be a number at the end. Example: /delete Powder detergent 1",
-            reply_markup=main_menu_keyboard(),
+            reply_markup=main_menu_keyboard(_lang(update)),
         )
         return
 
 
-    sheet_key = normalize_sheet(sheet_name_input)
-
-
-    items = []
-    for idx, parsed in enumerate(ALL_PRODUCTS):
-        calc = calculate_fields(parsed)
-        sheet_name = choose_sheet_name(calc)
-        items.append((idx, sheet_name, calc))
-
-
-    by_sheet: defaultdict[str, list[tuple[int, dict]]] = defaultdict(list)
-    for global_idx, sheet_name, calc in items:
-        by_sheet[normalize_sheet(sheet_name)].append((global_idx, calc))
-
-
-    for s in by_sheet:
-        by_sheet[s].sort(key=lambda t: t[1].get("date") or "")
-
-
-    if sheet_key not in by_sheet:
+    sheet = _find_sheet(sheet_name_input)
+    if sheet is None:
         await update.message.reply_text(
             f"Sheet '{sheet_name_input}' not found. Check /list.",
-            reply_markup=main_menu_keyboard(),
+            reply_markup=main_menu_keyboard(_lang(update)),
         )
         return
 
 
-    rows = by_sheet[sheet_key]
+    rows = SHEET_INDEX[sheet]
     if sheet_row_id < 1 or sheet_row_id > len(rows):
         await update.message.reply_text(
             f"Id {sheet_row_id} not found in sheet '{sheet_name_input}'.",
-            reply_markup=main_menu_keyboard(),
+            reply_markup=main_menu_keyboard(_lang(update)),
         )
         return
 
 
-    global_idx, _ = rows[sheet_row_id - 1]
-    removed = ALL_PRODUCTS.pop(global_idx)
+    _remove_product(rows[sheet_row_id - 1])
 
 
     SHEET_ROWS = _rebuild_sheet_rows()
-    excel_bytes = build_excel_from_sheet_dict(SHEET_ROWS)
     total_rows = sum(len(v) for v in SHEET_ROWS.values())
 
 
-    await update.message.reply_document(
-        document=InputFile(excel_bytes, filename="calculation_result.xlsx"),
-        caption=(
+    # existing rows changed, a delta would not show it
+    await _reply_workbook(
+        update,
+        (
             f"Deleted from sheet '{sheet_name_input}' Id {sheet_row_id}.\n"
             f"Excel now has {total_rows} product(s)."
         ),
-        reply_markup=main_menu_keyboard(),
+        full=True,
     )
 
 
@@ -535,7 +1355,7 @@ async def delete_sheet_command(update: Update, context: ContextTypes.DEFAULT_TYP
     if not context.args:
         await update.message.reply_text(
             "Usage: /delete_sheet <SheetName>\nExample: /delete_sheet Powder detergent",
-            reply_markup=main_menu_keyboard(),
+            reply_markup=main_menu_keyboard(_lang(update)),
         )
         return
 
@@ -544,70 +1364,244 @@ async def delete_sheet_command(update: Update, context: ContextTypes.DEFAULT_TYP
 
 
     sheet_name_input = " ".join(context.args).strip()
-    sheet_key = normalize_sheet(sheet_name_input)
-
-
-    remaining = []
-    removed = []
-    for parsed in ALL_PRODUCTS:
-        calc = calculate_fields(parsed)
-        sheet_name = choose_sheet_name(calc)
-        if normalize_sheet(sheet_name) == sheet_key:
-            removed.append(parsed)
-        else:
-            remaining.append(parsed)
+    sheet = _find_sheet(sheet_name_input)
+    removed = SHEET_INDEX.pop(sheet, []) if sheet is not None else []
 
 
     if not removed:
         await update.message.reply_text(
             f"No products found in sheet '{sheet_name_input}'.",
-            reply_markup=main_menu_keyboard(),
+            reply_markup=main_menu_keyboard(_lang(update)),
         )
         return
 
 
-    ALL_PRODUCTS = remaining
+    for parsed in removed:
+        SEARCH_INDEX.remove(parsed)
+        DUPLICATE_INDEX.remove(parsed)
+        PRICE_BOOK.remove(parsed["seq"])
+        SUMMARY.remove(parsed["seq"])
+    ALL_PRODUCTS = [p for p in ALL_PRODUCTS if p["sheet"] != sheet]
     SHEET_ROWS = _rebuild_sheet_rows()
-    excel_bytes = build_excel_from_sheet_dict(SHEET_ROWS)
     total_rows = sum(len(v) for v in SHEET_ROWS.values())
 
 
-    await update.message.reply_document(
-        document=InputFile(excel_bytes, filename="calculation_result.xlsx"),
-        caption=(
+    await _reply_workbook(
+        update,
+        (
             f"Deleted {len(removed)} product(s) from sheet '{sheet_name_input}'.\n"
             f"Excel now has {total_rows} product(s)."
         ),
-        reply_markup=main_menu_keyboard(),
+        full=True,
     )
 
 
 
-def main():
-    if not BOT_TOKEN:
-        raise RuntimeError("BOT_TOKEN is not set")
+def _instrument(callback):
+    return metrics.timed(profiling.profiled(callback))
+
+
+
+
+async def _serve_metrics(request):
+    if request.path != "/metrics":
+        return Response(404, b"not found")
+    return Response(
+        200, metrics.prometheus_text().encode(), "text/plain; version=0.0.4"
+    )
+
+
+
+
+async def _start_metrics_server(app) -> None:
+    """/metrics on METRICS_LISTEN:METRICS_PORT; stopped by _post_shutdown."""
+    if METRICS_PORT:
+        server = HttpServer(_serve_metrics, METRICS_LISTEN, METRICS_PORT)
+        await server.start()
+        app.bot_data["metrics_server"] = server
+
+
+
+
+async def _post_init(app) -> None:
+    """run_polling start-up: SIGUSR1 profiling, hot reload and /metrics."""
+    profiling.install_signal_handler()
+    reloader = app.bot_data.get("hot_reloader")
+    if reloader is not None:
+        reloader.start(on_restart=app.stop_running)
+    await _start_metrics_server(app)
+
+
+
+
+async def _post_shutdown(app) -> None:
+    reloader = app.bot_data.get("hot_reloader")
+    if reloader is not None:
+        reloader.stop()
+    server = app.bot_data.pop("metrics_server", None)
+    if server is not None:
+        await server.stop(timeout=1)
 
 
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
 
 
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(CommandHandler("help", help_command))
-    app.add_handler(CommandHandler("restart", restart_command))
-    app.add_handler(CommandHandler("settings", settings_command))
-    app.add_handler(CommandHandler("about", about_command))
-    app.add_handler(CommandHandler("summary", summary_command))
+# ui.BUTTON_COMMANDS command -> handler, for menu button presses
+_BUTTON_HANDLERS = {
+    "start": start,
+    "list": list_products,
+    "help": help_command,
+    "settings": settings_command,
+    "about": about_command,
+    "summary": summary_command,
+    "restart": restart_command,
+}
 
 
-    app.add_handler(CommandHandler("list", list_products))
-    app.add_handler(CommandHandler("delete", delete_command))
-    app.add_handler(CommandHandler("delete_sheet", delete_sheet_command))
 
 
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text))
+def build_handlers() -> list:
+    """
+    Every handler of the bot, wrapped so its run time shows up in /stats
+    and it can be profiled with /profile. hot_reload.py calls this on the
+    reloaded module to swap the handlers of the running Application.
+    """
+    commands = {
+        "start": start,
+        "help": help_command,
+        "restart": restart_command,
+        "settings": settings_command,
+        "about": about_command,
+        "summary": summary_command,
+        "whatif": whatif_command,
+        "trend": trend_command,
+        "export": export_command,
+        "stats": stats_command,
+        "profile": profile_command,
+        "list": list_products,
+        "find": find_command,
+        "delete": delete_command,
+        "delete_sheet": delete_sheet_command,
+    }
+    handlers = [
+        CommandHandler(command, _instrument(callback))
+        for command, callback in commands.items()
+    ]
+    handlers.append(
+        CallbackQueryHandler(_instrument(list_page_callback), pattern=r"^list:")
+    )
+    handlers.append(
+        MessageHandler(filters.TEXT & ~filters.COMMAND, _instrument(handle_text))
+    )
+    handlers.append(
+        MessageHandler(
+            filters.Document.FileExtension("xlsx"), _instrument(handle_document)
+        )
+    )
+    return handlers
+
+
+
+
+def build_application(token: str = BOT_TOKEN, base_url: str | None = None):
+    """
+    Application with all handlers. Updates of different chats run
+    concurrently, updates of one chat in order (PerChatUpdateProcessor);
+    replies go out through the rate limiter in outbound.py.
+    `base_url` points the bot at another Bot API server (fake_telegram.py).
+    """
+    builder = (
+        ApplicationBuilder()
+        .token(token)
+        .concurrent_updates(PerChatUpdateProcessor(MAX_CONCURRENT_UPDATES))
+        # sends queue in OutboundLimiter, so the pool only needs to cover
+        # the requests actually on the wire
+        .rate_limiter(OutboundLimiter())
+        .connection_pool_size(OUTBOUND_POOL_SIZE)
+        .pool_timeout(OUTBOUND_WRITE_TIMEOUT)
+        .write_timeout(OUTBOUND_WRITE_TIMEOUT)
+    )
+    if base_url:
+        builder = builder.base_url(base_url)
+    builder = builder.post_init(_post_init).post_shutdown(_post_shutdown)
+    app = builder.build()
+    app.add_handlers(build_handlers())
+    return app
+
+
+
+async def run_webhook(
+    app,
+    url: str = WEBHOOK_URL,
+    listen: str = WEBHOOK_LISTEN,
+    port: int = WEBHOOK_PORT,
+    path: str = WEBHOOK_PATH,
+    secret_token: str | None = WEBHOOK_SECRET,
+    stop_event: asyncio.Event | None = None,
+) -> None:
+    """
+    Serve updates from a Telegram webhook until SIGINT/SIGTERM (or
+    stop_event). On shutdown the server stops accepting, then every update
+    already received is processed before the Application stops.
+    /metrics is served on METRICS_PORT, not on the webhook listener.
+    """
+    stop_event = stop_event or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # not main thread / not supported on this platform
+
+
+    profiling.install_signal_handler()
+    reloader = app.bot_data.get("hot_reloader")
+    server = WebhookServer(app, listen, port, path, secret_token)
+    try:
+        async with app:
+            await app.start()
+            await server.start()
+            await _start_metrics_server(app)
+            await app.bot.set_webhook(
+                url=url.rstrip("/") + "/" + path.strip("/"),
+                secret_token=secret_token,
+                allowed_updates=Update.ALL_TYPES,
+            )
+            if reloader is not None:
+                reloader.start(on_restart=stop_event.set)
+
+
+            await stop_event.wait()
+            if reloader is not None:
+                reloader.stop()
+            logger.info("Shutting down, draining pending updates")
+            await server.stop(SHUTDOWN_DRAIN_SECONDS)
+            try:
+                await asyncio.wait_for(app.stop(), SHUTDOWN_DRAIN_SECONDS)
+            except asyncio.TimeoutError:
+                logger.warning("Drain timed out, some updates were not finished")
+    finally:
+        # run_polling calls post_shutdown itself, `async with app` does not
+        if app.post_shutdown:
+            await app.post_shutdown(app)
+
+
+
+def main():
+    if not BOT_TOKEN:
+        raise RuntimeError("BOT_TOKEN is not set")
 
 
-    app.run_polling()
+    app = build_application(base_url=BOT_API_URL)
+    reloader = None
+    if HOT_RELOAD:
+        reloader = HotReloader(app, sys.modules[__name__])
+        app.bot_data["hot_reloader"] = reloader
+    if WEBHOOK_URL:
+        asyncio.run(run_webhook(app))
+    else:
+        app.run_polling()
+    if reloader is not None and reloader.restart_requested:
+        sys.exit(RESTART_EXIT_CODE)
 
 
 
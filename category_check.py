@@ -0,0 +1,84 @@
+"""
+Check of the fuzzy category fallback (category_resolver.py) through
+choose_sheet_name.
+
+    python category_check.py
+
+Typos and Khmer names have to land on their sheet; categories that only
+share a word (or a few letters) with a known one have to stay in "Data",
+as they did before the fallback existed. Exits 1 and lists the products
+that landed elsewhere.
+"""
+import sys
+import time
+
+from excel_builder import KHMER_CATEGORIES, choose_sheet_name
+
+
+# (category, sub-category) -> sheet
+EXPECTED = {
+    # typos
+    ("detergant", "powder"): "Powder Detergent",
+    ("detergent", "powdr"): "Powder Detergent",
+    ("cookin oil", ""): "Oil",
+    ("toilet clener", ""): "Toilet",
+    ("fabric softnr", ""): "Fabric Softener",
+    ("eco dishwsh", ""): "Eco Dishwash",
+    ("Dishwashng", ""): "Dishwash",
+    ("  Condensed   Mlik ", ""): "Data",  # "milk" is too short for a typo
+    ("condesned milk", ""): "Milk",
+    # Khmer names
+    ("ទឹកដោះគោ", ""): "Milk",
+    ("ប្រេងឆា", ""): "Oil",
+    ("ទឹកលាងចាន", ""): "Dishwash",
+    ("ទឹកលាងបង្គន់", ""): "Toilet",
+    # not categories we know
+    ("soil", ""): "Data",
+    ("silk", ""): "Data",
+    ("snacks", ""): "Data",
+    ("coffee", ""): "Data",
+    # one shared word is not enough
+    ("coconut milk", ""): "Data",
+    ("coconut water", ""): "Data",
+    ("toilet paper", ""): "Data",
+    ("toilet soap", ""): "Data",
+    ("milk tea", ""): "Data",
+    ("fabric", ""): "Data",
+}
+
+# a 5 MB category must still be quick (the resolver cuts its input; the
+# time is choose_sheet_name lowercasing the whole string)
+LONG_CATEGORY_SECONDS = 0.1
+
+
+def check() -> list[str]:
+    problems = []
+    cases = dict(EXPECTED)
+    for name, target in KHMER_CATEGORIES.items():
+        cases.setdefault((name, ""), choose_sheet_name({"category": target}))
+    for (category, sub_category), want in cases.items():
+        got = choose_sheet_name({"category": category, "sub_category": sub_category})
+        if got != want:
+            problems.append(f"{category!r} / {sub_category!r}: {got} != {want}")
+
+    start = time.perf_counter()
+    choose_sheet_name({"category": "detergant " * 500_000})
+    took = time.perf_counter() - start
+    if took > LONG_CATEGORY_SECONDS:
+        problems.append(f"a 5 MB category took {took * 1000:.1f} ms")
+    return problems
+
+
+def main():
+    problems = check()
+    for problem in problems:
+        print(problem)
+    if problems:
+        print(f"FAIL: {len(problems)} product(s) on the wrong sheet")
+        return 1
+    print(f"OK: {len(EXPECTED) + len(KHMER_CATEGORIES)} categories on their sheets")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Fuzzy category lookup for choose_sheet_name: "detergant" -> "detergent",
+"cookin oil" -> "cooking oil".
+
+The known aliases are indexed once by their character trigrams. A lookup
+scores only the aliases that share a trigram with the input (Dice
+coefficient over trigram sets) and, best first, takes the first one at
+or above MIN_SCORE whose words all match the input's, in order and one
+for one, within a few edits (max_edits). Dice alone rewards one shared
+word: "coconut milk" would be "coconut oil" and "fabric" "fabric
+softener". Anything weaker is unresolved and goes to "Data". Input is
+cut to MAX_INPUT_CHARS, so a lookup costs at most that many trigram
+probes whatever is sent, and results are memoized, so a repeated typo
+costs one dict lookup.
+"""
+import functools
+from collections import Counter
+
+
+MIN_SCORE = 0.6
+MAX_INPUT_CHARS = 64
+MEMO_SIZE = 4096
+
+
+def _norm(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+def trigrams(text: str) -> set[str]:
+    """Character trigrams of normalized text, padded so word edges count."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edits(word: str) -> int:
+    """Typos allowed in a word of an alias: none in short words ("oil" is not "soil")."""
+    if len(word) < 5:
+        return 0
+    return 1 if len(word) < 8 else 2
+
+
+def within_edits(a: str, b: str, limit: int) -> bool:
+    """Levenshtein distance of a and b is at most limit."""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            )
+        if min(current) > limit:
+            return False
+        previous = current
+    return previous[-1] <= limit
+
+
+def words_match(text: str, alias: str) -> bool:
+    """Every word of text is the alias's word at its place, give or take a typo."""
+    words, alias_words = text.split(), alias.split()
+    return len(words) == len(alias_words) and all(
+        within_edits(w, a, max_edits(a)) for w, a in zip(words, alias_words)
+    )
+
+
+class CategoryResolver:
+    def __init__(self, aliases: dict[str, str]):
+        """aliases: known spelling -> the category it stands for."""
+        self._aliases: list[str] = []
+        self._targets: list[str] = []
+        self._sizes: list[int] = []
+        self._index: dict[str, list[int]] = {}  # trigram -> alias ids
+        for alias, target in aliases.items():
+            alias = _norm(alias)
+            grams = trigrams(alias)
+            alias_id = len(self._targets)
+            self._aliases.append(alias)
+            self._targets.append(target)
+            self._sizes.append(len(grams))
+            for gram in grams:
+                self._index.setdefault(gram, []).append(alias_id)
+        self._memo = functools.lru_cache(maxsize=MEMO_SIZE)(self._resolve)
+
+    def resolve(self, text: str) -> str | None:
+        """The category `text` most likely means, or None."""
+        return self._memo(text[:MAX_INPUT_CHARS])
+
+    def _resolve(self, text: str) -> str | None:
+        text = _norm(text)
+        grams = trigrams(text)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._index.get(gram, ()))
+        scored = []
+        for alias_id, count in shared.items():
+            score = 2 * count / (len(grams) + self._sizes[alias_id])
+            if score >= MIN_SCORE:
+                scored.append((-score, alias_id))
+        for _score, alias_id in sorted(scored):
+            if words_match(text, self._aliases[alias_id]):
+                return self._targets[alias_id]
+        return None
@@ -6,3 +6,62 @@ import os
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")  # read from env
 EXCHANGE_RATE_DEFAULT = 4000
+
+# workbook writer: "openpyxl", or "native" to stream the XML straight into
+# the zip (xlsx_writer.py; faster, constant memory)
+XLSX_BACKEND = os.getenv("XLSX_BACKEND", "openpyxl")
+
+# byte budget of the in-memory cache of built workbooks (export_cache.py)
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+# built workbooks larger than this are kept in a temporary file, not in memory
+EXPORT_SPOOL_MAX_BYTES = int(os.getenv("EXPORT_SPOOL_MAX_BYTES", 4 * 1024 * 1024))
+
+# Webhook mode: set WEBHOOK_URL (public https base URL) to receive updates
+# by webhook instead of long polling
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8443))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+
+# updates processed at the same time (one at a time per chat)
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", 32))
+# how long shutdown waits for queued / running updates to finish
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", 30))
+
+# timing spans / counters for /stats and /metrics (metrics.py)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") not in {"0", "false", "no"}
+# serve Prometheus text (/metrics) on this port, polling and webhook mode;
+# never on the public webhook listener. Loopback only unless METRICS_LISTEN
+# says otherwise (the numbers are not secret, but not for the internet)
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+METRICS_LISTEN = os.getenv("METRICS_LISTEN", "127.0.0.1")
+# Telegram user ids allowed to use admin commands (/stats), comma separated
+ADMIN_IDS = {int(x) for x in os.getenv("ADMIN_IDS", "").split(",") if x.strip()}
+
+# /profile and SIGUSR1 write .pstats files here (profiling.py)
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_SIGNAL_SECONDS = float(os.getenv("PROFILE_SIGNAL_SECONDS", 30))
+
+# reload parser / excel_builder / handlers in-process when a .py file
+# changes (hot_reload.py); run_bot.py turns this on
+HOT_RELOAD = os.getenv("HOT_RELOAD", "0") in {"1", "true", "yes"}
+# quiet period after the last change before reloading (editor save bursts)
+HOT_RELOAD_DEBOUNCE_SECONDS = float(os.getenv("HOT_RELOAD_DEBOUNCE_SECONDS", 0.5))
+
+# Bot API base URL (token is appended), e.g. a local Bot API server or
+# fake_telegram.py; unset means api.telegram.org
+BOT_API_URL = os.getenv("BOT_API_URL")
+
+# outbound Bot API calls (outbound.py): messages per second for the whole
+# bot, per private chat (with a burst allowance) and per group chat
+OUTBOUND_GLOBAL_RATE = float(os.getenv("OUTBOUND_GLOBAL_RATE", 30))
+OUTBOUND_CHAT_RATE = float(os.getenv("OUTBOUND_CHAT_RATE", 1))
+OUTBOUND_CHAT_BURST = float(os.getenv("OUTBOUND_CHAT_BURST", 3))
+OUTBOUND_GROUP_RATE = float(os.getenv("OUTBOUND_GROUP_RATE", 20 / 60))
+# retries of a call answered with 429 (flood control)
+OUTBOUND_MAX_RETRIES = int(os.getenv("OUTBOUND_MAX_RETRIES", 3))
+# shared httpx pool for Bot API calls (getUpdates has its own connection)
+OUTBOUND_POOL_SIZE = int(os.getenv("OUTBOUND_POOL_SIZE", 64))
+# seconds allowed for sending a request body (workbook uploads)
+OUTBOUND_WRITE_TIMEOUT = float(os.getenv("OUTBOUND_WRITE_TIMEOUT", 30))
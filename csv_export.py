@@ -0,0 +1,138 @@
+"""
+CSV / TSV export (/export csv, /export tsv, add "gz" for .csv.gz).
+
+One file for all sheets: the workbook columns (HEADERS) with a leading
+Sheet column and a trailing Unit column (ml / g / empty, which the
+workbook only shows through number formats). The formula columns are
+computed here the way the workbook formulas compute them (see pricing.py),
+so the file holds plain values. Rows are written sheet by sheet in
+workbook order and Ids match the workbook.
+
+No pandas / openpyxl: rows go through the csv module straight into the
+(optionally gzip) stream.
+"""
+import csv
+import gzip
+import io
+import math
+
+
+from config import EXPORT_SPOOL_MAX_BYTES
+from excel_builder import HEADERS, SpoolFile, size_is_gram, size_is_ml, sort_rows
+from pricing import buy_in_chain, excel_round as _round, num as _num, sell_chain
+
+
+# format name -> field delimiter
+FORMATS = {"csv": ",", "tsv": "\t"}
+COLUMNS = ["Sheet", *HEADERS, "Unit"]
+# rows handed to the csv writer at once
+CHUNK_ROWS = 512
+
+
+def _weight(total: float) -> float:
+    """Weight per Ctn formula: whole units, a first decimal of 6+ rounds up."""
+    if _round(total * 10, 0) % 10 >= 6:
+        return float(math.ceil(total))
+    return float(math.floor(total))
+
+
+def _number(x: float) -> str:
+    # what Excel shows: 15 significant digits
+    return "%.15g" % x
+
+
+def _text(value):
+    """Cell value for the csv writer (None, str and int it writes itself)."""
+    kind = type(value)
+    if kind is str or kind is int or value is None:
+        return value
+    if kind is float:
+        return "" if math.isnan(value) or math.isinf(value) else _number(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def row_values(sheet: str, row_id: int, row: dict) -> list:
+    """One CSV row for a _row_from_data row, formula columns computed."""
+    ml = size_is_ml(row)
+    gram = size_is_gram(row)
+    size, packs = _num(row.get("Size")), _num(row.get("Packs"))
+
+    volume = size * packs
+    weight = 0.0 if size == 0 else _weight(volume / 1000 if ml or gram else volume)
+    disc_pct, disc, direct, net = buy_in_chain(row)
+    per_100 = 0.0 if volume == 0 else _round(net / (volume / 100), 2)
+    sell_usd, sell_khr, margin_unit, price_ctn, margin_ctn = sell_chain(row, net)
+
+    return [
+        sheet,
+        _text(row.get("Date")),
+        row_id,
+        _text(row.get("Address")),
+        _text(row.get("Category")),
+        _text(row.get("Sub-Category")),
+        _text(row.get("Brand")),
+        _text(row.get("Packaging")),
+        _text(row.get("Size")),
+        _text(row.get("Packs")),
+        _number(weight),
+        _text(row.get("Buy-in")),
+        _text(row.get("Scheme(base)")),
+        _text(row.get("FOC")),
+        _number(disc_pct),
+        _number(disc),
+        _text(row.get("Direct Disc.(%)")),
+        _number(direct),
+        _number(net),
+        _number(per_100),
+        _text(row.get("Mark - up")),
+        _number(sell_usd),
+        _text(row.get("Exchange Rate")),
+        _number(sell_khr),
+        _text(row.get("Price Unit (KHR)")),
+        "" if margin_unit is None else _number(margin_unit),  # #DIV/0!
+        _number(price_ctn),
+        _number(margin_ctn),
+        "ml" if ml else "g" if gram else "",
+    ]
+
+
+def write_csv(sheet_rows: dict, fileobj, fmt: str = "csv", compress: bool = False) -> None:
+    """Write sheet_rows as CSV (or TSV) text, UTF-8, into the binary file object."""
+    delimiter = FORMATS[fmt]
+    # mtime 0: the same rows always give the same bytes
+    raw = gzip.GzipFile(fileobj=fileobj, mode="wb", mtime=0) if compress else fileobj
+    text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+    writer = csv.writer(text, delimiter=delimiter, lineterminator="\r\n")
+    writer.writerow(COLUMNS)
+    for sheet, rows in sheet_rows.items():
+        chunk = []
+        for row_id, row in enumerate(sort_rows(rows), start=1):
+            chunk.append(row_values(sheet, row_id, row))
+            if len(chunk) >= CHUNK_ROWS:
+                writer.writerows(chunk)
+                chunk.clear()
+        writer.writerows(chunk)
+    text.flush()
+    # leave fileobj open for the caller
+    text.detach()
+    if compress:
+        raw.close()
+
+
+def build_csv_file(
+    sheet_rows: dict,
+    fmt: str = "csv",
+    compress: bool = False,
+    spool_max_bytes: int = EXPORT_SPOOL_MAX_BYTES,
+):
+    """write_csv into a rewound SpoolFile, like build_excel_file."""
+    out = SpoolFile(spool_max_bytes)
+    try:
+        write_csv(sheet_rows, out, fmt, compress)
+    except BaseException:
+        out.close()
+        raise
+    out.seek(0)
+    return out
@@ -0,0 +1,64 @@
+"""
+Duplicate detection for incoming products.
+
+A product's identity is its date, address, category, brand, size and
+packaging, normalized (case, inner whitespace, "1000 ml" == "1000ml").
+DuplicateIndex maps each identity to the stored products that have it,
+so checking an incoming product is one hash lookup, and it is kept up to
+date on add/remove like the search index.
+"""
+
+
+# what to do with a product whose identity is already stored
+MODES = ("skip", "replace", "flag")
+DEFAULT_MODE = "skip"
+
+
+def _norm(value) -> str:
+    return " ".join(str(value).split()).lower() if value is not None else ""
+
+
+def identity(parsed: dict) -> tuple:
+    """The normalized identity of a parsed product, hashable."""
+    date = parsed.get("date")
+    size = parsed.get("size_raw")
+    return (
+        date if date is not None else _norm(parsed.get("date_raw")),
+        _norm(parsed.get("address")),
+        _norm(parsed.get("category")),
+        _norm(parsed.get("brand")),
+        "".join(str(size).split()).lower() if size is not None else "",
+        _norm(parsed.get("packaging")),
+    )
+
+
+class DuplicateIndex:
+    """identity -> stored products with it (more than one only when flagged)."""
+
+    def __init__(self):
+        self._products: dict[tuple, list[dict]] = {}
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def find(self, parsed: dict) -> tuple[dict, ...]:
+        """Stored products with the same identity as `parsed`."""
+        return tuple(self._products.get(identity(parsed), ()))
+
+    def add(self, parsed: dict) -> None:
+        self._products.setdefault(identity(parsed), []).append(parsed)
+
+    def remove(self, parsed: dict) -> None:
+        key = identity(parsed)
+        stored = self._products.get(key)
+        if not stored:
+            return
+        for i, p in enumerate(stored):
+            if p is parsed:
+                del stored[i]
+                break
+        if not stored:
+            del self._products[key]
+
+    def clear(self) -> None:
+        self._products.clear()
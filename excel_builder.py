@@ -1,14 +1,15 @@
 import io
+import mmap
+import tempfile
 from decimal import Decimal, ROUND_FLOOR, ROUND_HALF_UP
 
 
-import pandas as pd
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+# pandas / openpyxl are imported inside write_excel: they are most of the
+# bot's start-up time and only the openpyxl Excel build needs them
 
 
-from config import EXCHANGE_RATE_DEFAULT
+from category_resolver import CategoryResolver
+from config import EXCHANGE_RATE_DEFAULT, EXPORT_SPOOL_MAX_BYTES, XLSX_BACKEND
 
 
 
@@ -17,6 +18,43 @@ KHR_FORMAT = '"KHR "#,##0'
 PERCENT_FORMAT = "0.00%"
 
 
+# bump whenever the workbook layout/styling changes (invalidates export cache)
+BUILDER_VERSION = "1"
+
+
+
+# Column headers row 2 with Id
+HEADERS = [
+    "Date",
+    "Id",
+    "Address",
+    "Category",
+    "Sub-Category",
+    "Brand",
+    "Packaging",
+    "Size",
+    "Packs",
+    "Weight per Ctn",
+    "Buy-in",
+    "Scheme(base)",
+    "FOC",
+    "Discount(%)",
+    "Discount($)",
+    "Direct Disc.(%)",
+    "Direct Disc($)",
+    "Net Buy-in",
+    "Price / 100 unit",
+    "Mark - up",
+    "Sell Out ($)",
+    "Exchange Rate (KHR)",
+    "Sell Out (KHR)",
+    "Price Unit (KHR)",
+    "Margin/Unit (KHR)",
+    "Price Ctn (KHR)",
+    "Margin/Ctn (KHR)",
+]
+
+
 
 # simple color mapping by sheet name (use ARGB hex)
 SHEET_COLORS = {
@@ -120,91 +158,107 @@ def size_is_ml(data: dict) -> bool:
 
 
 
-def choose_sheet_name(data: dict) -> str:
-    category = (data.get("category") or "").strip().lower()
-    sub_cat = (data.get("sub_category") or "").strip().lower()
+OIL_CATEGORIES = {
+    "cooking oil",
+    "oil",
+    "palm oil",
+    "vegetable oil",
+    "coconut oil",
+    "sunflower oil",
+}
+POWDER_DETERGENT_CATEGORIES = {"detergent", "powder detergent", "washing powder"}
+POWDER_SUB_CATEGORIES = {"powder", "powdered", "Powder", ""}
+LIQUID_DETERGENT_CATEGORIES = {"detergent", "liquid detergent", "laundry liquid"}
+LIQUID_SUB_CATEGORIES = {"liquid", "Liquid", ""}
+MILK_CATEGORIES = {
+    "milk",
+    "dairy milk",
+    "fresh milk",
+    "evaporated milk",
+    "condensed milk",
+    "Milk",
+}
+DISHWASH_CATEGORIES = {
+    "dishwash",
+    "dish wash",
+    "dishwashing liquid",
+    "Dishwash",
+    "dishwashing",
+}
+FABRIC_CATEGORIES = {
+    "fabric softener",
+    "Fabric softener",
+    "softener",
+    "Fabric Softener",
+    "fabric softner",
+}
+ECO_DISHWASH_CATEGORIES = {
+    "eco dishwash",
+    "eco dishwashing",
+    "eco-dishwash",
+    "Eco dishwash",
+    "Eco Dishwash",
+}
+TOILET_CATEGORIES = {
+    "toilet",
+    "toilet cleaner",
+    "toilet bowl cleaner",
+    "wc cleaner",
+    "toilet liquid",
+    "Toilet",
+}
 
 
-    oil_keywords = {
-        "cooking oil",
-        "oil",
-        "palm oil",
-        "vegetable oil",
-        "coconut oil",
-        "sunflower oil",
-    }
-    if category in oil_keywords:
+# Khmer category names -> the English category they stand for
+KHMER_CATEGORIES = {
+    "ប្រេង": "oil",
+    "ប្រេងឆា": "cooking oil",
+    "ប្រេងដូង": "coconut oil",
+    "ម្សៅសាប៊ូ": "powder detergent",
+    "សាប៊ូម្សៅ": "powder detergent",
+    "សាប៊ូរាវ": "liquid detergent",
+    "ទឹកសាប៊ូបោកខោអាវ": "laundry liquid",
+    "ទឹកដោះគោ": "milk",
+    "ទឹកដោះគោខាប់": "condensed milk",
+    "ទឹកដោះគោស្រស់": "fresh milk",
+    "ទឹកលាងចាន": "dishwash",
+    "ទឹកក្រអូបខោអាវ": "fabric softener",
+    "ទឹកទន់ក្រណាត់": "fabric softener",
+    "ទឹកលាងបង្គន់": "toilet cleaner",
+}
+
+
+
+def _sheet_for(category: str, sub_cat: str) -> str:
+    if category in OIL_CATEGORIES:
         return "Oil"
 
 
-    if (
-        category in {"detergent", "powder detergent", "washing powder"}
-        and sub_cat in {"powder", "powdered", "Powder", ""}
-    ):
+    if category in POWDER_DETERGENT_CATEGORIES and sub_cat in POWDER_SUB_CATEGORIES:
         return "Powder Detergent"
 
 
-    if (
-        category in {"detergent", "liquid detergent", "laundry liquid"}
-        and sub_cat in {"liquid", "Liquid", ""}
-    ):
+    if category in LIQUID_DETERGENT_CATEGORIES and sub_cat in LIQUID_SUB_CATEGORIES:
         return "Liquid Detergent"
 
 
-    milk_keywords = {
-        "milk",
-        "dairy milk",
-        "fresh milk",
-        "evaporated milk",
-        "condensed milk",
-        "Milk",
-    }
-    if category in milk_keywords:
+    if category in MILK_CATEGORIES:
         return "Milk"
 
 
-    dishwash_keywords = {
-        "dishwash",
-        "dish wash",
-        "dishwashing liquid",
-        "Dishwash",
-        "dishwashing",
-    }
-    if category in dishwash_keywords:
+    if category in DISHWASH_CATEGORIES:
         return "Dishwash"
 
 
-    fabric_keywords = {
-        "fabric softener",
-        "Fabric softener",
-        "softener",
-        "Fabric Softener",
-        "fabric softner",
-    }
-    if category in fabric_keywords:
+    if category in FABRIC_CATEGORIES:
         return "Fabric Softener"
 
 
-    eco_keywords = {
-        "eco dishwash",
-        "eco dishwashing",
-        "eco-dishwash",
-        "Eco dishwash",
-        "Eco Dishwash",
-    }
-    if category in eco_keywords:
+    if category in ECO_DISHWASH_CATEGORIES:
         return "Eco Dishwash"
 
 
-    toilet_keywords = {
-        "toilet",
-        "toilet cleaner",
-        "toilet bowl cleaner",
-        "wc cleaner",
-        "toilet liquid",
-        "Toilet",
-    }
-    if category in toilet_keywords:
+    if category in TOILET_CATEGORIES:
         return "Toilet"
 
 
@@ -212,6 +266,55 @@ def choose_sheet_name(data: dict) -> str:
 
 
 
+# fuzzy fallback for categories (and detergent sub-categories) that match
+# no keyword exactly: typos and Khmer names
+CATEGORY_RESOLVER = CategoryResolver(
+    {
+        **{
+            c.lower(): c.lower()
+            for group in (
+                OIL_CATEGORIES,
+                POWDER_DETERGENT_CATEGORIES,
+                LIQUID_DETERGENT_CATEGORIES,
+                MILK_CATEGORIES,
+                DISHWASH_CATEGORIES,
+                FABRIC_CATEGORIES,
+                ECO_DISHWASH_CATEGORIES,
+                TOILET_CATEGORIES,
+            )
+            for c in group
+        },
+        **KHMER_CATEGORIES,
+    }
+)
+SUB_CATEGORY_RESOLVER = CategoryResolver(
+    {c.lower(): c.lower() for c in POWDER_SUB_CATEGORIES | LIQUID_SUB_CATEGORIES if c}
+)
+
+
+
+def choose_sheet_name(data: dict) -> str:
+    """
+    Sheet of a product by its category (and sub-category for detergent).
+    A category that matches no keyword is resolved fuzzily (typos, Khmer
+    names) before it falls back to "Data".
+    """
+    category = (data.get("category") or "").strip().lower()
+    sub_cat = (data.get("sub_category") or "").strip().lower()
+
+
+    sheet = _sheet_for(category, sub_cat)
+    if sheet != "Data" or not category:
+        return sheet
+
+
+    resolved = CATEGORY_RESOLVER.resolve(category)
+    if resolved is None:
+        return "Data"
+    return _sheet_for(resolved, SUB_CATEGORY_RESOLVER.resolve(sub_cat) or sub_cat)
+
+
+
 def calculate_fields(data: dict) -> dict:
     """
     Apply base rounding rules with round2 for monetary values.
@@ -307,7 +410,134 @@ def _row_from_data(data: dict) -> dict:
 
 
 
-def build_excel_from_sheet_dict(sheet_rows: dict) -> bytes:
+def sort_rows(rows: list) -> list:
+    """Rows in workbook order: by Date, stable, rows without a Date last."""
+    return sorted(rows, key=lambda row: (row.get("Date") is None, row.get("Date")))
+
+
+
+def build_excel_from_sheet_dict(sheet_rows: dict, backend: str | None = None) -> bytes:
+    """Workbook bytes for {sheet name: [row dict, ...]} (see write_excel)."""
+    buf = io.BytesIO()
+    write_excel(sheet_rows, buf, backend)
+    return buf.getvalue()
+
+
+
+class SpoolFile(io.IOBase):
+    """
+    Binary file kept in a BytesIO up to max_size bytes and moved to an
+    anonymous temporary file beyond that, like SpooledTemporaryFile, but
+    it owns its buffer, so view() reaches the bytes with public APIs only.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.rolled = False
+        self._data = io.BytesIO()
+
+    def rollover(self) -> None:
+        if self.rolled:
+            return
+        disk = tempfile.TemporaryFile()
+        disk.write(self._data.getvalue())
+        disk.seek(self._data.tell())
+        self._data = disk
+        self.rolled = True
+
+    def write(self, b) -> int:
+        if not self.rolled and self._data.tell() + memoryview(b).nbytes > self.max_size:
+            self.rollover()
+        return self._data.write(b)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._data.read(size)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._data.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._data.tell()
+
+    def truncate(self, size: int | None = None) -> int:
+        return self._data.truncate(size)
+
+    def fileno(self) -> int:
+        self.rollover()
+        return self._data.fileno()
+
+    def flush(self) -> None:
+        self._data.flush()
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        # IOBase.close flushes, so the buffer goes after it
+        super().close()
+        self._data.close()
+
+    def view(self) -> memoryview:
+        """
+        The bytes without a copy, for a file that is done being written:
+        in memory, getvalue() hands out the BytesIO's own buffer; on disk,
+        an mmap of the file.
+        """
+        if not self.rolled:
+            return memoryview(self._data.getvalue())
+        return memoryview(mmap.mmap(self._data.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+
+def build_excel_file(
+    sheet_rows: dict,
+    backend: str | None = None,
+    spool_max_bytes: int = EXPORT_SPOOL_MAX_BYTES,
+):
+    """
+    The workbook in a rewound SpoolFile: kept in memory up to
+    spool_max_bytes, moved to a temporary file on disk beyond that. The
+    send path uploads straight from it, without a bytes copy.
+    """
+    out = SpoolFile(spool_max_bytes)
+    try:
+        write_excel(sheet_rows, out, backend)
+    except BaseException:
+        out.close()
+        raise
+    out.seek(0)
+    return out
+
+
+
+def write_excel(sheet_rows: dict, fileobj, backend: str | None = None) -> None:
+    """
+    Write the workbook for sheet_rows into the binary file object. backend
+    is "openpyxl" or "native" (xlsx_writer.py); None uses XLSX_BACKEND.
+    """
+    backend = backend or XLSX_BACKEND
+    if backend == "native":
+        from xlsx_writer import write_workbook
+
+
+        write_workbook(sheet_rows, fileobj)
+        return
+    if backend != "openpyxl":
+        raise ValueError(f"Unknown XLSX backend: {backend}")
+
+
+    import pandas as pd
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    from openpyxl.utils import get_column_letter
+
+
     wb = Workbook()
     wb.remove(wb.active)
 
@@ -343,36 +573,7 @@ def build_excel_from_sheet_dict(sheet_rows: dict) -> bytes:
             cell.alignment = Alignment(horizontal="center", vertical="center")
 
 
-        # Column headers row 2 with Id
-        headers = [
-            "Date",
-            "Id",
-            "Address",
-            "Category",
-            "Sub-Category",
-            "Brand",
-            "Packaging",
-            "Size",
-            "Packs",
-            "Weight per Ctn",
-            "Buy-in",
-            "Scheme(base)",
-            "FOC",
-            "Discount(%)",
-            "Discount($)",
-            "Direct Disc.(%)",
-            "Direct Disc($)",
-            "Net Buy-in",
-            "Price / 100 unit",
-            "Mark - up",
-            "Sell Out ($)",
-            "Exchange Rate (KHR)",
-            "Sell Out (KHR)",
-            "Price Unit (KHR)",
-            "Margin/Unit (KHR)",
-            "Price Ctn (KHR)",
-            "Margin/Ctn (KHR)",
-        ]
+        headers = HEADERS
         for col_num, header in enumerate(headers, start=1):
             cell = ws.cell(row=2, column=col_num)
             cell.value = header
@@ -397,7 +598,10 @@ def build_excel_from_sheet_dict(sheet_rows: dict) -> bytes:
 
         # sort by Date
         if "Date" in df.columns:
-            df = df.sort_values(by=["Date"], ascending=True, na_position="last")
+            # stable, so rows with the same Date keep input order and Ids match /list
+            df = df.sort_values(
+                by=["Date"], ascending=True, na_position="last", kind="stable"
+            )
 
 
         weight_col_idx = headers.index("Weight per Ctn") + 1
@@ -589,7 +793,4 @@ def build_excel_from_sheet_dict(sheet_rows: dict) -> bytes:
         ws.auto_filter.ref = f"A2:{get_column_letter(len(headers))}2"
 
 
-    buf = io.BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    return buf.getvalue()
+    wb.save(fileobj)
@@ -0,0 +1,151 @@
+import datetime
+
+from excel_builder import HEADERS
+
+
+# column positions (0-based) in the layout written by build_excel_from_sheet_dict
+_COL = {header: idx for idx, header in enumerate(HEADERS)}
+
+# data starts below the section row (1) and the header row (2)
+FIRST_DATA_ROW = 3
+
+
+def _size_unit(number_format: str) -> str:
+    """Recover the size unit from the Size cell number format ('#,##0" ml"')."""
+    fmt = (number_format or "").lower()
+    if '" ml"' in fmt:
+        return "ml"
+    if '" g"' in fmt:
+        return "g"
+    return ""
+
+
+def _as_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return None
+
+
+def _as_float(value):
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_text(value):
+    """The cell text as written (a re-export must match); blank is None."""
+    if value is None:
+        return None
+    value = str(value)
+    return value if value.strip() != "" else None
+
+
+def _raw(value):
+    """String form of a number as the user would have typed it."""
+    if value is None:
+        return None
+    if float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _record_from_cells(cells) -> dict | None:
+    """
+    Map one exported data row back to a parse_message() style record.
+    Formula columns (Weight, Discount, Net Buy-in, ...) are skipped, they are
+    recomputed by Excel from the inputs on the next export.
+    """
+    values = [c.value for c in cells]
+    if len(values) < len(HEADERS):
+        values.extend([None] * (len(HEADERS) - len(values)))
+
+    buy_in = _as_float(values[_COL["Buy-in"]])
+    price_unit = _as_float(values[_COL["Price Unit (KHR)"]])
+    # empty / trailing rows
+    if buy_in is None and price_unit is None:
+        return None
+
+    date = _as_date(values[_COL["Date"]])
+    size = _as_float(values[_COL["Size"]])
+    packs = _as_float(values[_COL["Packs"]])
+    scheme = _as_float(values[_COL["Scheme(base)"]])
+    foc = _as_float(values[_COL["FOC"]])
+    mark_up = _as_float(values[_COL["Mark - up"]])
+
+    # Direct Disc.(%) is written as a fraction (0.12), parsed input is 12
+    direct_disc = _as_float(values[_COL["Direct Disc.(%)"]])
+    if direct_disc is not None:
+        direct_disc = round(direct_disc * 100, 10)
+
+    size_raw = None
+    if size is not None:
+        size_raw = _raw(size) + _size_unit(cells[_COL["Size"]].number_format)
+
+    return {
+        "date_raw": date.strftime("%d.%m.%Y") if date else None,
+        "date": date,
+        "address": _as_text(values[_COL["Address"]]),
+        "outlet_type": None,
+        "category": _as_text(values[_COL["Category"]]),
+        "sub_category": _as_text(values[_COL["Sub-Category"]]),
+        "brand": _as_text(values[_COL["Brand"]]),
+        "packaging": _as_text(values[_COL["Packaging"]]),
+        "size_raw": size_raw,
+        "packs_raw": _raw(packs),
+        "weight_raw": None,
+        "size_ml": size,
+        "packs": int(packs) if packs is not None else None,
+        "weight_ctn_l": None,
+        "buy_in": buy_in,
+        "scheme_base_raw": _raw(scheme),
+        "scheme_base": scheme,
+        "foc_raw": _raw(foc),
+        "foc": foc,
+        "discount_pct": None,
+        "discount_value": None,
+        "direct_disc_pct": direct_disc,
+        "direct_disc_value": None,
+        "mark_up": mark_up,
+        "sell_out_usd": None,
+        "price_unit_khr": price_unit,
+        "exchange_rate": None,
+    }
+
+
+def iter_products_from_workbook(file):
+    """
+    Yield parsed-product records from a workbook produced by
+    build_excel_from_sheet_dict.
+
+    The workbook is opened read-only and streamed row by row, so memory
+    stays bounded however many rows the file has. Cells (not values_only)
+    are read because the Size unit (ml / g) only survives in the number
+    format of the Size column.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(file, read_only=True, data_only=False)
+    try:
+        for ws in wb.worksheets:
+            header = next(
+                ws.iter_rows(min_row=2, max_row=2, values_only=True), None
+            )
+            if not header or tuple(header[:2]) != ("Date", "Id"):
+                # not one of our sheets
+                continue
+            for cells in ws.iter_rows(min_row=FIRST_DATA_ROW):
+                record = _record_from_cells(cells)
+                if record is not None:
+                    yield record
+    finally:
+        wb.close()
+
+
+def load_products_from_workbook(file) -> list[dict]:
+    """Read every product record of an exported workbook into a list."""
+    return list(iter_products_from_workbook(file))
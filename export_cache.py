@@ -0,0 +1,152 @@
+import hashlib
+import io
+import json
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import IO
+
+
+from telegram import InputFile
+
+
+from config import XLSX_BACKEND
+from excel_builder import BUILDER_VERSION, SpoolFile
+
+
+class ViewReader(io.RawIOBase):
+    """Read-only file over a memoryview, with its own position."""
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else self._pos + size
+        chunk = self._view[self._pos:end]
+        self._pos += len(chunk)
+        return bytes(chunk)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self._pos, os.SEEK_END: len(self._view)}
+        self._pos = max(0, base[whence] + offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+class StreamedInputFile(InputFile):
+    """
+    InputFile that keeps a file object instead of reading it into bytes;
+    httpx streams it into the multipart body in 64 KiB chunks (and seeks
+    back to 0 when a request is retried).
+    """
+
+    __slots__ = ()
+
+    def __init__(self, fileobj: IO[bytes], filename: str):
+        super().__init__(b"", filename=filename)
+        self.input_file_content = fileobj
+
+
+@dataclass
+class CachedExport:
+    # rewound SpoolFile from build_excel_file / build_csv_file
+    file: SpoolFile
+    size: int
+    # Telegram file_id of the last upload of these bytes, if any
+    file_id: str | None = None
+    _view: memoryview | None = field(default=None, repr=False)
+
+    @property
+    def view(self) -> memoryview:
+        """The bytes without a copy (SpoolFile.view), made once."""
+        if self._view is None:
+            self._view = self.file.view()
+        return self._view
+
+    def input_file(self, filename: str) -> InputFile:
+        """
+        Upload of these bytes; every call reads through its own position, so
+        concurrent uploads of one cached entry do not interfere.
+        """
+        return StreamedInputFile(ViewReader(self.view), filename)
+
+
+def sheet_rows_digest(sheet_rows: dict) -> str:
+    """
+    Stable hash of the rows handed to build_excel_from_sheet_dict.
+    Sheet order is part of the key because it is the sheet order in the
+    workbook; the builder version and backend are too, so a layout change
+    never serves stale bytes.
+    """
+    h = hashlib.sha256(f"{BUILDER_VERSION}:{XLSX_BACKEND}".encode())
+    for sheet_name, rows in sheet_rows.items():
+        if not rows:
+            continue
+        h.update(b"\0sheet\0" + sheet_name.encode())
+        for row in rows:
+            h.update(
+                json.dumps(
+                    row, default=str, ensure_ascii=False, separators=(",", ":")
+                ).encode()
+            )
+    return h.hexdigest()
+
+
+class ExportCache:
+    """LRU cache of built workbooks bounded by total size in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[object, CachedExport] = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key) -> CachedExport | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, file: SpoolFile) -> CachedExport:
+        """
+        Cache a built workbook file. Evicted files are not closed: an upload
+        may still be reading them; they go away with the last reference.
+        """
+        size = file.seek(0, os.SEEK_END)
+        file.seek(0)
+        entry = CachedExport(file, size)
+        if size > self.max_bytes:
+            # too big to keep, caller still gets an entry to work with
+            return entry
+        self.discard(key)
+        self._entries[key] = entry
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes:
+            _, old = self._entries.popitem(last=False)
+            self.total_bytes -= old.size
+        return entry
+
+    def discard(self, key) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.total_bytes -= old.size
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.total_bytes = 0
@@ -0,0 +1,294 @@
+"""
+Local stand-in for the Telegram Bot API, for exercising bot.py without
+Telegram. Point the bot at it with ApplicationBuilder().base_url(...)
+and it records every reply. Updates reach the bot either by long polling
+(push_update() + getUpdates) or by webhook (post_update()).
+"""
+import asyncio
+import itertools
+import json
+import time
+from email import policy
+from email.parser import BytesParser
+from urllib.parse import parse_qs
+
+import httpx
+
+from mini_http import HttpServer, Request, Response
+
+
+# the Bot API's own limit for files sent by bots
+UPLOAD_MAX_BYTES = 50 * 1024 * 1024
+
+
+def _field(value: str):
+    # PTB sends strings as-is and everything else JSON-encoded
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def _parse_params(request: Request) -> tuple[dict, dict[str, bytes]]:
+    """Request parameters and uploaded files of one Bot API call."""
+    params = {k: _field(v[-1]) for k, v in request.query.items()}
+    files: dict[str, bytes] = {}
+    ctype = request.headers.get("content-type", "")
+    if ctype.startswith("application/json") and request.body:
+        params.update(json.loads(request.body))
+    elif ctype.startswith("application/x-www-form-urlencoded"):
+        form = parse_qs(request.body.decode(), keep_blank_values=True)
+        params.update({k: _field(v[-1]) for k, v in form.items()})
+    elif ctype.startswith("multipart/form-data"):
+        msg = BytesParser(policy=policy.HTTP).parsebytes(
+            b"Content-Type: " + ctype.encode() + b"\r\n\r\n" + request.body
+        )
+        for part in msg.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            payload = part.get_payload(decode=True) or b""
+            if part.get_filename() is not None:
+                files[name] = payload
+            else:
+                params[name] = _field(payload.decode())
+        # "document": "attach://<name>" points at the uploaded part
+        for key, value in list(params.items()):
+            if isinstance(value, str) and value.startswith("attach://"):
+                files[key] = files.pop(value[len("attach://"):], b"")
+                del params[key]
+    return params, files
+
+
+class FakeTelegramAPI:
+    """
+    Implements the Bot API calls the bot makes (getMe, getUpdates,
+    setWebhook, deleteWebhook, sendMessage, sendDocument with multipart,
+    answerCallbackQuery, editMessageText) and records what was sent in
+    `sent`.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        # workbook uploads are far bigger than what the webhook accepts
+        self.http = HttpServer(self.handle, host, port, max_body_bytes=UPLOAD_MAX_BYTES)
+        self.sent: list[dict] = []
+        self._sent_per_chat: dict[int, int] = {}
+        self.webhook_url: str | None = None
+        self._message_ids = itertools.count(1)
+        self._update_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+        self._sent_changed = asyncio.Condition()
+        self._pending_updates: list[dict] = []
+        self._updates_changed = asyncio.Condition()
+        self._stopping = False
+        # (count, retry_after): answer the next `count` sends with a 429
+        self._flood = (0, 0)
+        self.flood_errors = 0
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.http.host}:{self.http.port}/bot"
+
+    async def start(self) -> None:
+        await self.http.start()
+
+    async def stop(self) -> None:
+        # answer pending long polls now instead of after their timeout
+        async with self._updates_changed:
+            self._stopping = True
+            self._updates_changed.notify_all()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        await self.http.stop(timeout=5)
+
+    # -- Telegram side ----------------------------------------------------
+
+    def text_update(self, chat_id: int, text: str, user_id: int | None = None) -> dict:
+        """Update dict for a private text message (commands included)."""
+        user = {"id": user_id or chat_id, "is_bot": False, "first_name": "Test"}
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": user,
+            "text": text,
+        }
+        if text.startswith("/"):
+            command = text.split()[0]
+            message["entities"] = [
+                {"type": "bot_command", "offset": 0, "length": len(command)}
+            ]
+        return {"update_id": next(self._update_ids), "message": message}
+
+    async def post_update(self, update: dict, secret_token: str | None = None) -> int:
+        """POST an update to the registered webhook, like Telegram does."""
+        headers = {}
+        if secret_token:
+            headers["X-Telegram-Bot-Api-Secret-Token"] = secret_token
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=60)
+        r = await self._client.post(self.webhook_url, json=update, headers=headers)
+        return r.status_code
+
+    async def push_update(self, update: dict) -> None:
+        """Queue an update for the bot's next getUpdates call."""
+        async with self._updates_changed:
+            self._pending_updates.append(update)
+            self._updates_changed.notify_all()
+
+    async def wait_for_sent(
+        self, count: int, chat_id: int | None = None, timeout: float = 30.0
+    ) -> list[dict]:
+        """Wait until at least `count` replies were recorded (for one chat)."""
+
+        def done():
+            if chat_id is None:
+                return len(self.sent) >= count
+            return self._sent_per_chat.get(chat_id, 0) >= count
+
+        async with self._sent_changed:
+            await asyncio.wait_for(self._sent_changed.wait_for(done), timeout)
+        if chat_id is None:
+            return self.sent
+        return [s for s in self.sent if s["chat_id"] == chat_id]
+
+    def flood(self, count: int, retry_after: int = 1) -> None:
+        """Answer the next `count` chat sends with 429 Too Many Requests."""
+        self._flood = (count, retry_after)
+
+    # -- Bot API side -----------------------------------------------------
+
+    async def handle(self, request: Request) -> Response:
+        # /bot<token>/<method>
+        parts = request.path.strip("/").split("/")
+        if len(parts) != 2 or not parts[0].startswith("bot"):
+            return Response(404, b"not found")
+        method = parts[1]
+        params, files = _parse_params(request)
+
+        handler = getattr(self, f"api_{method}", None)
+        if handler is None:
+            return self._reply(
+                {"ok": False, "error_code": 404, "description": f"Not Found: {method}"}
+            )
+        count, retry_after = self._flood
+        if count and "chat_id" in params:
+            self._flood = (count - 1, retry_after)
+            self.flood_errors += 1
+            response = self._reply(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {retry_after}",
+                    "parameters": {"retry_after": retry_after},
+                }
+            )
+            response.status = 429
+            return response
+        result = await handler(params, files)
+        return self._reply({"ok": True, "result": result})
+
+    @staticmethod
+    def _reply(payload: dict) -> Response:
+        return Response(200, json.dumps(payload).encode(), "application/json")
+
+    def _message(self, chat_id, **fields) -> dict:
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id), "type": "private"},
+            "from": {"id": 1, "is_bot": True, "first_name": "Bot"},
+        }
+        message.update(fields)
+        return message
+
+    async def _record(self, entry: dict) -> None:
+        entry["time"] = time.perf_counter()
+        async with self._sent_changed:
+            self.sent.append(entry)
+            chat_id = entry["chat_id"]
+            self._sent_per_chat[chat_id] = self._sent_per_chat.get(chat_id, 0) + 1
+            self._sent_changed.notify_all()
+
+    async def api_getMe(self, params, files):
+        return {
+            "id": 1,
+            "is_bot": True,
+            "first_name": "Bot",
+            "username": "fake_bot",
+            "can_join_groups": True,
+            "can_read_all_group_messages": False,
+            "supports_inline_queries": False,
+        }
+
+    async def api_getUpdates(self, params, files):
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+        async with self._updates_changed:
+            # updates below offset were confirmed by the bot
+            self._pending_updates = [
+                u for u in self._pending_updates if u["update_id"] >= offset
+            ]
+            try:
+                await asyncio.wait_for(
+                    self._updates_changed.wait_for(
+                        lambda: self._pending_updates or self._stopping
+                    ),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                pass
+            return self._pending_updates[:limit]
+
+    async def api_setWebhook(self, params, files):
+        self.webhook_url = params.get("url")
+        return True
+
+    async def api_deleteWebhook(self, params, files):
+        self.webhook_url = None
+        return True
+
+    async def api_sendMessage(self, params, files):
+        await self._record(
+            {"method": "sendMessage", "chat_id": int(params["chat_id"]), "text": params.get("text")}
+        )
+        return self._message(params["chat_id"], text=params.get("text", ""))
+
+    async def api_sendDocument(self, params, files):
+        data = files.get("document")
+        if data is None:
+            # resend by file_id, nothing uploaded
+            file_id = str(params.get("document"))
+            size = 0
+        else:
+            file_id = f"file-{next(self._file_ids)}"
+            size = len(data)
+        await self._record(
+            {
+                "method": "sendDocument",
+                "chat_id": int(params["chat_id"]),
+                "caption": params.get("caption"),
+                "file_id": file_id,
+                "bytes": size,
+            }
+        )
+        return self._message(
+            params["chat_id"],
+            caption=params.get("caption", ""),
+            document={
+                "file_id": file_id,
+                "file_unique_id": file_id,
+                "file_name": "calculation_result.xlsx",
+                "file_size": size,
+            },
+        )
+
+    async def api_answerCallbackQuery(self, params, files):
+        return True
+
+    async def api_editMessageText(self, params, files):
+        await self._record(
+            {"method": "editMessageText", "chat_id": int(params["chat_id"]), "text": params.get("text")}
+        )
+        return self._message(params["chat_id"], text=params.get("text", ""))
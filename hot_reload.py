@@ -0,0 +1,206 @@
+"""
+In-process code reload.
+
+When a .py file next to bot.py changes, the modules in RELOAD_ORDER are
+executed again from source into fresh module objects, the product stores
+(bot.RELOAD_STATE) are carried over, the indexes derived from them are
+rebuilt with the new classes (bot.rebuild_indexes), and the Application's
+handlers are swapped for the ones of the new bot module, all while update
+processing is paused. Save bursts from an editor are debounced into one
+reload.
+
+Anything else (a change to a module not in RELOAD_ORDER, new code that
+does not import, a pause that does not drain in time) falls back to a
+full restart: the bot stops cleanly and exits with RESTART_EXIT_CODE,
+which run_bot.py answers by starting it again.
+"""
+import asyncio
+import importlib.util
+import logging
+import os
+import sys
+
+import metrics
+from config import HOT_RELOAD_DEBOUNCE_SECONDS, SHUTDOWN_DRAIN_SECONDS
+
+
+logger = logging.getLogger(__name__)
+
+# exit code asking run_bot.py for a full restart
+RESTART_EXIT_CODE = 3
+
+# reloadable modules, each after the ones it imports from; the handler
+# module (bot) is always reloaded so it picks up the new functions.
+# price_history is left out on purpose: its object holds state that
+# cannot be rebuilt from the products, and carrying it over would keep
+# the old class code, so changing it restarts the bot
+RELOAD_ORDER = (
+    "parser",
+    "search_index",
+    "category_resolver",
+    "dedup_index",
+    "excel_builder",
+    "pricing",
+    "rollups",
+    "xlsx_writer",
+    "csv_export",
+    "excel_importer",
+    "export_cache",
+    "ui",
+    "bot",
+)
+
+
+def _fresh_module(name: str):
+    """Execute module `name` from its current source into a new module object."""
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.origin is None:
+        raise ImportError(f"No source for module {name}")
+    # a new spec, so a cached one does not point at the running module
+    spec = importlib.util.spec_from_file_location(name, spec.origin)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class HotReloader:
+    def __init__(
+        self,
+        app,
+        module,
+        directory: str | None = None,
+        debounce: float = HOT_RELOAD_DEBOUNCE_SECONDS,
+    ):
+        self.app = app
+        self.module = module  # the running handler module (bot or __main__)
+        self.directory = os.path.abspath(
+            directory or os.path.dirname(os.path.abspath(module.__file__))
+        )
+        self.debounce = debounce
+        self.restart_requested = False
+        self._on_restart = None
+        self._changed: set[str] = set()
+        self._timer: asyncio.TimerHandle | None = None
+        self._reloading: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._observer = None
+
+    def start(self, on_restart) -> None:
+        """Watch the directory; `on_restart()` stops the bot for a full restart."""
+        from watchdog.events import (
+            EVENT_TYPE_CREATED,
+            EVENT_TYPE_MODIFIED,
+            EVENT_TYPE_MOVED,
+            FileSystemEventHandler,
+        )
+        from watchdog.observers import Observer
+
+        # not "opened"/"closed": the reload itself reads every source file
+        writes = {EVENT_TYPE_CREATED, EVENT_TYPE_MODIFIED, EVENT_TYPE_MOVED}
+        reloader = self
+
+        class _Events(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory or event.event_type not in writes:
+                    return
+                # editors that save by rename report the real file as dest_path
+                for path in (event.src_path, getattr(event, "dest_path", "")):
+                    if path.endswith(".py"):
+                        reloader._loop.call_soon_threadsafe(
+                            reloader.file_changed, path
+                        )
+
+        self._on_restart = on_restart
+        self._loop = asyncio.get_running_loop()
+        self._observer = Observer()
+        self._observer.schedule(_Events(), self.directory, recursive=False)
+        self._observer.daemon = True
+        self._observer.start()
+        logger.info("Hot reload watching %s", self.directory)
+
+    def stop(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+
+    def file_changed(self, path: str) -> None:
+        """Record a change and (re)start the debounce timer."""
+        self._changed.add(os.path.splitext(os.path.basename(path))[0])
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self._loop.call_later(self.debounce, self._debounced)
+
+    def _debounced(self) -> None:
+        self._timer = None
+        if self._reloading is not None and not self._reloading.done():
+            # changes made during a reload get their own reload afterwards
+            self._reloading.add_done_callback(lambda _t: self._debounced())
+            return
+        changed, self._changed = self._changed, set()
+        if not changed:
+            return
+        self._reloading = asyncio.ensure_future(self.reload(changed))
+
+    async def reload(self, changed: set[str]) -> bool:
+        """Reload for the changed module names; False if a restart was requested."""
+        # scripts the bot never imports (bench.py, run_bot.py, ...) do not matter
+        changed = {n for n in changed if n in RELOAD_ORDER or n in sys.modules}
+        if not changed:
+            return True
+        unknown = sorted(changed - set(RELOAD_ORDER))
+        if unknown:
+            self.restart(f"{', '.join(unknown)} cannot be reloaded in-process")
+            return False
+
+        first = min(RELOAD_ORDER.index(name) for name in changed)
+        names = RELOAD_ORDER[first:]
+        try:
+            async with self.app.update_processor.paused(SHUTDOWN_DRAIN_SECONDS):
+                with metrics.span("hot_reload"):
+                    self._swap(names)
+        except Exception:
+            logger.exception("Hot reload of %s failed", ", ".join(names))
+            metrics.incr("hot_reload_failures")
+            self.restart("hot reload failed")
+            return False
+        metrics.incr("hot_reloads")
+        logger.info("Hot reloaded %s", ", ".join(names))
+        return True
+
+    def _swap(self, names: tuple[str, ...]) -> None:
+        """
+        Load the new modules, then move state and handlers over. Nothing of
+        the running bot is touched until every module has loaded.
+        """
+        previous = {name: sys.modules.get(name) for name in names}
+        try:
+            for name in names:
+                # later modules import the new versions of earlier ones
+                sys.modules[name] = _fresh_module(name)
+            new_bot = sys.modules[names[-1]]
+            handlers = new_bot.build_handlers()
+            for name in self.module.RELOAD_STATE:
+                setattr(new_bot, name, getattr(self.module, name))
+            new_bot.rebuild_indexes()
+        except BaseException:
+            for name, module in previous.items():
+                if module is None:
+                    sys.modules.pop(name, None)
+                else:
+                    sys.modules[name] = module
+            raise
+
+        for handler in list(self.app.handlers.get(0, ())):
+            self.app.remove_handler(handler)
+        self.app.add_handlers(handlers)
+        self.module = new_bot
+
+    def restart(self, reason: str) -> None:
+        if self.restart_requested:
+            return
+        logger.warning("Full restart: %s", reason)
+        self.restart_requested = True
+        if self._on_restart is not None:
+            self._on_restart()
@@ -0,0 +1,109 @@
+"""
+Cold-start import report for bot.py.
+
+    python importtime_report.py                     # top modules + total
+    python importtime_report.py --budget-ms 800     # exit 1 over budget
+
+Runs `python -X importtime -c "import bot"` in a fresh interpreter (the
+same cold start run_bot.py / watchdog.sh pay on every restart) and parses
+the "import time: self | cumulative | name" lines from stderr. The
+fastest of --runs cold starts is reported, so one noisy run does not fail
+the budget. Besides the time budget it fails if a module that should only
+load on first use (pandas, openpyxl, dateutil) is imported at start-up.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+# about 500-600 ms on the 1-core reference box; headroom for scheduler noise
+DEFAULT_BUDGET_MS = 800.0
+
+# heavy modules that only the Excel build / date fallback paths need
+LAZY_MODULES = ("pandas", "openpyxl", "dateutil")
+
+
+def measure(module: str = "bot") -> list[tuple[str, int, int]]:
+    """[(name, self_us, cumulative_us), ...] in import order."""
+    env = dict(os.environ)
+    # config.py reads BOT_TOKEN at import; the report never talks to Telegram
+    env.setdefault("BOT_TOKEN", "0:importtime")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            # the header line
+            continue
+        rows.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+    return rows
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Import-time report for bot.py")
+    ap.add_argument("--module", default="bot")
+    ap.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    ap.add_argument("--runs", type=int, default=3, help="cold starts, fastest is kept")
+    ap.add_argument("--top", type=int, default=15, help="slowest modules to list")
+    ap.add_argument("--json", metavar="PATH", help="write the parsed report here")
+    args = ap.parse_args(argv)
+
+    best = None
+    for _ in range(max(args.runs, 1)):
+        rows = measure(args.module)
+        by_name = {name: cumulative for name, _self, cumulative in rows}
+        total_ms = by_name.get(args.module, 0) / 1000
+        if best is None or total_ms < best[2]:
+            best = rows, by_name, total_ms
+    rows, by_name, total_ms = best
+
+    print(f"{'self ms':>9} {'cum ms':>9}  module")
+    for name, self_us, cumulative in sorted(
+        rows, key=lambda r: r[2], reverse=True
+    )[: args.top]:
+        print(f"{self_us / 1000:9.1f} {cumulative / 1000:9.1f}  {name}")
+    print(f"\nimport {args.module}: {total_ms:.1f} ms (budget {args.budget_ms:g} ms)")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"start-up import took {total_ms:.1f} ms")
+    eager = [m for m in LAZY_MODULES if m in by_name]
+    if eager:
+        failures.append("imported at start-up: " + ", ".join(eager))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "module": args.module,
+                    "total_ms": total_ms,
+                    "budget_ms": args.budget_ms,
+                    "modules": [
+                        {"name": n, "self_us": s, "cumulative_us": c}
+                        for n, s, c in rows
+                    ],
+                },
+                f,
+                indent=2,
+            )
+
+    for failure in failures:
+        print("FAIL:", failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
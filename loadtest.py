@@ -0,0 +1,152 @@
+"""
+End-to-end load test of bot.py against the local fake Bot API
+(fake_telegram.py) - no Telegram needed.
+
+    python loadtest.py --chats 20 --messages 5 --products 3
+    python loadtest.py --mode webhook --json loadtest.json
+
+Every simulated chat pastes a synthetic product list, waits for the bot's
+reply and sends the next one (closed loop). Reported latency is from the
+moment the update is available to the bot (queued for getUpdates, or
+POSTed to the webhook) until its reply reaches the fake API.
+Run it before and after a performance change and compare the numbers.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+
+import bot
+from fake_telegram import FakeTelegramAPI
+from synthetic import product_paste
+
+
+WEBHOOK_PORT = 18443
+WEBHOOK_SECRET = "loadtest"
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, round(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+async def _chat(fake, deliver, chat_id, messages, products, seed, latencies):
+    rng = random.Random(seed)
+    for i in range(messages):
+        update = fake.text_update(chat_id, product_paste(rng, products))
+        t0 = time.perf_counter()
+        await deliver(update)
+        await fake.wait_for_sent(i + 1, chat_id=chat_id, timeout=300)
+        latencies.append(time.perf_counter() - t0)
+
+
+async def run(chats: int, messages: int, products: int, mode: str, seed: int) -> dict:
+    fake = FakeTelegramAPI()
+    await fake.start()
+    app = bot.build_application("1:LOADTEST", base_url=fake.base_url)
+    latencies: list[float] = []
+
+    if mode == "webhook":
+        stop = asyncio.Event()
+        server = asyncio.create_task(
+            bot.run_webhook(
+                app,
+                url=f"http://127.0.0.1:{WEBHOOK_PORT}",
+                listen="127.0.0.1",
+                port=WEBHOOK_PORT,
+                path="loadtest",
+                secret_token=WEBHOOK_SECRET,
+                stop_event=stop,
+            )
+        )
+        while fake.webhook_url is None:
+            await asyncio.sleep(0.01)
+
+        async def deliver(update):
+            await fake.post_update(update, WEBHOOK_SECRET)
+
+    else:
+        await app.initialize()
+        await app.updater.start_polling(poll_interval=0, timeout=1)
+        await app.start()
+        deliver = fake.push_update
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _chat(fake, deliver, chat_id, messages, products, seed + chat_id, latencies)
+            for chat_id in range(1, chats + 1)
+        )
+    )
+    wall = time.perf_counter() - started
+
+    if mode == "webhook":
+        stop.set()
+        await server
+    else:
+        await app.updater.stop()
+        await app.stop()
+        await app.shutdown()
+    await fake.stop()
+
+    documents = [s for s in fake.sent if s["method"] == "sendDocument"]
+    upload_bytes = sum(s["bytes"] for s in documents)
+    return {
+        "mode": mode,
+        "chats": chats,
+        "messages_per_chat": messages,
+        "products_per_message": products,
+        "updates": len(latencies),
+        "wall_s": round(wall, 3),
+        "throughput_updates_per_s": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p95": round(percentile(latencies, 95) * 1000, 1),
+            "p99": round(percentile(latencies, 99) * 1000, 1),
+            "max": round(max(latencies, default=0) * 1000, 1),
+            "mean": round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+        },
+        "documents": len(documents),
+        "documents_by_file_id": sum(1 for s in documents if s["bytes"] == 0),
+        "upload_bytes": upload_bytes,
+        "upload_bytes_per_document": (
+            round(upload_bytes / len(documents)) if documents else 0
+        ),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--chats", type=int, default=10, help="simulated chats")
+    ap.add_argument("--messages", type=int, default=5, help="pastes per chat")
+    ap.add_argument("--products", type=int, default=3, help="products per paste")
+    ap.add_argument("--mode", choices=("polling", "webhook"), default="polling")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", help="also write the report to this file")
+    args = ap.parse_args(argv)
+
+    # bot.py logs every message at INFO
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    report = asyncio.run(
+        run(args.chats, args.messages, args.products, args.mode, args.seed)
+    )
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+In-process timing spans, counters and gauges.
+
+    with metrics.span("build_excel"):
+        ...
+
+Every span name gets a Histogram: fixed buckets (for Prometheus) plus the
+most recent samples (for rolling percentiles in /stats). With
+METRICS_ENABLED=0 span() hands back one shared no-op context manager, so
+disabled instrumentation costs a function call and an attribute lookup.
+"""
+import bisect
+import functools
+import math
+import time
+from collections import deque
+from contextlib import nullcontext
+
+from config import METRICS_ENABLED
+
+
+# bucket upper bounds in seconds
+BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf,
+)
+# samples kept per span for rolling percentiles
+WINDOW = 1024
+
+enabled = METRICS_ENABLED
+
+_NULL_SPAN = nullcontext()
+_histograms: dict[str, "Histogram"] = {}
+_counters: dict[str, float] = {}
+_gauges: dict[str, float] = {}
+
+
+class Histogram:
+    __slots__ = ("count", "total", "buckets", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.recent: deque[float] = deque(maxlen=WINDOW)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.recent.append(seconds)
+
+    def percentile(self, pct: float) -> float:
+        """Nearest-rank percentile over the recent window."""
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        rank = max(1, round(pct / 100 * len(ordered)))
+        return ordered[rank - 1]
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def span(name: str):
+    """Context manager timing its body into the `name` histogram."""
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def observe(name: str, seconds: float) -> None:
+    hist = _histograms.get(name)
+    if hist is None:
+        hist = _histograms[name] = Histogram()
+    hist.observe(seconds)
+
+
+def incr(name: str, value: float = 1) -> None:
+    if enabled:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name: str, value: float) -> None:
+    if enabled:
+        _gauges[name] = value
+
+
+def timed(fn, name: str | None = None):
+    """Wrap an async handler so its total run time lands in handler.<name>."""
+    label = "handler." + (name or fn.__name__)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        if not enabled:
+            return await fn(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            observe(label, time.perf_counter() - start)
+
+    return wrapper
+
+
+def reset() -> None:
+    _histograms.clear()
+    _counters.clear()
+    _gauges.clear()
+
+
+def stats_text() -> str:
+    """Human readable summary for /stats."""
+    if not enabled:
+        return "Metrics are disabled (METRICS_ENABLED=0)."
+    lines = ["⏱ Timings (ms, last %d samples):" % WINDOW]
+    for name in sorted(_histograms):
+        h = _histograms[name]
+        lines.append(
+            f"{name}: n={h.count} p50={h.percentile(50) * 1000:.1f} "
+            f"p95={h.percentile(95) * 1000:.1f} p99={h.percentile(99) * 1000:.1f} "
+            f"max={max(h.recent) * 1000:.1f}"
+        )
+    if _counters:
+        lines.append("\nCounters:")
+        lines.extend(f"{k}: {v:g}" for k, v in sorted(_counters.items()))
+    if _gauges:
+        lines.append("\nGauges:")
+        lines.extend(f"{k}: {v:g}" for k, v in sorted(_gauges.items()))
+    if len(lines) == 1:
+        lines.append("no samples yet")
+    return "\n".join(lines)
+
+
+def _metric_name(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+def prometheus_text() -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    out = [
+        "# HELP bot_span_seconds Time spent per handler / stage.",
+        "# TYPE bot_span_seconds histogram",
+    ]
+    for name in sorted(_histograms):
+        h = _histograms[name]
+        cumulative = 0
+        for bound, count in zip(BUCKETS, h.buckets):
+            cumulative += count
+            le = "+Inf" if bound == math.inf else repr(bound)
+            out.append(
+                f'bot_span_seconds_bucket{{span="{name}",le="{le}"}} {cumulative}'
+            )
+        out.append(f'bot_span_seconds_sum{{span="{name}"}} {h.total}')
+        out.append(f'bot_span_seconds_count{{span="{name}"}} {h.count}')
+    for name, value in sorted(_counters.items()):
+        metric = f"bot_{_metric_name(name)}_total"
+        out.append(f"# TYPE {metric} counter")
+        out.append(f"{metric} {value:g}")
+    for name, value in sorted(_gauges.items()):
+        metric = f"bot_{_metric_name(name)}"
+        out.append(f"# TYPE {metric} gauge")
+        out.append(f"{metric} {value:g}")
+    return "\n".join(out) + "\n"
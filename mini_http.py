@@ -0,0 +1,210 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit, parse_qs
+
+
+logger = logging.getLogger(__name__)
+
+
+# limits for a listener that may face the internet (the webhook); Telegram
+# updates are a few KiB. fake_telegram.py raises max_body_bytes for uploads
+MAX_BODY_BYTES = 1024 * 1024
+MAX_LINE_BYTES = 8 * 1024
+MAX_HEADERS = 100
+# a request has this long from its first byte to its last; an idle
+# keep-alive connection this long to start the next one
+READ_TIMEOUT_SECONDS = 10.0
+IDLE_TIMEOUT_SECONDS = 60.0
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    501: "Not Implemented",
+    503: "Service Unavailable",
+}
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: dict[str, list[str]]
+    headers: dict[str, str]  # lower-case names
+    body: bytes
+
+
+@dataclass
+class Response:
+    status: int = 200
+    body: bytes = b""
+    content_type: str = "text/plain; charset=utf-8"
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+class HttpServer:
+    """
+    Minimal HTTP/1.1 server on asyncio streams (keep-alive, Content-Length
+    bodies only). Enough for Telegram webhooks, health checks and metrics
+    without pulling in an ASGI/aiohttp stack.
+
+    `handler` is an async callable Request -> Response.
+    stop() stops accepting, lets in-flight requests finish, then closes
+    idle keep-alive connections.
+
+    Malformed or oversized requests (long lines, too many headers, a bad
+    or negative Content-Length, Transfer-Encoding, a body over
+    max_body_bytes) get a 4xx/501 and the connection is closed. So is a
+    connection that takes longer than read_timeout to send a request, or
+    stays idle longer than idle_timeout between requests.
+    """
+
+    def __init__(
+        self,
+        handler,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        max_body_bytes: int = MAX_BODY_BYTES,
+        read_timeout: float = READ_TIMEOUT_SECONDS,
+        idle_timeout: float = IDLE_TIMEOUT_SECONDS,
+    ):
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.max_body_bytes = max_body_bytes
+        self.read_timeout = read_timeout
+        self.idle_timeout = idle_timeout
+        self._server: asyncio.base_events.Server | None = None
+        self._writers: set[asyncio.StreamWriter] = set()
+        self._busy = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._closing = False
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(
+            self._serve, self.host, self.port, limit=MAX_LINE_BYTES
+        )
+        # port=0 -> pick the one the OS assigned
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        if self._server is None:
+            return
+        self._closing = True
+        self._server.close()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("HTTP server stopped with %d request(s) in flight", self._busy)
+        for writer in list(self._writers):
+            writer.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    async def _serve(self, reader, writer) -> None:
+        self._writers.add(writer)
+        try:
+            while not self._closing:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                if isinstance(request, Response):
+                    await self._write(writer, request, close=True)
+                    break
+
+                self._busy += 1
+                self._idle.clear()
+                try:
+                    try:
+                        response = await self.handler(request)
+                    except Exception:
+                        logger.exception("Error handling %s %s", request.method, request.path)
+                        response = Response(500, b"internal error")
+                    close = (
+                        self._closing
+                        or request.headers.get("connection", "").lower() == "close"
+                    )
+                    await self._write(writer, response, close=close)
+                finally:
+                    self._busy -= 1
+                    if self._busy == 0:
+                        self._idle.set()
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _read_request(self, reader):
+        """
+        The next Request, None when the client is gone or too slow, or an
+        error Response to send before closing.
+        """
+        try:
+            line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+            if not line:
+                return None
+            return await asyncio.wait_for(
+                self._read_rest(reader, line), self.read_timeout
+            )
+        except ValueError:
+            # a line over MAX_LINE_BYTES (StreamReader's LimitOverrunError)
+            return Response(431, b"line too long")
+        except asyncio.TimeoutError:
+            return None
+
+    async def _read_rest(self, reader, line: bytes):
+        try:
+            method, target, _version = line.decode("latin-1").split()
+        except ValueError:
+            return Response(400, b"bad request line")
+
+        headers: dict[str, str] = {}
+        for _ in range(MAX_HEADERS + 1):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            return Response(431, b"too many headers")
+
+        if headers.get("transfer-encoding", "identity").lower() != "identity":
+            # chunked bodies are not supported; reading on would take the
+            # chunks for the next request
+            return Response(501, b"transfer-encoding not supported")
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            return Response(400, b"bad content-length")
+        if length < 0:
+            return Response(400, b"bad content-length")
+        if length > self.max_body_bytes:
+            return Response(413, b"body too large")
+        body = await reader.readexactly(length) if length else b""
+
+        url = urlsplit(target)
+        return Request(method.upper(), url.path, parse_qs(url.query), headers, body)
+
+    @staticmethod
+    async def _write(writer, response: Response, close: bool) -> None:
+        head = [
+            f"HTTP/1.1 {response.status} {_REASONS.get(response.status, 'Unknown')}",
+            f"Content-Type: {response.content_type}",
+            f"Content-Length: {len(response.body)}",
+            f"Connection: {'close' if close else 'keep-alive'}",
+        ]
+        head.extend(f"{k}: {v}" for k, v in response.headers.items())
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        writer.write(response.body)
+        await writer.drain()
@@ -0,0 +1,130 @@
+"""
+Check of mini_http.HttpServer against malformed and hostile clients
+(it serves the public webhook).
+
+    python mini_http_check.py
+
+Sends raw requests over a socket and checks the answer (or that the
+server hangs up): a normal keep-alive exchange, a line over the limit,
+too many headers, negative and oversized Content-Length, chunked
+Transfer-Encoding, and slow or idle clients. Exits 1 and lists what
+went wrong otherwise.
+"""
+import asyncio
+import sys
+import time
+
+from mini_http import MAX_HEADERS, MAX_LINE_BYTES, HttpServer, Response
+
+
+READ_TIMEOUT = 0.5
+IDLE_TIMEOUT = 1.0
+MAX_BODY = 1024
+
+
+async def _handler(request):
+    return Response(200, b"got " + request.body)
+
+
+async def _exchange(port: int, data: bytes, pause: float = 0.0, wait: float = 5.0) -> bytes:
+    """Send data (after `pause` seconds), return all the server sent until it closed."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        if pause:
+            writer.write(data[:5])
+            await writer.drain()
+            await asyncio.sleep(pause)
+            data = data[5:]
+        writer.write(data)
+        await writer.drain()
+        return await asyncio.wait_for(reader.read(), wait)
+    except ConnectionError:
+        return b""
+    finally:
+        writer.close()
+
+
+def _status(answer: bytes) -> int | None:
+    parts = answer.split(b" ", 2)
+    return int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+
+
+async def run() -> list[str]:
+    server = HttpServer(
+        _handler,
+        max_body_bytes=MAX_BODY,
+        read_timeout=READ_TIMEOUT,
+        idle_timeout=IDLE_TIMEOUT,
+    )
+    await server.start()
+    port = server.port
+    post = b"POST /hook HTTP/1.1\r\nHost: x\r\n"
+    problems = []
+
+    # two requests on one connection, then the idle timeout closes it
+    start = time.perf_counter()
+    answer = await _exchange(
+        port,
+        post + b"Content-Length: 2\r\n\r\nhi" + post + b"Content-Length: 2\r\n\r\nyo",
+    )
+    took = time.perf_counter() - start
+    if answer.count(b"HTTP/1.1 200") != 2 or b"got yo" not in answer:
+        problems.append(f"keep-alive: {answer[:200]!r}")
+    if not IDLE_TIMEOUT <= took < IDLE_TIMEOUT + 2:
+        problems.append(f"idle connection closed after {took:.2f} s")
+
+    cases = [
+        ("long line", b"GET /" + b"a" * (MAX_LINE_BYTES * 2) + b" HTTP/1.1\r\n\r\n", 431),
+        (
+            "too many headers",
+            b"GET / HTTP/1.1\r\n" + b"X-A: b\r\n" * (MAX_HEADERS + 1) + b"\r\n",
+            431,
+        ),
+        ("negative length", post + b"Content-Length: -5\r\n\r\n", 400),
+        ("bad length", post + b"Content-Length: x\r\n\r\n", 400),
+        ("large body", post + b"Content-Length: %d\r\n\r\n" % (MAX_BODY + 1), 413),
+        (
+            "chunked",
+            post + b"Transfer-Encoding: chunked\r\n\r\n4\r\nGET \r\n0\r\n\r\n",
+            501,
+        ),
+        ("bad request line", b"NONSENSE\r\n\r\n", 400),
+    ]
+    for name, data, want in cases:
+        answer = await _exchange(port, data)
+        if _status(answer) != want:
+            problems.append(f"{name}: {answer[:80]!r}, expected {want}")
+        if answer.count(b"HTTP/1.1") != 1:
+            problems.append(f"{name}: more than one response")
+
+    # slowloris: headers dribbled in past the read timeout
+    start = time.perf_counter()
+    answer = await _exchange(port, post + b"Content-Length: 2\r\n\r\nhi", pause=READ_TIMEOUT * 3)
+    if answer:
+        problems.append(f"slow request was answered: {answer[:80]!r}")
+    if time.perf_counter() - start > READ_TIMEOUT * 3 + 2:
+        problems.append("slow request held the connection")
+
+    # a body that never arrives
+    start = time.perf_counter()
+    answer = await _exchange(port, post + b"Content-Length: 100\r\n\r\nx")
+    if answer or time.perf_counter() - start > READ_TIMEOUT + 2:
+        problems.append(f"short body: {answer[:80]!r} after {time.perf_counter() - start:.2f} s")
+
+    await server.stop(timeout=1)
+    return problems
+
+
+def main():
+    problems = asyncio.run(run())
+    for problem in problems:
+        print(problem)
+    if problems:
+        print("FAIL")
+        return 1
+    print("OK: bad requests are refused and slow clients dropped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+Outbound rate limiting for Bot API calls.
+
+Every request that targets a chat (it has a chat_id: sendMessage,
+sendDocument, editMessageText, ...) waits for a token from a global
+bucket and from its chat's bucket before it is sent, so bursts from many
+chats stay under Telegram's flood limits instead of collecting 429s.
+Waiting requests are granted in priority order - text replies and
+acknowledgements before documents - then oldest first. A 429
+(RetryAfter) pauses all sending for the time Telegram asks and the call
+is retried with exponential backoff.
+
+Calls without a chat_id (getUpdates, getFile, setWebhook, ...) are not
+limited. The queue depth is the outbound_queue gauge and the time spent
+waiting the outbound_wait histogram (/stats, /metrics).
+"""
+import asyncio
+import logging
+import time
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+import metrics
+from config import (
+    OUTBOUND_CHAT_BURST,
+    OUTBOUND_CHAT_RATE,
+    OUTBOUND_GLOBAL_RATE,
+    OUTBOUND_GROUP_RATE,
+    OUTBOUND_MAX_RETRIES,
+)
+
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_TEXT = 0
+PRIORITY_BULK = 1
+# large uploads, sent after any waiting text
+BULK_METHODS = frozenset(
+    {
+        "sendDocument",
+        "sendPhoto",
+        "sendVideo",
+        "sendAudio",
+        "sendAnimation",
+        "sendVoice",
+        "sendMediaGroup",
+    }
+)
+# first retry waits at least this long, doubling per attempt
+BACKOFF_SECONDS = 1.0
+# idle full chat buckets are dropped once there are more than this
+MAX_IDLE_BUCKETS = 1024
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "stamp")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.stamp = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is now)."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "chat_id", "future")
+
+    def __init__(self, priority: int, seq: int, chat_id, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.chat_id = chat_id
+        self.future = future
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class OutboundLimiter(BaseRateLimiter):
+    """
+    BaseRateLimiter for ApplicationBuilder.rate_limiter(). A call can pass
+    rate_limit_args={"priority": PRIORITY_BULK} to override its priority.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = OUTBOUND_GLOBAL_RATE,
+        chat_rate: float = OUTBOUND_CHAT_RATE,
+        chat_burst: float = OUTBOUND_CHAT_BURST,
+        group_rate: float = OUTBOUND_GROUP_RATE,
+        max_retries: int = OUTBOUND_MAX_RETRIES,
+    ):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, max(1.0, global_rate))
+        self._chats: dict[object, TokenBucket] = {}
+        self._waiting: list[_Waiter] = []
+        self._seq = 0
+        # no tokens are handed out before this (monotonic) time after a 429
+        self._blocked_until = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for waiter in self._waiting:
+            waiter.future.cancel()
+        self._waiting.clear()
+
+    def _bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # group / channel chats have negative ids and a far lower limit
+            group = isinstance(chat_id, int) and chat_id < 0
+            if group:
+                bucket = TokenBucket(self.group_rate, 1)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _grant(self) -> float:
+        """
+        Hand out every token available now; return how long to sleep before
+        the next one could be (inf when nobody waits).
+        """
+        now = time.monotonic()
+        while self._waiting:
+            wait = max(self._blocked_until - now, self._global.delay(now))
+            if wait > 0:
+                return wait
+            chosen = None
+            wait = float("inf")
+            for waiter in sorted(self._waiting):
+                chat_wait = self._bucket(waiter.chat_id).delay(now)
+                if chat_wait == 0:
+                    chosen = waiter
+                    break
+                wait = min(wait, chat_wait)
+            if chosen is None:
+                return wait
+            self._waiting.remove(chosen)
+            self._global.take()
+            self._bucket(chosen.chat_id).take()
+            chosen.future.set_result(None)
+
+        if len(self._chats) > MAX_IDLE_BUCKETS:
+            busy = {waiter.chat_id for waiter in self._waiting}
+            for chat_id in [c for c, b in self._chats.items() if b.full(now)]:
+                if chat_id not in busy:
+                    del self._chats[chat_id]
+        return float("inf")
+
+    async def _dispatch(self) -> None:
+        while True:
+            self._wakeup.clear()
+            wait = self._grant()
+            metrics.set_gauge("outbound_queue", len(self._waiting))
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), None if wait == float("inf") else wait
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    async def _acquire(self, priority: int, chat_id) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._dispatch())
+        self._seq += 1
+        waiter = _Waiter(priority, self._seq, chat_id, asyncio.Future())
+        self._waiting.append(waiter)
+        self._wakeup.set()
+        start = time.perf_counter()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter in self._waiting:
+                self._waiting.remove(waiter)
+            raise
+        if metrics.enabled:
+            metrics.observe("outbound_wait", time.perf_counter() - start)
+
+    async def process_request(
+        self, callback, args, kwargs, endpoint, data, rate_limit_args
+    ):
+        chat_id = data.get("chat_id")
+        if chat_id is None:
+            return await callback(*args, **kwargs)
+
+        priority = PRIORITY_BULK if endpoint in BULK_METHODS else PRIORITY_TEXT
+        if isinstance(rate_limit_args, dict):
+            priority = rate_limit_args.get("priority", priority)
+
+        attempt = 0
+        while True:
+            await self._acquire(priority, chat_id)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as exc:
+                metrics.incr("outbound_429")
+                if attempt >= self.max_retries:
+                    raise
+                delay = max(float(exc.retry_after), BACKOFF_SECONDS * 2**attempt)
+                attempt += 1
+                logger.warning(
+                    "%s to %s hit flood control, retry %d in %.1fs",
+                    endpoint,
+                    chat_id,
+                    attempt,
+                    delay,
+                )
+                self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+                self._wakeup.set()
+                metrics.incr("outbound_retries")
@@ -1,18 +1,99 @@
+import datetime
 import re
-from dateutil import parser as dateparser
+import time
 
 
-def _extract_value(text, key_pattern):
-    pattern = rf"^\s*({key_pattern})\s*:\s*(.*)$"
+# formats users actually type; anything else goes to dateutil (imported on
+# first use, it is not needed for the common case). Each must give the
+# same date as dateutil with dayfirst=True: not "%Y-%m-%d", which dateutil
+# reads as year-day-month (parser_fuzz.py checks this)
+_DATE_FORMATS = ("%d.%m.%Y", "%d/%m/%Y", "%d-%m-%Y")
+
+
+def parse_date(value: str) -> datetime.date:
+    """
+    Day-first date parsing ('24.11.2025'). Raises ValueError when the
+    value is not a date.
+    """
+    value = value.strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+
+    from dateutil import parser as dateparser
+
+    try:
+        return dateparser.parse(value, dayfirst=True).date()
+    except OverflowError as e:
+        raise ValueError(str(e)) from e
+
+
+# limits on what one message may ask of the parser (it runs on the event
+# loop): longer lines are not field lines and are skipped, more blocks or
+# more CPU time than this rejects the whole message
+MAX_LINE_CHARS = 1000
+MAX_BLOCKS = 1000
+PARSE_BUDGET_SECONDS = 1.0
+# longer Date values are not dates (and would be slow for dateutil)
+MAX_DATE_CHARS = 64
+
+
+class ParseError(ValueError):
+    """A message over the parser's limits."""
+
+
+# "Key: value" keys, lowercased without whitespace -> field
+_KEYS = {
+    "date": "date",
+    "address": "address",
+    "addresss": "address",
+    "outlet-type": "outlet_type",
+    "category": "category",
+    "sub-category": "sub_category",
+    "brand": "brand",
+    "packaging": "packaging",
+    "size": "size",
+    "packs": "packs",
+    "weightperctn": "weight",
+    "buy-in": "buy_in",
+    "scheme(base)": "scheme",
+    "scheme": "scheme",
+    "foc": "foc",
+    "discount(%)": "discount_pct",
+    "discount($)": "discount_value",
+    "directdisc.(%)": "direct_disc_pct",
+    "directdisc($)": "direct_disc_value",
+    "mark-up": "mark_up",
+    "markup": "mark_up",
+    "sellout($)": "sell_out",
+    "priceunit": "price_unit",
+}
+_LONGEST_KEY = max(len(k) for k in _KEYS)
+
+
+def _fields(text: str) -> dict[str, str | None]:
+    """
+    The "Key: value" lines of a block by field, first occurrence wins and
+    an empty value is None. One pass over the lines with plain string
+    operations, so the cost is linear in the text whatever it contains.
+    """
+    fields = {}
     for line in text.splitlines():
-        m = re.match(pattern, line, re.IGNORECASE)
-        if m:
-            value = m.group(2)
-            if value is None:
-                return None
-            value = value.strip()
-            return value if value != "" else None
-    return None
+        if len(line) > MAX_LINE_CHARS:
+            continue
+        key, colon, value = line.partition(":")
+        # cheap reject before normalizing free text
+        if not colon or len(key) > 4 * _LONGEST_KEY:
+            continue
+        field = _KEYS.get("".join(key.split()).lower())
+        if field is not None and field not in fields:
+            fields[field] = value.strip() or None
+    return fields
+
+
+_NON_NUMERIC = re.compile(r"[^0-9.\-]")
 
 
 def num_or_none(value):
@@ -27,7 +108,7 @@ def num_or_none(value):
     # support comma decimal as well
     v = v.replace(",", ".")
     # remove currency symbols and letters, keep digits . and -
-    v = re.sub(r"[^0-9.\-]", "", v)
+    v = _NON_NUMERIC.sub("", v)
 
     if v in {"", "-", ".", "-.", ".-"}:
         return None
@@ -39,75 +120,78 @@ def num_or_none(value):
 
 
 def parse_message(text: str) -> dict:
+    f = _fields(text)
     d = {}
 
     # Date
-    d["date_raw"] = _extract_value(text, r"Date")
-    if d["date_raw"]:
+    d["date_raw"] = f.get("date")
+    d["date"] = None
+    if d["date_raw"] and len(d["date_raw"]) <= MAX_DATE_CHARS:
         try:
-            d["date"] = dateparser.parse(
-                d["date_raw"],
-                dayfirst=True,
-            ).date()
+            d["date"] = parse_date(d["date_raw"])
         except Exception:
-            d["date"] = None
-    else:
-        d["date"] = None
+            pass
 
     # Address / Addresss
-    d["address"] = _extract_value(text, r"Addresss|Address")
+    d["address"] = f.get("address")
 
-    d["outlet_type"] = _extract_value(text, r"Outlet-Type")
-    d["category"] = _extract_value(text, r"Category")
-    d["sub_category"] = _extract_value(text, r"Sub-Category")
-    d["brand"] = _extract_value(text, r"Brand")
-    d["packaging"] = _extract_value(text, r"Packaging")
+    d["outlet_type"] = f.get("outlet_type")
+    d["category"] = f.get("category")
+    d["sub_category"] = f.get("sub_category")
+    d["brand"] = f.get("brand")
+    d["packaging"] = f.get("packaging")
 
-    d["size_raw"] = _extract_value(text, r"Size")
-    d["packs_raw"] = _extract_value(text, r"Packs")
-    d["weight_raw"] = _extract_value(text, r"Weight per Ctn")
+    d["size_raw"] = f.get("size")
+    d["packs_raw"] = f.get("packs")
+    d["weight_raw"] = f.get("weight")
 
     d["size_ml"] = num_or_none(d["size_raw"])
     packs_val = num_or_none(d["packs_raw"])
     d["packs"] = int(packs_val) if packs_val is not None else None
     d["weight_ctn_l"] = num_or_none(d["weight_raw"])
 
-    d["buy_in"] = num_or_none(_extract_value(text, r"Buy-in"))
+    d["buy_in"] = num_or_none(f.get("buy_in"))
 
-    d["scheme_base_raw"] = _extract_value(
-        text,
-        r"Scheme\(base\)|Scheme\(Base\)|Scheme",
-    )
+    d["scheme_base_raw"] = f.get("scheme")
     d["scheme_base"] = num_or_none(d["scheme_base_raw"])
 
-    d["foc_raw"] = _extract_value(text, r"FOC")
+    d["foc_raw"] = f.get("foc")
     d["foc"] = num_or_none(d["foc_raw"])
 
-    d["discount_pct"] = num_or_none(
-        _extract_value(text, r"Discount\(%\)"),
-    )
-    d["discount_value"] = num_or_none(
-        _extract_value(text, r"Discount\(\$\)"),
-    )
+    d["discount_pct"] = num_or_none(f.get("discount_pct"))
+    d["discount_value"] = num_or_none(f.get("discount_value"))
 
-    d["direct_disc_pct"] = num_or_none(
-        _extract_value(text, r"Direct Disc\.\(%\)"),
-    )
-    d["direct_disc_value"] = num_or_none(
-        _extract_value(text, r"Direct Disc\(\$\)"),
-    )
+    d["direct_disc_pct"] = num_or_none(f.get("direct_disc_pct"))
+    d["direct_disc_value"] = num_or_none(f.get("direct_disc_value"))
 
-    d["mark_up"] = num_or_none(
-        _extract_value(text, r"Mark\s*-\s*up|Mark\s*up"),
-    )
+    d["mark_up"] = num_or_none(f.get("mark_up"))
 
-    sell_out_raw = _extract_value(text, r"Sell Out \(\$\)")
-    d["sell_out_usd"] = num_or_none(sell_out_raw)
+    d["sell_out_usd"] = num_or_none(f.get("sell_out"))
 
-    price_unit_raw = _extract_value(text, r"Price Unit")
-    d["price_unit_khr"] = num_or_none(price_unit_raw)
+    d["price_unit_khr"] = num_or_none(f.get("price_unit"))
 
     # Exchange rate always default in calculations
     d["exchange_rate"] = None
 
     return d
+
+
+def split_blocks(text: str) -> list[str]:
+    """The product blocks of a message: "---" separated, each with a Date."""
+    blocks = [b for b in text.split("---") if "Date:" in b]
+    if len(blocks) > MAX_BLOCKS:
+        raise ParseError(
+            f"Too many products in one message ({len(blocks)}, at most {MAX_BLOCKS})."
+        )
+    return blocks
+
+
+def parse_blocks(blocks: list[str], budget: float = PARSE_BUDGET_SECONDS) -> list[dict]:
+    """parse_message over blocks, giving up after `budget` seconds of CPU time."""
+    deadline = time.thread_time() + budget
+    parsed = []
+    for block in blocks:
+        parsed.append(parse_message(block))
+        if time.thread_time() > deadline:
+            raise ParseError("Message too large to process; send fewer products at once.")
+    return parsed
@@ -0,0 +1,291 @@
+"""
+Fuzz and worst-case timing harness for parser.py.
+
+    python parser_fuzz.py                    # 2000 cases, sizes up to 256 KiB
+    python parser_fuzz.py --cases 20000 --max-kib 4096
+
+Four checks, exit 1 if any fails:
+
+  * equivalence: parse_message agrees with the original regex extractor
+    (kept below as reference_parse) on synthetic blocks with random case,
+    spacing, comments, blank values, duplicate keys and junk lines;
+  * dates: parse_date's strptime fast path gives the same date as the
+    dateutil dayfirst fallback it shortcuts, for every layout tried;
+  * fuzz: random text built from parser-relevant pieces (colons, key
+    names, whitespace runs, "---", Khmer, digits) never raises;
+  * scaling: for each pathological input family the parse time per KiB
+    at the largest size stays within --slack of the smallest size, i.e.
+    worst-case parse time grows linearly with the input.
+"""
+import argparse
+import math
+import random
+import re
+import sys
+import time
+
+from parser import (
+    MAX_DATE_CHARS,
+    num_or_none,
+    parse_blocks,
+    parse_date,
+    parse_message,
+    split_blocks,
+)
+from synthetic import product_block
+
+
+MAX_REPORTED = 10
+
+
+# ---- reference: the regex extractor parse_message used to be built on ----
+
+def _reference_extract(text, key_pattern):
+    pattern = rf"^\s*({key_pattern})\s*:\s*(.*)$"
+    for line in text.splitlines():
+        m = re.match(pattern, line, re.IGNORECASE)
+        if m:
+            value = m.group(2).strip()
+            return value if value != "" else None
+    return None
+
+
+_REFERENCE_KEYS = {
+    "date_raw": r"Date",
+    "address": r"Addresss|Address",
+    "outlet_type": r"Outlet-Type",
+    "category": r"Category",
+    "sub_category": r"Sub-Category",
+    "brand": r"Brand",
+    "packaging": r"Packaging",
+    "size_raw": r"Size",
+    "packs_raw": r"Packs",
+    "weight_raw": r"Weight per Ctn",
+    "buy_in": r"Buy-in",
+    "scheme_base_raw": r"Scheme\(base\)|Scheme\(Base\)|Scheme",
+    "foc_raw": r"FOC",
+    "discount_pct": r"Discount\(%\)",
+    "discount_value": r"Discount\(\$\)",
+    "direct_disc_pct": r"Direct Disc\.\(%\)",
+    "direct_disc_value": r"Direct Disc\(\$\)",
+    "mark_up": r"Mark\s*-\s*up|Mark\s*up",
+    "sell_out_usd": r"Sell Out \(\$\)",
+    "price_unit_khr": r"Price Unit",
+}
+_RAW_FIELDS = {
+    "date_raw",
+    "address",
+    "outlet_type",
+    "category",
+    "sub_category",
+    "brand",
+    "packaging",
+    "size_raw",
+    "packs_raw",
+    "weight_raw",
+    "scheme_base_raw",
+    "foc_raw",
+}
+
+
+def reference_parse(text: str) -> dict:
+    """The fields parse_message derives, the way the regex parser did."""
+    d = {}
+    for field, pattern in _REFERENCE_KEYS.items():
+        value = _reference_extract(text, pattern)
+        d[field] = value if field in _RAW_FIELDS else num_or_none(value)
+    d["date"] = None
+    if d["date_raw"] and len(d["date_raw"]) <= MAX_DATE_CHARS:
+        try:
+            d["date"] = parse_date(d["date_raw"])
+        except Exception:
+            pass
+    return d
+
+
+# ---- equivalence -----------------------------------------------------------
+
+def _mutate_line(rng: random.Random, line: str) -> str:
+    key, colon, value = line.partition(":")
+    if not colon:
+        return line
+    choice = rng.randrange(6)
+    if choice == 0:
+        key = key.upper() if rng.random() < 0.5 else key.lower()
+    elif choice == 1:
+        key = " " * rng.randrange(4) + key + "\t" * rng.randrange(3)
+    elif choice == 2:
+        value = " " * rng.randrange(5)
+    elif choice == 3:
+        value = value + "   # ត្រូវតែបំពេញ"
+    elif choice == 4:
+        value = value.replace(".", ",")
+    return key + colon + value
+
+
+def sample_block(rng: random.Random) -> str:
+    lines = [_mutate_line(rng, line) for line in product_block(rng).splitlines()]
+    if rng.random() < 0.3:
+        # a later duplicate key never wins
+        lines.append(rng.choice(lines).partition(":")[0] + ": 999")
+    if rng.random() < 0.3:
+        lines.insert(rng.randrange(len(lines) + 1), "note: call back tomorrow")
+    if rng.random() < 0.2:
+        rng.shuffle(lines)
+    return "\n".join(lines)
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, float) and isinstance(b, float):
+        return a == b or (math.isnan(a) and math.isnan(b))
+    return a == b
+
+
+def check_equivalence(cases: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    diffs = []
+    for _ in range(cases):
+        block = sample_block(rng)
+        got, want = parse_message(block), reference_parse(block)
+        for field, value in want.items():
+            if not _same(got[field], value):
+                diffs.append(f"{field}: {got[field]!r} != {value!r} in\n{block}")
+    return diffs
+
+
+# ---- dates -----------------------------------------------------------------
+
+def _date_texts(rng: random.Random) -> list[str]:
+    """One random date written in the layouts users send, both orders."""
+    day, month = rng.randint(1, 28), rng.randint(1, 12)
+    year = rng.choice((rng.randint(1990, 2040), rng.randint(1, 99)))
+    texts = []
+    for sep in "./-":
+        for d, m in ((f"{day}", f"{month}"), (f"{day:02d}", f"{month:02d}")):
+            for y in (f"{year}", f"{year:02d}", f"{year:04d}"):
+                texts.append(sep.join((d, m, y)))
+                texts.append(sep.join((y, m, d)))
+    return texts
+
+
+def check_dates(cases: int, seed: int) -> list[str]:
+    from dateutil import parser as dateparser
+
+    rng = random.Random(seed)
+    diffs = []
+    for _ in range(cases):
+        for text in _date_texts(rng):
+            try:
+                want = dateparser.parse(text, dayfirst=True).date()
+            except (ValueError, OverflowError):
+                continue
+            got = parse_date(text)
+            if got != want:
+                diffs.append(f"{text!r}: {got} != dateutil {want}")
+    return diffs
+
+
+# ---- fuzz ------------------------------------------------------------------
+
+_PIECES = [
+    ":", "::", " ", "\t", "   ", "\n", "\r\n", "---", "Date:", "Date", "Mark",
+    "-", "up", "Scheme(", "base)", "(%)", "($)", "Price Unit", "Buy-in", "$",
+    ".", ",", "0", "15.90", "1,000", "ត្រូវតែបំពេញ", "#", " ", "\x00",
+    "Size", "ml", "24.11.2025", "x" * 50,
+]
+
+
+def fuzz_text(rng: random.Random, pieces: int) -> str:
+    return "".join(rng.choice(_PIECES) for _ in range(pieces))
+
+
+def check_fuzz(cases: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    failures = []
+    for _ in range(cases):
+        text = fuzz_text(rng, rng.randrange(1, 400))
+        try:
+            parse_blocks(split_blocks(text), budget=math.inf)
+            parse_message(text)
+        except Exception as e:
+            failures.append(f"{type(e).__name__}: {e} for {text[:200]!r}")
+    return failures
+
+
+# ---- scaling ---------------------------------------------------------------
+
+# name -> text of about `size` characters
+FAMILIES = {
+    "long whitespace line": lambda size: "Date:" + " " * size,
+    "key then spaces, no colon": lambda size: "Mark" + " " * size + "-",
+    "many colons": lambda size: "Date: 1\n" + ":" * size,
+    "many short lines": lambda size: "Date: 1\n" + "Mark - up\n" * (size // 10),
+    "whitespace lines": lambda size: "Date: 1\n" + (" " * 900 + "\n") * (size // 901),
+    "long numeric value": lambda size: "Date: 1\nBuy-in: " + "1,$" * (size // 3),
+    "many blocks": lambda size: "---".join(
+        ["Date: 24.11.2025\nBuy-in: 1\n"] * min(size // 30, 1000)
+    ),
+}
+
+
+def _time(text: str, repeat: int = 3) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse_blocks(split_blocks(text), budget=math.inf)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_scaling(max_kib: int, slack: float) -> tuple[list[str], list[str]]:
+    """(report lines, failures): us/KiB per family from 16 KiB to max_kib."""
+    sizes = []
+    size = 16 * 1024
+    while size <= max_kib * 1024:
+        sizes.append(size)
+        size *= 4
+    report, failures = [], []
+    for name, make in FAMILIES.items():
+        per_kib = []
+        for size in sizes:
+            text = make(size)
+            per_kib.append(_time(text) * 1e6 / (len(text) / 1024))
+        report.append(
+            f"{name:28s} " + "  ".join(f"{v:8.1f}" for v in per_kib) + "  us/KiB"
+        )
+        if per_kib[-1] > slack * max(per_kib[0], 1.0):
+            failures.append(f"{name}: {per_kib[0]:.1f} -> {per_kib[-1]:.1f} us/KiB")
+    header = "sizes (KiB)                  " + "  ".join(f"{s // 1024:8d}" for s in sizes)
+    return [header, *report], failures
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Parser fuzz and worst-case timing")
+    ap.add_argument("--cases", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--max-kib", type=int, default=256, help="largest scaling input")
+    ap.add_argument("--slack", type=float, default=3.0, help="allowed us/KiB growth")
+    args = ap.parse_args(argv)
+
+    failed = False
+    for name, problems in (
+        ("equivalence", check_equivalence(args.cases, args.seed)),
+        ("dates", check_dates(args.cases // 10, args.seed)),
+        ("fuzz", check_fuzz(args.cases, args.seed)),
+    ):
+        for problem in problems[:MAX_REPORTED]:
+            print(problem)
+        print(f"{name}: {'FAIL' if problems else 'OK'} ({len(problems)} problem(s))")
+        failed |= bool(problems)
+
+    report, problems = check_scaling(args.max_kib, args.slack)
+    print("\n".join(report))
+    for problem in problems:
+        print(problem)
+    print(f"scaling: {'FAIL' if problems else 'OK'}")
+    failed |= bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Price history: every saved product's Buy-in and Price Unit by date, for
+/trend. Kept apart from the product store, so /restart and deletes do
+not erase it.
+
+Points are appended to one columnar partition per date (parallel arrays
+of series id, Buy-in and Price Unit). A series is one (brand, category,
+size, address), normalized like the duplicate index. Each series keeps
+the sorted dates it has points on and each partition the rows of each
+series, so a query touches only the points of the brand asked for.
+"""
+import bisect
+import datetime
+import math
+from array import array
+
+
+def _norm(value) -> str:
+    return " ".join(str(value).split()).lower() if value is not None else ""
+
+
+def series_key(parsed: dict) -> tuple[str, str, str, str]:
+    size = parsed.get("size_raw")
+    return (
+        _norm(parsed.get("brand")),
+        _norm(parsed.get("category")),
+        "".join(str(size).split()).lower() if size is not None else "",
+        _norm(parsed.get("address")),
+    )
+
+
+class _Partition:
+    """The points of one date, column by column."""
+
+    __slots__ = ("series", "buy_in", "price_unit", "rows")
+
+    def __init__(self):
+        self.series = array("q")
+        self.buy_in = array("d")
+        self.price_unit = array("d")
+        self.rows: dict[int, list[int]] = {}  # series id -> rows, in input order
+
+    def append(self, series_id: int, buy_in: float, price_unit: float) -> None:
+        self.rows.setdefault(series_id, []).append(len(self.series))
+        self.series.append(series_id)
+        self.buy_in.append(buy_in)
+        self.price_unit.append(price_unit)
+
+
+class PriceHistory:
+    """Date-partitioned Buy-in / Price Unit points by series."""
+
+    def __init__(self):
+        self._partitions: dict[datetime.date, _Partition] = {}
+        self._series: dict[tuple, int] = {}
+        self._labels: list[tuple] = []  # series id -> (brand, category, size, address) as sent
+        self._dates: list[list[datetime.date]] = []  # series id -> sorted dates
+        self._brands: dict[str, list[int]] = {}  # normalized brand -> series ids
+        self.points = 0
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def add(self, parsed: dict) -> None:
+        """Record a saved product's prices on its Date (undated ones are skipped)."""
+        date = parsed.get("date")
+        if date is None:
+            return
+        buy_in, price_unit = parsed.get("buy_in"), parsed.get("price_unit_khr")
+        key = series_key(parsed)
+        series_id = self._series.get(key)
+        if series_id is None:
+            series_id = self._series[key] = len(self._labels)
+            self._labels.append(
+                tuple(parsed.get(f) for f in ("brand", "category", "size_raw", "address"))
+            )
+            self._dates.append([])
+            self._brands.setdefault(key[0], []).append(series_id)
+
+        partition = self._partitions.get(date)
+        if partition is None:
+            partition = self._partitions[date] = _Partition()
+        if series_id not in partition.rows:
+            dates = self._dates[series_id]
+            # usually today: appending at the end
+            if not dates or dates[-1] < date:
+                dates.append(date)
+            else:
+                bisect.insort(dates, date)
+        partition.append(
+            series_id,
+            math.nan if buy_in is None else buy_in,
+            math.nan if price_unit is None else price_unit,
+        )
+        self.points += 1
+
+    def trend(
+        self,
+        brand: str,
+        start: datetime.date | None = None,
+        end: datetime.date | None = None,
+    ) -> list[tuple[tuple, list[tuple[datetime.date, float, float]]]]:
+        """
+        [(series label, [(date, buy_in, price_unit), ...]), ...] for `brand`
+        between start and end (inclusive). A date with several points of a
+        series gives its last one; NaN marks a missing value.
+        """
+        result = []
+        for series_id in self._brands.get(_norm(brand), ()):
+            dates = self._dates[series_id]
+            lo = 0 if start is None else bisect.bisect_left(dates, start)
+            hi = len(dates) if end is None else bisect.bisect_right(dates, end)
+            points = []
+            for date in dates[lo:hi]:
+                partition = self._partitions[date]
+                row = partition.rows[series_id][-1]
+                points.append((date, partition.buy_in[row], partition.price_unit[row]))
+            if points:
+                result.append((self._labels[series_id], points))
+        return result
@@ -0,0 +1,215 @@
+"""
+Repricing for another exchange rate or mark-up (/settings rate=, /whatif).
+
+Everything left of the KHR columns in the workbook - Net Buy-in in
+particular - does not depend on the exchange rate. PriceBook keeps those
+values per stored product, computed once when the product is added, in
+flat columns. reprice() derives Sell Out ($), Sell Out (KHR) and the
+margins for every product from them in one vectorized numpy pass, so a
+rate or bulk mark-up change never re-runs calculate_fields.
+
+The arithmetic follows the workbook formulas, Excel ROUND included, so
+the numbers match what the exported file shows (and csv_export.py).
+"""
+import math
+from array import array
+
+
+# ---- workbook formulas ---------------------------------------------------
+
+def num(value) -> float:
+    """A cell value as a number; a blank cell counts as 0 in the formulas."""
+    return float(value) if value is not None else 0.0
+
+
+def excel_round(x: float, digits: int) -> float:
+    """
+    Excel ROUND: half away from zero. Rounding to 9 decimals first drops
+    the binary error (1.005 * 100 = 100.49999999999999) the way Excel's
+    15 significant digits do.
+    """
+    scale = 10.0**digits
+    return math.copysign(math.floor(round(abs(x) * scale, 9) + 0.5), x) / scale
+
+
+def buy_in_chain(row: dict) -> tuple[float, float, float, float]:
+    """
+    (Discount(%), Discount($), Direct Disc($), Net Buy-in) of a
+    _row_from_data row, as the workbook formulas compute them.
+    """
+    buy_in = num(row.get("Buy-in"))
+    scheme, foc = num(row.get("Scheme(base)")), num(row.get("FOC"))
+    disc_pct = 0.0 if scheme + foc == 0 else foc / (scheme + foc)
+    disc = excel_round(disc_pct * buy_in, 2)
+    direct = excel_round(num(row.get("Direct Disc.(%)")) * buy_in, 2)
+    return disc_pct, disc, direct, excel_round(buy_in - (disc + direct), 2)
+
+
+def sell_chain(row: dict, net: float) -> tuple[float, float, float | None, float, float]:
+    """
+    (Sell Out ($), Sell Out (KHR), Margin/Unit (KHR), Price Ctn (KHR),
+    Margin/Ctn (KHR)) of a row with Net Buy-in `net`. Margin/Unit is None
+    where Packs is 0 (#DIV/0! in the workbook).
+    """
+    packs, price_unit = num(row.get("Packs")), num(row.get("Price Unit (KHR)"))
+    sell_usd = excel_round(net + num(row.get("Mark - up")), 2)
+    sell_khr = excel_round(sell_usd * num(row.get("Exchange Rate")), 0)
+    margin_unit = excel_round(price_unit - sell_khr / packs, 0) if packs else None
+    price_ctn = excel_round(price_unit * packs, 0)
+    return sell_usd, sell_khr, margin_unit, price_ctn, excel_round(price_ctn - sell_khr, 0)
+
+
+def with_rate(sheet_rows: dict, rate: float) -> dict:
+    """
+    sheet_rows with every row's Exchange Rate set to rate. The workbook
+    derives all KHR columns from that cell, so nothing else changes; rows
+    that already have the rate are shared, not copied.
+    """
+    if all(
+        row.get("Exchange Rate") == rate for rows in sheet_rows.values() for row in rows
+    ):
+        return sheet_rows
+    return {
+        sheet: [
+            row if row.get("Exchange Rate") == rate else {**row, "Exchange Rate": rate}
+            for row in rows
+        ]
+        for sheet, rows in sheet_rows.items()
+    }
+
+
+# ---- vectorized repricing -------------------------------------------------
+
+def _excel_round_array(np, x, digits: int):
+    scale = 10.0**digits
+    return np.copysign(np.floor(np.round(np.abs(x) * scale, 9) + 0.5), x) / scale
+
+
+class PriceBook:
+    """
+    Rate-independent columns of the stored products, by seq. Removed
+    products leave a hole that is compacted away once holes are the
+    majority.
+    """
+
+    _COLUMNS = (
+        ("_seq", "q"),
+        ("_sheet", "q"),
+        ("_alive", "b"),
+        ("_net", "d"),
+        ("_mark_up", "d"),
+        ("_price_unit", "d"),
+        ("_packs", "d"),
+    )
+
+    def __init__(self):
+        self.sheets: list[str] = []
+        self._sheet_codes: dict[str, int] = {}
+        self._pos: dict[int, int] = {}  # seq -> row in the columns
+        self._holes = 0
+        self._reset_columns()
+
+    def _reset_columns(self) -> None:
+        for name, typecode in self._COLUMNS:
+            setattr(self, name, array(typecode))
+
+    def __len__(self) -> int:
+        return len(self._pos)
+
+    def add(self, seq: int, sheet: str, row: dict) -> None:
+        """Store a product's _row_from_data row (replaces an earlier seq)."""
+        self.remove(seq)
+        code = self._sheet_codes.get(sheet)
+        if code is None:
+            code = self._sheet_codes[sheet] = len(self.sheets)
+            self.sheets.append(sheet)
+        self._pos[seq] = len(self._seq)
+        self._seq.append(seq)
+        self._sheet.append(code)
+        self._alive.append(1)
+        self._net.append(buy_in_chain(row)[3])
+        self._mark_up.append(num(row.get("Mark - up")))
+        self._price_unit.append(num(row.get("Price Unit (KHR)")))
+        self._packs.append(num(row.get("Packs")))
+
+    def remove(self, seq: int) -> None:
+        pos = self._pos.pop(seq, None)
+        if pos is None:
+            return
+        self._alive[pos] = 0
+        self._holes += 1
+        if self._holes > len(self._pos):
+            self._compact()
+
+    def clear(self) -> None:
+        self._pos.clear()
+        self._holes = 0
+        self._reset_columns()
+
+    def _compact(self) -> None:
+        keep = [i for i, alive in enumerate(self._alive) if alive]
+        old = {name: getattr(self, name) for name, _typecode in self._COLUMNS}
+        self._reset_columns()
+        for name, column in old.items():
+            getattr(self, name).extend(column[i] for i in keep)
+        self._pos = {seq: i for i, seq in enumerate(self._seq)}
+        self._holes = 0
+
+    def reprice(
+        self,
+        rate: float,
+        markup_delta: float = 0.0,
+        markup: float | None = None,
+    ) -> dict:
+        """
+        The KHR columns of every stored product for `rate`, with each
+        Mark-up moved by markup_delta (or replaced by `markup`). Returns
+        numpy arrays: sheet (codes into self.sheets), sell_usd, sell_khr,
+        margin_unit (NaN where Packs is 0, #DIV/0! in the workbook),
+        price_ctn, margin_ctn. Nothing stored changes.
+        """
+        import numpy as np
+
+        alive = np.frombuffer(self._alive, dtype=np.int8).astype(bool)
+        net = np.frombuffer(self._net)[alive]
+        packs = np.frombuffer(self._packs)[alive]
+        price_unit = np.frombuffer(self._price_unit)[alive]
+        if markup is None:
+            mark_up = np.frombuffer(self._mark_up)[alive] + markup_delta
+        else:
+            mark_up = np.full(len(net), float(markup))
+
+        sell_usd = _excel_round_array(np, net + mark_up, 2)
+        sell_khr = _excel_round_array(np, sell_usd * rate, 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            per_unit = np.where(packs != 0, sell_khr / packs, np.nan)
+        margin_unit = _excel_round_array(np, price_unit - per_unit, 0)
+        price_ctn = _excel_round_array(np, price_unit * packs, 0)
+        return {
+            "sheet": np.frombuffer(self._sheet, dtype=np.int64)[alive],
+            "sell_usd": sell_usd,
+            "sell_khr": sell_khr,
+            "margin_unit": margin_unit,
+            "price_ctn": price_ctn,
+            "margin_ctn": _excel_round_array(np, price_ctn - sell_khr, 0),
+        }
+
+    def sheet_totals(self, priced: dict) -> dict[str, dict]:
+        """Per sheet: products, mean Margin/Unit, total Margin/Ctn, negative margins."""
+        import numpy as np
+
+        totals = {}
+        for code, sheet in enumerate(self.sheets):
+            mask = priced["sheet"] == code
+            count = int(mask.sum())
+            if not count:
+                continue
+            margin_unit = priced["margin_unit"][mask]
+            known = margin_unit[~np.isnan(margin_unit)]
+            totals[sheet] = {
+                "products": count,
+                "margin_unit_mean": float(known.mean()) if len(known) else 0.0,
+                "margin_ctn_total": float(priced["margin_ctn"][mask].sum()),
+                "negative": int((margin_unit < 0).sum()),
+            }
+        return totals
@@ -0,0 +1,189 @@
+"""
+On-demand cProfile of live handlers.
+
+An admin runs /profile 20 (next 20 updates) or /profile 30s (30 seconds),
+or sends SIGUSR1 to the process. While a session is active every wrapped
+handler runs under a cProfile.Profile of its own name (handle_text,
+delete_command, ...). Profiled handlers run one at a time so each
+profile only sees its own handler; that slows the bot down for the
+length of the session only. At the end one .pstats file per handler is
+written to PROFILE_DIR and the top functions are reported.
+"""
+import asyncio
+import cProfile
+import functools
+import logging
+import os
+import pstats
+import signal
+import time
+
+from config import PROFILE_DIR, PROFILE_SIGNAL_SECONDS
+
+
+logger = logging.getLogger(__name__)
+
+TOP_FUNCTIONS = 8
+# keep the chat summary under Telegram's 4096 characters
+MAX_SUMMARY_CHARS = 3800
+
+_session: "ProfileSession | None" = None
+# reports scheduled from sync code, referenced until done
+_pending: set[asyncio.Task] = set()
+
+
+class ProfileSession:
+    def __init__(self, updates: int | None, seconds: float | None, notify=None):
+        self.remaining = updates
+        self.seconds = seconds
+        self.notify = notify  # async callable(text), e.g. send to the admin chat
+        self.started = time.monotonic()
+        self.profiles: dict[str, cProfile.Profile] = {}
+        self.counts: dict[str, int] = {}
+        self.lock = asyncio.Lock()
+        self._timer: asyncio.TimerHandle | None = None
+
+    def describe(self) -> str:
+        if self.remaining is not None:
+            return f"next {self.remaining} update(s)"
+        return f"{self.seconds:g} seconds"
+
+
+def active() -> bool:
+    return _session is not None
+
+
+def start(
+    updates: int | None = None, seconds: float | None = None, notify=None
+) -> ProfileSession:
+    """Start a session for the next `updates` updates or for `seconds`."""
+    global _session
+    if _session is not None:
+        raise RuntimeError(f"Already profiling ({_session.describe()})")
+    session = ProfileSession(updates, seconds, notify)
+    if seconds is not None:
+        loop = asyncio.get_running_loop()
+        session._timer = loop.call_later(seconds, _finish_soon, session, "time is up")
+    _session = session
+    logger.info("Profiling started for %s", session.describe())
+    return session
+
+
+def _detach(session: ProfileSession) -> bool:
+    """Make `session` inactive; False if it already was."""
+    global _session
+    if _session is not session:
+        return False
+    _session = None
+    if session._timer is not None:
+        session._timer.cancel()
+    return True
+
+
+def _finish_soon(session: ProfileSession, reason: str) -> None:
+    if _detach(session):
+        task = asyncio.ensure_future(_report(session, reason))
+        _pending.add(task)
+        task.add_done_callback(_pending.discard)
+
+
+async def finish(reason: str = "stopped") -> str | None:
+    """End the active session, dump .pstats files and report the top functions."""
+    session = _session
+    if session is None or not _detach(session):
+        return None
+    return await _report(session, reason)
+
+
+async def _report(session: ProfileSession, reason: str) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    elapsed = time.monotonic() - session.started
+    lines = [f"🔬 Profile finished ({reason}) after {elapsed:.1f}s"]
+    if not session.profiles:
+        lines.append("No updates were handled.")
+    for name, prof in sorted(session.profiles.items()):
+        path = os.path.join(PROFILE_DIR, f"{stamp}-{name}.pstats")
+        prof.dump_stats(path)
+        lines.append(f"\n[{name}] {session.counts.get(name, 0)} update(s) → {path}")
+        lines.extend(top_functions(prof))
+
+    text = "\n".join(lines)
+    if len(text) > MAX_SUMMARY_CHARS:
+        text = text[: MAX_SUMMARY_CHARS - 1] + "…"
+    logger.info("%s", text)
+    if session.notify is not None:
+        try:
+            await session.notify(text)
+        except Exception:
+            logger.exception("Could not send profile summary")
+    return text
+
+
+def top_functions(prof: cProfile.Profile, limit: int = TOP_FUNCTIONS) -> list[str]:
+    """'self ms / cumulative ms  function (file:line)' for the costliest functions."""
+    stats = pstats.Stats(prof).stats
+    ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)
+    out = []
+    for (filename, line, func), entry in ranked[:limit]:
+        _cc, ncalls, tottime, cumtime, _callers = entry
+        where = f"{os.path.basename(filename)}:{line}" if line else filename
+        out.append(
+            f"{tottime * 1000:.1f} / {cumtime * 1000:.1f} ms x{ncalls} {func} ({where})"
+        )
+    return out
+
+
+def profiled(fn, name: str | None = None):
+    """Wrap an async handler so it is profiled while a session is active."""
+    label = name or fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        session = _session
+        if session is None:
+            return await fn(*args, **kwargs)
+        async with session.lock:
+            if _session is not session:
+                # session ended while this update was waiting
+                return await fn(*args, **kwargs)
+            prof = session.profiles.get(label)
+            if prof is None:
+                prof = session.profiles[label] = cProfile.Profile()
+            prof.enable()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                prof.disable()
+                session.counts[label] = session.counts.get(label, 0) + 1
+                if session.remaining is not None:
+                    session.remaining -= 1
+                    if session.remaining <= 0:
+                        _finish_soon(session, "update count reached")
+
+    return wrapper
+
+
+async def to_thread(fn, *args):
+    """
+    asyncio.to_thread, except while profiling: cProfile only sees the
+    calling thread, so the work runs inline to show up in the profile.
+    """
+    if _session is not None:
+        return fn(*args)
+    return await asyncio.to_thread(fn, *args)
+
+
+def install_signal_handler(seconds: float = PROFILE_SIGNAL_SECONDS) -> None:
+    """SIGUSR1 profiles the next `seconds`; the summary goes to the log."""
+    if not hasattr(signal, "SIGUSR1"):
+        return
+
+    def on_signal():
+        if _session is None:
+            start(seconds=seconds)
+
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, on_signal)
+    except (NotImplementedError, RuntimeError):
+        logger.warning("SIGUSR1 profiling is not available here")
@@ -0,0 +1,105 @@
+"""
+Per-sheet and per-brand totals for /summary, kept up to date on every add
+and delete so a summary costs O(number of sheets / brands), not a pass
+over all products.
+
+Each product contributes its Margin/Unit (KHR), Price Ctn (KHR) and
+Buy-in, computed once with the workbook formulas (pricing.py) at the
+exchange rate stored in its row. The contributions are remembered by
+seq, so removing a product subtracts exactly what it added.
+"""
+import bisect
+
+from pricing import buy_in_chain, sell_chain
+
+
+def _norm(value) -> str:
+    return " ".join(str(value).split()).lower() if value is not None else ""
+
+
+class Rollup:
+    """Totals of one sheet or brand."""
+
+    __slots__ = ("name", "products", "margin_sum", "margin_count", "carton_value", "_buy_ins")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.products = 0
+        # Margin/Unit is #DIV/0! without Packs; those are not averaged
+        self.margin_sum = 0.0
+        self.margin_count = 0
+        self.carton_value = 0.0
+        self._buy_ins: list[float] = []  # sorted, for min / max under deletes
+
+    def change(self, margin_unit, price_ctn, buy_in, sign: int) -> None:
+        """Count a product in (sign 1) or out (sign -1)."""
+        self.products += sign
+        if margin_unit is not None:
+            self.margin_sum += sign * margin_unit
+            self.margin_count += sign
+        self.carton_value += sign * price_ctn
+        if buy_in is None:
+            return
+        if sign > 0:
+            bisect.insort(self._buy_ins, buy_in)
+        else:
+            del self._buy_ins[bisect.bisect_left(self._buy_ins, buy_in)]
+
+    @property
+    def margin_mean(self) -> float | None:
+        return self.margin_sum / self.margin_count if self.margin_count else None
+
+    @property
+    def buy_in_min(self) -> float | None:
+        return self._buy_ins[0] if self._buy_ins else None
+
+    @property
+    def buy_in_max(self) -> float | None:
+        return self._buy_ins[-1] if self._buy_ins else None
+
+
+class SummaryRollups:
+    """Rollups by sheet (in order of first use) and by normalized brand."""
+
+    def __init__(self):
+        self.sheets: dict[str, Rollup] = {}
+        self.brands: dict[str, Rollup] = {}
+        # seq -> (sheet, brand key, margin/unit, price/ctn, buy-in)
+        self._entries: dict[int, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, seq: int, sheet: str, row: dict) -> None:
+        """Count a stored product's _row_from_data row (replaces an earlier seq)."""
+        self.remove(seq)
+        _sell_usd, _sell_khr, margin_unit, price_ctn, _margin_ctn = sell_chain(
+            row, buy_in_chain(row)[3]
+        )
+        brand = row.get("Brand")
+        entry = (sheet, _norm(brand), margin_unit, price_ctn, row.get("Buy-in"))
+        self._entries[seq] = entry
+        self._apply(entry, 1, brand)
+
+    def remove(self, seq: int) -> None:
+        entry = self._entries.pop(seq, None)
+        if entry is not None:
+            self._apply(entry, -1)
+
+    def clear(self) -> None:
+        self.sheets.clear()
+        self.brands.clear()
+        self._entries.clear()
+
+    def _apply(self, entry: tuple, sign: int, brand_name=None) -> None:
+        sheet, brand, margin_unit, price_ctn, buy_in = entry
+        for groups, key, name in (
+            (self.sheets, sheet, sheet),
+            (self.brands, brand, brand_name or "?"),
+        ):
+            rollup = groups.get(key)
+            if rollup is None:
+                rollup = groups[key] = Rollup(name)
+            rollup.change(margin_unit, price_ctn, buy_in, sign)
+            if not rollup.products:
+                del groups[key]
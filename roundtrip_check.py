@@ -0,0 +1,96 @@
+"""
+Round-trip fidelity check of the workbook importer (excel_importer.py).
+
+    python roundtrip_check.py               # 500 synthetic products + edge cases
+    python roundtrip_check.py --count 5000
+
+Parses synthetic pastes and exports them, imports that workbook the way
+an uploaded .xlsx is imported, exports the imported products again and
+compares the two workbooks: every cell value (formulas included) and
+number format, the sheet each product lands on, and the Size unit of
+every row (it only survives in the Size number format). Exits 1 and
+lists the first differences if the second export differs from the first.
+"""
+import argparse
+import io
+import sys
+
+from excel_builder import (
+    _row_from_data,
+    build_excel_from_sheet_dict,
+    calculate_fields,
+    choose_sheet_name,
+)
+from excel_importer import FIRST_DATA_ROW, _COL, _size_unit, load_products_from_workbook
+from xlsx_conformance import _value, sample_sheet_rows
+
+
+MAX_REPORTED = 20
+
+
+def sheet_rows_from_records(records: list[dict]) -> dict:
+    """Group imported records into sheets as bot.py's _add_products does."""
+    sheet_rows = {}
+    for record in records:
+        calc = calculate_fields(record)
+        sheet_rows.setdefault(choose_sheet_name(calc), []).append(_row_from_data(calc))
+    return sheet_rows
+
+
+def compare(first: bytes, second: bytes) -> list[str]:
+    """Differences between the exported and the re-exported workbook."""
+    from openpyxl import load_workbook
+
+    want_wb = load_workbook(io.BytesIO(first))
+    got_wb = load_workbook(io.BytesIO(second))
+    if want_wb.sheetnames != got_wb.sheetnames:
+        return [f"sheets: {want_wb.sheetnames} != {got_wb.sheetnames}"]
+
+    size_col = _COL["Size"]
+    diffs = []
+    for name in want_wb.sheetnames:
+        want, got = want_wb[name], got_wb[name]
+        if want.max_row != got.max_row:
+            diffs.append(f"{name}: {want.max_row} rows != {got.max_row}")
+        for r, (want_row, got_row) in enumerate(zip(want.iter_rows(), got.iter_rows()), 1):
+            for a, b in zip(want_row, got_row):
+                if _value(a) != _value(b):
+                    diffs.append(f"{name}!{a.coordinate}: {_value(a)!r} != {_value(b)!r}")
+                elif a.number_format != b.number_format:
+                    diffs.append(
+                        f"{name}!{a.coordinate}: format {a.number_format!r} != {b.number_format!r}"
+                    )
+            if r >= FIRST_DATA_ROW:
+                unit_a = _size_unit(want_row[size_col].number_format)
+                unit_b = _size_unit(got_row[size_col].number_format)
+                if unit_a != unit_b:
+                    diffs.append(f"{name} row {r}: Size unit {unit_a!r} != {unit_b!r}")
+    return diffs
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Workbook import round-trip check")
+    ap.add_argument("--count", type=int, default=500, help="synthetic products")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    sheet_rows = sample_sheet_rows(args.count, args.seed)
+    first = build_excel_from_sheet_dict(sheet_rows)
+    records = load_products_from_workbook(io.BytesIO(first))
+    second = build_excel_from_sheet_dict(sheet_rows_from_records(records))
+
+    rows = sum(len(r) for r in sheet_rows.values())
+    diffs = compare(first, second)
+    if len(records) != rows:
+        diffs.insert(0, f"imported {len(records)} products of {rows}")
+    if diffs:
+        for diff in diffs[:MAX_REPORTED]:
+            print(diff)
+        print(f"FAIL: {len(diffs)} difference(s) in {rows} rows")
+        return 1
+    print(f"OK: {rows} rows in {len(sheet_rows)} sheets survive export -> import -> export")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,54 @@
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
+import os
 import subprocess
+import sys
+import threading
 import time
 
+from hot_reload import RESTART_EXIT_CODE
+
 BOT_FILE = "bot.py"
 
 class ReloadHandler(FileSystemEventHandler):
+    """
+    Keeps bot.py running. The bot reloads changed code in-process
+    (HOT_RELOAD=1, hot_reload.py); it exits with RESTART_EXIT_CODE when it
+    needs a full restart. If it exits for any other reason (e.g. a syntax
+    error) it is started again on the next .py change.
+    """
+
     def __init__(self):
         self.proc = None
+        # start_bot runs from both the watchdog thread and the main loop
+        self.lock = threading.Lock()
         self.start_bot()
 
     def start_bot(self):
-        if self.proc:
+        with self.lock:
+            self._spawn()
+
+    def _spawn(self):
+        if self.proc and self.proc.poll() is None:
             self.proc.terminate()
+            self.proc.wait()
         print("Starting bot...")
-        self.proc = subprocess.Popen(["python", BOT_FILE])
+        env = dict(os.environ, HOT_RELOAD="1")
+        self.proc = subprocess.Popen([sys.executable, BOT_FILE], env=env)
+
+    def check_bot(self):
+        with self.lock:
+            if self.proc.poll() == RESTART_EXIT_CODE:
+                print("Bot asked for a full restart")
+                self._spawn()
 
     def on_modified(self, event):
-        if event.src_path.endswith(".py"):
-            print(f"Changed: {event.src_path} -> restarting bot")
-            self.start_bot()
+        if not event.src_path.endswith(".py"):
+            return
+        with self.lock:
+            if self.proc.poll() is not None:
+                print(f"Changed: {event.src_path} -> starting stopped bot")
+                self._spawn()
 
 if __name__ == "__main__":
     handler = ReloadHandler()
@@ -29,6 +58,7 @@ if __name__ == "__main__":
     try:
         while True:
             time.sleep(1)
+            handler.check_bot()
     finally:
         observer.stop()
         observer.join()
@@ -0,0 +1,146 @@
+import bisect
+import datetime
+import re
+
+from parser import parse_date
+
+
+# text fields with an inverted index: normalized value -> product seqs
+INDEXED_FIELDS = ("brand", "category", "sub_category", "address", "packaging", "sheet")
+
+# /find keys as users type them -> record field
+QUERY_KEYS = {
+    "brand": "brand",
+    "category": "category",
+    "cat": "category",
+    "sub_category": "sub_category",
+    "sub-category": "sub_category",
+    "subcategory": "sub_category",
+    "address": "address",
+    "packaging": "packaging",
+    "sheet": "sheet",
+    "date": "date",
+}
+
+_QUERY_RE = re.compile(
+    r"(?<!\S)(" + "|".join(re.escape(k) for k in QUERY_KEYS) + r")\s*(>=|<=|=|>|<)\s*",
+    re.IGNORECASE,
+)
+
+
+def _norm(value) -> str:
+    return " ".join(str(value).split()).lower() if value is not None else ""
+
+
+def parse_query(text: str) -> list[tuple[str, str, object]]:
+    """
+    Parse 'brand=Health Pro date>=01.11.2025 sheet=Milk' into
+    [(field, op, value), ...]. Values run until the next key, so they may
+    contain spaces. Raises ValueError on anything it does not understand.
+    """
+    matches = list(_QUERY_RE.finditer(text))
+    if not matches or text[: matches[0].start()].strip():
+        raise ValueError("Use key=value, e.g. brand=Viso date>=01.11.2025")
+
+    terms = []
+    for i, m in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        field = QUERY_KEYS[m.group(1).lower()]
+        op = m.group(2)
+        raw = text[m.end():end].strip()
+        if not raw:
+            raise ValueError(f"Missing value for {m.group(1)}")
+        if field == "date":
+            try:
+                value = parse_date(raw)
+            except ValueError:
+                raise ValueError(f"Bad date: {raw}")
+        elif op != "=":
+            raise ValueError(f"Only = is supported for {m.group(1)}")
+        else:
+            value = _norm(raw)
+        terms.append((field, op, value))
+    return terms
+
+
+class ProductIndex:
+    """
+    In-memory inverted index over stored products, keyed by their seq.
+    Text fields map normalized value -> set of seqs; dates are kept in a
+    sorted list of (date, seq) for range queries. add/remove are
+    incremental, so the index never needs a full rebuild.
+    """
+
+    def __init__(self):
+        self._products: dict[int, dict] = {}
+        self._fields: dict[str, dict[str, set[int]]] = {
+            field: {} for field in INDEXED_FIELDS
+        }
+        self._dates: list[tuple[datetime.date, int]] = []
+
+    def __len__(self):
+        return len(self._products)
+
+    def add(self, parsed: dict) -> None:
+        seq = parsed["seq"]
+        self._products[seq] = parsed
+        for field in INDEXED_FIELDS:
+            key = _norm(parsed.get(field))
+            if key:
+                self._fields[field].setdefault(key, set()).add(seq)
+        if parsed.get("date") is not None:
+            bisect.insort(self._dates, (parsed["date"], seq))
+
+    def remove(self, parsed: dict) -> None:
+        seq = parsed["seq"]
+        if self._products.pop(seq, None) is None:
+            return
+        for field in INDEXED_FIELDS:
+            key = _norm(parsed.get(field))
+            seqs = self._fields[field].get(key)
+            if seqs is not None:
+                seqs.discard(seq)
+                if not seqs:
+                    del self._fields[field][key]
+        if parsed.get("date") is not None:
+            entry = (parsed["date"], seq)
+            pos = bisect.bisect_left(self._dates, entry)
+            if pos < len(self._dates) and self._dates[pos] == entry:
+                del self._dates[pos]
+
+    def clear(self) -> None:
+        self._products.clear()
+        for values in self._fields.values():
+            values.clear()
+        self._dates.clear()
+
+    def _date_range(self, op: str, value: datetime.date) -> set[int]:
+        lo, hi = 0, len(self._dates)
+        if op in {">=", "="}:
+            lo = bisect.bisect_left(self._dates, (value,))
+        elif op == ">":
+            lo = bisect.bisect_left(self._dates, (value + datetime.timedelta(days=1),))
+        if op in {"<=", "="}:
+            hi = bisect.bisect_left(self._dates, (value + datetime.timedelta(days=1),))
+        elif op == "<":
+            hi = bisect.bisect_left(self._dates, (value,))
+        return {seq for _, seq in self._dates[lo:hi]}
+
+    def search(self, terms: list[tuple[str, str, object]]) -> list[dict]:
+        """Products matching every term, in input (seq) order."""
+        sets = []
+        for field, op, value in terms:
+            if field == "date":
+                sets.append(self._date_range(op, value))
+            else:
+                sets.append(self._fields[field].get(value, set()))
+        if not sets:
+            return []
+        # intersect starting from the smallest candidate set
+        sets.sort(key=len)
+        result = set(sets[0])
+        for s in sets[1:]:
+            if not result:
+                break
+            result &= s
+        return [self._products[seq] for seq in sorted(result)]
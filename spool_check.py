@@ -0,0 +1,108 @@
+"""
+Check of the export spool (excel_builder.SpoolFile) and the builders
+that write into it.
+
+    python spool_check.py
+
+  * a spool closes cleanly, in memory and after rolling over to disk,
+    and closing twice is harmless;
+  * bytes written before and after the rollover read back whole, and
+    view() gives the same bytes (also after the spool is closed);
+  * a builder that fails reports its own error, not one from closing
+    the spool;
+  * a cached export dropped from ExportCache goes away without errors.
+
+Exits 1 and says what went wrong otherwise.
+"""
+import gc
+import sys
+import warnings
+
+from csv_export import build_csv_file
+from excel_builder import SpoolFile, build_excel_file
+from export_cache import ExportCache
+from xlsx_conformance import sample_sheet_rows
+
+
+def check_close() -> list[str]:
+    problems = []
+    for name, data in (("in memory", b"abc"), ("rolled over", b"x" * 100)):
+        spool = SpoolFile(10)
+        spool.write(data)
+        rolled = spool.rolled
+        spool.seek(0)
+        if spool.read() != data:
+            problems.append(f"{name}: read back differs")
+        view = spool.view()
+        try:
+            spool.close()
+            spool.close()
+        except Exception as e:
+            problems.append(f"{name}: close raised {type(e).__name__}: {e}")
+        if not spool.closed:
+            problems.append(f"{name}: not closed")
+        if bytes(view) != data:
+            problems.append(f"{name}: view differs after close")
+        if rolled != (len(data) > 10):
+            problems.append(f"{name}: rolled over is {rolled}")
+    try:
+        SpoolFile(10).close()
+    except Exception as e:
+        problems.append(f"empty spool: close raised {type(e).__name__}: {e}")
+    return problems
+
+
+def check_build_errors() -> list[str]:
+    # a row the builders cannot write: the real error has to come out
+    bad = {"Sheet": [{"Date": object()}]}
+    problems = []
+    for name, build in (
+        ("build_excel_file", lambda: build_excel_file(bad, backend="native")),
+        ("build_csv_file", lambda: build_csv_file(bad)),
+    ):
+        try:
+            build().close()
+        except ValueError as e:
+            if "closed file" in str(e):
+                problems.append(f"{name}: build error replaced by {e}")
+        except Exception:
+            pass
+    return problems
+
+
+def check_eviction() -> list[str]:
+    rows = sample_sheet_rows(50)
+    cache = ExportCache(max_bytes=1)
+    problems = []
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        unraisable = []
+        sys.unraisablehook, hook = unraisable.append, sys.unraisablehook
+        try:
+            for spool_max in (10**9, 1000):
+                entry = cache.put("k", build_excel_file(rows, "native", spool_max))
+                entry.view
+                del entry
+                cache.clear()
+                gc.collect()
+        finally:
+            sys.unraisablehook = hook
+    for u in unraisable:
+        problems.append(f"eviction: {type(u.exc_value).__name__}: {u.exc_value}")
+    problems += [f"eviction: {w.message}" for w in caught if w.category is not ResourceWarning]
+    return problems
+
+
+def main():
+    problems = check_close() + check_build_errors() + check_eviction()
+    for problem in problems:
+        print(problem)
+    if problems:
+        print("FAIL")
+        return 1
+    print("OK: spools close, roll over and drop cleanly")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
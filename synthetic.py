@@ -0,0 +1,81 @@
+"""
+Synthetic product pastes for load tests and benchmarks. Every block is
+the first product of ui.EXAMPLE_TEXT with its values swapped, so the
+line layout, comments and Khmer text match what users actually send.
+"""
+import random
+
+from ui import EXAMPLE_TEXT
+
+
+# (category, sub-category, packaging, size unit, sizes)
+PRODUCT_KINDS = [
+    ("Oil", "Soybean", "Bottle", "ml", (250, 500, 1000, 1800, 5000)),
+    ("Cooking Oil", "Palm", "Bottle", "ml", (500, 1000, 2000)),
+    ("Milk", "Condensed", "Can", "g", (390, 500)),
+    ("Milk", "Evaporated", "Can", "g", (170, 410)),
+    ("Detergent", "Powder", "Pouch", "g", (400, 800, 3700)),
+    ("Detergent", "Liquid", "Pouch", "ml", (600, 1500, 3000)),
+    ("Dishwash", "Lime", "Bottle", "ml", (400, 750, 1500)),
+    ("Fabric Softener", "Floral", "Pouch", "ml", (580, 1300)),
+    ("Eco Dishwash", "Lemon", "Bottle", "ml", (500,)),
+    ("Toilet", "Cleaner", "Bottle", "ml", (500, 900)),
+    ("Snacks", "Chips", "Bag", "g", (50, 150)),
+]
+BRANDS = ["Health Pro", "Phka Chhouk", "Viso", "Comfort", "Sunlight", "Duck", "Neptune", "Meizan"]
+ADDRESSES = ["ចំការគ", "ផ្សារថ្មី", "ទួលគោក", "Phsar Kandal", "Toul Tompoung"]
+
+
+def _template_block() -> list[str]:
+    block = next(b for b in EXAMPLE_TEXT.split("---") if "Date:" in b)
+    return [line for line in block.strip().splitlines()]
+
+
+_TEMPLATE = _template_block()
+
+
+def _set_value(line: str, value) -> str:
+    """Replace the value of 'Key: value   # comment', keeping the comment."""
+    key, _, rest = line.partition(":")
+    comment = ""
+    hash_pos = rest.find("#")
+    if hash_pos != -1:
+        comment = " " * 10 + rest[hash_pos:]
+    return f"{key}: {value}{comment}"
+
+
+def product_block(rng: random.Random) -> str:
+    category, sub_category, packaging, unit, sizes = rng.choice(PRODUCT_KINDS)
+    values = {
+        "Date": f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.2025",
+        "Address": rng.choice(ADDRESSES),
+        "Category": category,
+        "Sub-Category": sub_category,
+        "Brand": rng.choice(BRANDS),
+        "Packaging": packaging,
+        "Size": f"{rng.choice(sizes)}{unit}",
+        "Packs": rng.choice((4, 6, 12, 24, 48)),
+        "Buy-in": f"{rng.uniform(5, 60):.2f}$",
+        "Scheme(base)": rng.randint(1, 10),
+        "FOC": rng.choice((0, 0, 0, 1)),
+        "Direct Disc.(%)": f"{rng.choice((0, 0, 2.5, 5, 12)):.1f}%",
+        "Mark - up": f"{rng.choice((0.25, 0.5, 1.0, 1.5)):.2f}$",
+        "Price Unit": rng.randrange(1000, 40000, 500),
+    }
+    lines = []
+    for line in _TEMPLATE:
+        key = line.partition(":")[0].strip()
+        lines.append(_set_value(line, values[key]) if key in values else line)
+    return "\n".join(lines)
+
+
+def product_paste(rng: random.Random, count: int) -> str:
+    """One message with `count` products, separated like EXAMPLE_TEXT."""
+    return "\n\n".join(
+        f"--- product {i} ---\n{product_block(rng)}" for i in range(1, count + 1)
+    )
+
+
+def product_blocks(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [product_block(rng) for _ in range(count)]
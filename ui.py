@@ -0,0 +1,239 @@
+"""
+Static reply payloads: the main menu keyboard and the fixed texts of
+/start, /help, /about and the greeting, per language ("lang" in
+/settings).
+
+Everything here is built once at import and shared by all replies. The
+keyboards are frozen telegram objects that also keep their serialized
+form, so a reply neither rebuilds the markup nor walks it again to
+turn it into JSON.
+"""
+from types import MappingProxyType
+
+from telegram import KeyboardButton, ReplyKeyboardMarkup
+
+
+LANGUAGES = ("km", "en")
+DEFAULT_LANGUAGE = "en"
+
+
+EXAMPLE_TEXT = (
+    "--- product 1 ---\n"
+    "Date: 24.11.2025\n"
+    "Address: ចំការគ\n"
+    "Category: Oil\n"
+    "Sub-Category: Soybean\n"
+    "Brand: Health Pro\n"
+    "Packaging: Bottle\n"
+    "Size: 1000ml\n"
+    "Packs: 12\n"
+    "Buy-in: 22.50$                 # ត្រូវតែបំពេញ\n"
+    "Scheme(base): 4\n"
+    "FOC: 0\n"
+    "Direct Disc.(%): 0.0%          # បំពេញក៏បាន អត់ក៏បាន\n"
+    "Mark - up: 0.50$               # ត្រូវតែបំពេញ\n"
+    "Price Unit: 9000               # ត្រូវតែបំពេញ\n"
+    "\n"
+    "--- product 2 ---\n"
+    "Date: 24.11.2025\n"
+    "Address: ចំការគ\n"
+    "Category: Milk\n"
+    "Sub-Category: Condensed\n"
+    "Brand: Phka Chhouk\n"
+    "Packaging: Can\n"
+    "Size: 390g\n"
+    "Packs: 48\n"
+    "Buy-in: 28.60$                 # ត្រូវតែបំពេញ\n"
+    "Scheme(base): 1\n"
+    "FOC: 0\n"
+    "Direct Disc.(%): 0.0%          # បំពេញក៏បាន អត់ក៏បាន\n"
+    "Mark - up: 1.00$               # ត្រូវតែបំពេញ\n"
+    "Price Unit: 3000               # ត្រូវតែបំពេញ\n"
+)
+
+# one product in the input format, shown at the end of /help
+_FORMAT_TEXT = (
+    "Date: 24.11.2025\n"
+    "Address: ចំការគ\n"
+    "Category: Detergent\n"
+    "Sub-Category: Powder\n"
+    "Brand: Viso\n"
+    "Packaging: Pouch\n"
+    "Size: 3700 g\n"
+    "Packs: 4\n"
+    "Buy-in: 21.68$\n"
+    "Scheme(base): 1\n"
+    "FOC: 0\n"
+    "Direct Disc.(%): 12.00%\n"
+    "Mark - up: 1.00$\n"
+    "Price Unit: 22000\n\n"
+)
+
+
+# main menu rows, by the command each button runs
+_MENU_LAYOUT = (
+    ("start",),
+    ("list",),
+    ("help", "settings"),
+    ("about", "summary"),
+    ("restart",),
+)
+
+_MENU_LABELS = {
+    "en": {
+        "start": "🆕 New calculation (/start)",
+        "list": "📄 Show products (/list)",
+        "help": "ℹ️ Help (/help)",
+        "settings": "⚙️ Settings (/settings)",
+        "about": "📦 About (/about)",
+        "summary": "📊 Summary (/summary)",
+        "restart": "🔄 Restart Bot (/restart)",
+    },
+    "km": {
+        "start": "🆕 គណនាថ្មី (/start)",
+        "list": "📄 បង្ហាញផលិតផល (/list)",
+        "help": "ℹ️ ជំនួយ (/help)",
+        "settings": "⚙️ ការកំណត់ (/settings)",
+        "about": "📦 អំពី (/about)",
+        "summary": "📊 សង្ខេប (/summary)",
+        "restart": "🔄 ចាប់ផ្ដើមឡើងវិញ (/restart)",
+    },
+}
+
+_TEXTS = {
+    "en": {
+        "start": (
+            "Welcome to Price Calculator Bot.\n\n"
+            "Send one or many products.\n"
+            "Separate products with '--- product N ---' lines.\n\n"
+            "Example:\n\n" + EXAMPLE_TEXT + "\n\n"
+            "Use /help to see all features."
+        ),
+        "help": (
+            "📘 Help – Price Calculator Bot\n\n"
+            "Commands:\n"
+            "/start – Show example format and how to start.\n"
+            "/help – Show this help message.\n"
+            "/restart – Delete ALL products and start fresh.\n"
+            "/settings – Change language, rate, etc.\n"
+            "/about – Show bot information.\n"
+            "/list [Sheet] [Page] – Show products with Ids (Ex: /list Milk 2).\n"
+            "/delete <Sheet> <Id> – Delete one row (Ex: /delete Milk 1).\n"
+            "/delete_sheet <Sheet> – Delete all in a sheet.\n"
+            "/summary – Counts, margins and buy-in range per sheet (/summary brand per brand).\n"
+            "/find brand=Viso date>=01.11.2025 sheet=Milk – Search products\n"
+            "  (add 'export' to get the matches as Excel).\n"
+            "/export – Send the full Excel with all products.\n"
+            "/export csv – All products as CSV values (also tsv, add gz to compress).\n"
+            "/whatif rate=4100 markup=+0.25 – Preview margins at another rate / mark-up.\n"
+            "/trend Health Pro date>=01.10.2025 – Buy-in and Price Unit by date.\n\n"
+            "With /settings export=delta each reply only contains the products\n"
+            "added since the last Excel you received.\n"
+            "Products you already sent are skipped; /settings dupes=replace\n"
+            "updates them instead, dupes=flag saves them and counts them.\n\n"
+            "Input format (one product):\n" + _FORMAT_TEXT
+        ),
+        "about": (
+            "📦 Price Calculator Bot v2.0\n"
+            "For sales / pricing calculations of WS/RT items.\n"
+            "• Parses text to Excel rows\n"
+            "• Calculates Net Buy-in, Sell Out, margins with custom rounding\n"
+            "• Groups products by sheet (Oil, Detergent, Milk, etc.)\n\n"
+            "For support, contact: raphearom077@gmail.com or https://t.me/Phearom252005"
+        ),
+        "greeting": "Hi! Send product data in the template format shown in /start.",
+    },
+    "km": {
+        "start": (
+            "សូមស្វាគមន៍មកកាន់ Price Calculator Bot។\n\n"
+            "ផ្ញើផលិតផលមួយ ឬច្រើន។\n"
+            "បំបែកផលិតផលនីមួយៗដោយបន្ទាត់ '--- product N ---'។\n\n"
+            "ឧទាហរណ៍:\n\n" + EXAMPLE_TEXT + "\n\n"
+            "ប្រើ /help ដើម្បីមើលមុខងារទាំងអស់។"
+        ),
+        "help": (
+            "📘 ជំនួយ – Price Calculator Bot\n\n"
+            "ពាក្យបញ្ជា:\n"
+            "/start – បង្ហាញទម្រង់គំរូ និងរបៀបចាប់ផ្ដើម។\n"
+            "/help – បង្ហាញសារជំនួយនេះ។\n"
+            "/restart – លុបផលិតផលទាំងអស់ ហើយចាប់ផ្ដើមថ្មី។\n"
+            "/settings – ប្ដូរភាសា អត្រាប្ដូរប្រាក់ ។ល។\n"
+            "/about – ព័ត៌មានអំពីបូត។\n"
+            "/list [Sheet] [Page] – បង្ហាញផលិតផលជាមួយ Id (ឧ. /list Milk 2)។\n"
+            "/delete <Sheet> <Id> – លុបមួយជួរ (ឧ. /delete Milk 1)។\n"
+            "/delete_sheet <Sheet> – លុបទាំងអស់ក្នុង sheet មួយ។\n"
+            "/summary – ចំនួន ប្រាក់ចំណេញ និង Buy-in ក្នុង sheet នីមួយៗ (/summary brand តាមម៉ាក)។\n"
+            "/find brand=Viso date>=01.11.2025 sheet=Milk – ស្វែងរកផលិតផល\n"
+            "  (បន្ថែម 'export' ដើម្បីទទួលលទ្ធផលជា Excel)។\n"
+            "/export – ផ្ញើ Excel ពេញលេញជាមួយផលិតផលទាំងអស់។\n"
+            "/export csv – ផលិតផលទាំងអស់ជាតម្លៃ CSV (tsv ក៏បាន បន្ថែម gz ដើម្បីបង្រួម)។\n"
+            "/whatif rate=4100 markup=+0.25 – មើលប្រាក់ចំណេញជាមុននៅអត្រា / mark-up ផ្សេង។\n"
+            "/trend Health Pro date>=01.10.2025 – Buy-in និង Price Unit តាមកាលបរិច្ឆេទ។\n\n"
+            "ជាមួយ /settings export=delta ការឆ្លើយតបនីមួយៗមានតែផលិតផល\n"
+            "ដែលបានបន្ថែមតាំងពី Excel ចុងក្រោយដែលអ្នកបានទទួល។\n"
+            "ផលិតផលដែលអ្នកបានផ្ញើរួចហើយនឹងត្រូវរំលង; /settings dupes=replace\n"
+            "ធ្វើបច្ចុប្បន្នភាពវាជំនួសវិញ, dupes=flag រក្សាទុកវា ហើយរាប់វា។\n\n"
+            "ទម្រង់បញ្ចូល (ផលិតផលមួយ):\n" + _FORMAT_TEXT
+        ),
+        "about": (
+            "📦 Price Calculator Bot v2.0\n"
+            "សម្រាប់ការគណនាតម្លៃលក់ទំនិញ WS/RT។\n"
+            "• បំប្លែងអត្ថបទទៅជាជួរ Excel\n"
+            "• គណនា Net Buy-in, Sell Out និងប្រាក់ចំណេញ ជាមួយការបង្គត់តាមបំណង\n"
+            "• ដាក់ផលិតផលជាក្រុមតាម sheet (Oil, Detergent, Milk ។ល។)\n\n"
+            "សម្រាប់ជំនួយ សូមទាក់ទង: raphearom077@gmail.com ឬ https://t.me/Phearom252005"
+        ),
+        "greeting": "សួស្ដី! សូមផ្ញើទិន្នន័យផលិតផលតាមទម្រង់ដែលបង្ហាញក្នុង /start។",
+    },
+}
+
+
+class FrozenReplyKeyboard(ReplyKeyboardMarkup):
+    """
+    ReplyKeyboardMarkup serialized once: to_dict() hands out the dict made
+    at construction, which the Bot API request only json-dumps. Callers
+    must not modify it.
+    """
+
+    __slots__ = ("_serialized",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        with self._unfrozen():
+            self._serialized = super().to_dict()
+
+    def to_dict(self, recursive: bool = True) -> dict:
+        return self._serialized
+
+
+def _menu(lang: str) -> FrozenReplyKeyboard:
+    labels = _MENU_LABELS[lang]
+    rows = [[KeyboardButton(labels[command]) for command in row] for row in _MENU_LAYOUT]
+    return FrozenReplyKeyboard(rows, resize_keyboard=True)
+
+
+KEYBOARDS = MappingProxyType({lang: _menu(lang) for lang in LANGUAGES})
+TEXTS = MappingProxyType(
+    {lang: MappingProxyType(_TEXTS[lang]) for lang in LANGUAGES}
+)
+# exact text a menu button sends (any language) -> its command
+BUTTON_COMMANDS = MappingProxyType(
+    {
+        label: command
+        for lang in LANGUAGES
+        for command, label in _MENU_LABELS[lang].items()
+    }
+)
+
+
+def language(code: str | None) -> str:
+    """A supported language code; anything else maps to DEFAULT_LANGUAGE."""
+    return code if code in KEYBOARDS else DEFAULT_LANGUAGE
+
+
+def keyboard(lang: str | None = DEFAULT_LANGUAGE) -> FrozenReplyKeyboard:
+    return KEYBOARDS[language(lang)]
+
+
+def text(name: str, lang: str | None = DEFAULT_LANGUAGE) -> str:
+    return TEXTS[language(lang)][name]
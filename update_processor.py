@@ -0,0 +1,102 @@
+import asyncio
+import contextlib
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+def _chat_id(update: object) -> int | None:
+    if isinstance(update, Update) and update.effective_chat is not None:
+        return update.effective_chat.id
+    return None
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """
+    Process updates of different chats concurrently while keeping the
+    updates of one chat strictly in arrival order.
+
+    Application starts one task per update in queue order and asyncio.Lock
+    wakes waiters first-in first-out, so a chat's second message only runs
+    after its first one has replied. Only the update at the head of each
+    chat takes one of the concurrency slots. Locks are dropped once nobody
+    waits on them, so idle chats cost nothing.
+
+    paused() holds back new updates and waits for running ones to finish,
+    so hot_reload.py can swap handlers while no handler is mid-update.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._waiting: dict[int, int] = {}
+        self._running = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+
+    async def _run(self, coroutine) -> None:
+        while not self._resumed.is_set():
+            await self._resumed.wait()
+        self._running += 1
+        self._idle.clear()
+        try:
+            await coroutine
+        finally:
+            self._running -= 1
+            if not self._running:
+                self._idle.set()
+
+    @contextlib.asynccontextmanager
+    async def paused(self, timeout: float):
+        """
+        Hold back updates that have not started yet and wait (up to
+        `timeout`, else TimeoutError) for the running ones to finish. A
+        held-back update keeps its chat lock, so per-chat order survives.
+        """
+        if not self._resumed.is_set():
+            raise RuntimeError("Update processing is already paused")
+        self._resumed.clear()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            yield
+        finally:
+            self._resumed.set()
+
+    async def process_update(self, update, coroutine) -> None:
+        """
+        Wait for the chat's turn first and only then for one of the
+        max_concurrent_updates slots: an update queued behind its own chat
+        holds no slot, so a busy chat cannot starve the others.
+        """
+        chat_id = _chat_id(update)
+        if chat_id is None:
+            await self._process(update, coroutine)
+            return
+
+        lock = self._locks.get(chat_id)
+        if lock is None:
+            lock = self._locks[chat_id] = asyncio.Lock()
+        self._waiting[chat_id] = self._waiting.get(chat_id, 0) + 1
+        try:
+            async with lock:
+                await self._process(update, coroutine)
+        finally:
+            self._waiting[chat_id] -= 1
+            if not self._waiting[chat_id]:
+                del self._waiting[chat_id]
+                del self._locks[chat_id]
+
+    async def _process(self, update, coroutine) -> None:
+        async with self._semaphore:
+            await self.do_process_update(update, coroutine)
+
+    async def do_process_update(self, update, coroutine) -> None:
+        await self._run(coroutine)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
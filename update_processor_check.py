@@ -0,0 +1,93 @@
+"""
+Check of PerChatUpdateProcessor's scheduling (update_processor.py).
+
+    python update_processor_check.py
+
+Feeds the processor the way Application does (one task per update, in
+arrival order) and checks that:
+
+  * a chat with more queued slow updates than there are slots does not
+    hold every slot while it waits for its own turn: another chat's
+    instant update finishes within one slow update's time;
+  * the updates of one chat still run one at a time, in arrival order.
+
+Exits 1 and says what went wrong otherwise.
+"""
+import asyncio
+import datetime
+import sys
+import time
+
+from telegram import Chat, Message, Update
+
+from update_processor import PerChatUpdateProcessor
+
+
+SLOTS = 4
+SLOW_UPDATES = 8
+SLOW_SECONDS = 0.125
+
+
+def _update(update_id: int, chat_id: int) -> Update:
+    message = Message(
+        message_id=update_id,
+        date=datetime.datetime.now(datetime.timezone.utc),
+        chat=Chat(chat_id, Chat.PRIVATE),
+        text="x",
+    )
+    return Update(update_id, message=message)
+
+
+async def run() -> list[str]:
+    processor = PerChatUpdateProcessor(SLOTS)
+    order: list[int] = []
+    running = 0
+    overlap = False
+
+    async def slow(n: int):
+        nonlocal running, overlap
+        running += 1
+        overlap |= running > 1
+        await asyncio.sleep(SLOW_SECONDS)
+        order.append(n)
+        running -= 1
+
+    async def instant():
+        pass
+
+    start = time.perf_counter()
+    tasks = [
+        asyncio.create_task(processor.process_update(_update(n, 1), slow(n)))
+        for n in range(SLOW_UPDATES)
+    ]
+    await asyncio.sleep(0)  # let chat 1's updates queue up first
+    await processor.process_update(_update(100, 2), instant())
+    other_chat = time.perf_counter() - start
+    await asyncio.gather(*tasks)
+
+    problems = []
+    if other_chat > SLOW_SECONDS * 1.5:
+        problems.append(
+            f"chat 2 waited {other_chat:.3f} s behind chat 1 "
+            f"(one slow update takes {SLOW_SECONDS} s)"
+        )
+    if overlap:
+        problems.append("updates of chat 1 ran concurrently")
+    if order != list(range(SLOW_UPDATES)):
+        problems.append(f"chat 1 ran out of order: {order}")
+    return problems
+
+
+def main():
+    problems = asyncio.run(run())
+    for problem in problems:
+        print(problem)
+    if problems:
+        print("FAIL")
+        return 1
+    print(f"OK: another chat is not blocked by {SLOW_UPDATES} queued updates on {SLOTS} slots")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,6 @@
 #!/bin/bash
-echo "Starting bot with auto-restart on .py changes..."
+echo "Starting bot with hot reload on .py changes..."
 
-watchmedo auto-restart \
-  --directory=/app \
-  --pattern="*.py" \
-  --recursive \
-  -- python -u bot.py   # replace with your main file
+# run_bot.py keeps bot.py running; code changes are reloaded in-process
+# (hot_reload.py) and only fall back to a full restart when needed
+cd /app && exec python -u run_bot.py
@@ -0,0 +1,65 @@
+import hmac
+import json
+import logging
+
+from telegram import Update
+
+from mini_http import HttpServer, Request, Response
+
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookServer:
+    """
+    Receives Telegram webhook POSTs and puts the updates on the
+    Application's update_queue; the Application's update processor decides
+    how they run. Also answers GET /healthz; /metrics is not served here,
+    the listener is public (bot.py serves it on METRICS_PORT).
+    """
+
+    def __init__(
+        self,
+        app,
+        host: str,
+        port: int,
+        url_path: str,
+        secret_token: str | None = None,
+    ):
+        self.app = app
+        self.url_path = "/" + url_path.strip("/")
+        self.secret_token = secret_token
+        self.http = HttpServer(self.handle, host, port)
+
+    @property
+    def port(self) -> int:
+        return self.http.port
+
+    async def start(self) -> None:
+        await self.http.start()
+        logger.info("Webhook listening on %s:%s%s", self.http.host, self.port, self.url_path)
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Stop accepting updates; requests already received are still queued."""
+        await self.http.stop(timeout)
+
+    async def handle(self, request: Request) -> Response:
+        if request.path == "/healthz":
+            return Response(200, b"ok")
+        if request.path != self.url_path:
+            return Response(404, b"not found")
+        if request.method != "POST":
+            return Response(405, b"method not allowed")
+        if self.secret_token and not hmac.compare_digest(
+            request.headers.get("x-telegram-bot-api-secret-token", ""),
+            self.secret_token,
+        ):
+            return Response(403, b"forbidden")
+
+        try:
+            update = Update.de_json(json.loads(request.body), self.app.bot)
+        except (ValueError, TypeError, KeyError):
+            logger.warning("Dropping malformed webhook body")
+            return Response(400, b"bad update")
+        await self.app.update_queue.put(update)
+        return Response(200, b"")
@@ -0,0 +1,139 @@
+"""
+Conformance check of the native XLSX writer (xlsx_writer.py).
+
+    python xlsx_conformance.py               # 500 synthetic products + edge cases
+    python xlsx_conformance.py --count 5000
+
+Builds the same rows with both backends of build_excel_from_sheet_dict,
+loads both files with openpyxl and compares every cell (value, formula,
+number format, font, fill, alignment, border) plus the sheet layout
+(sheet order, merged cells, freeze pane, autofilter, tab color, row
+heights, column widths). Exits 1 and lists the first differences if
+anything does not match.
+"""
+import argparse
+import io
+import math
+import random
+import sys
+
+from excel_builder import (
+    _row_from_data,
+    build_excel_from_sheet_dict,
+    calculate_fields,
+    choose_sheet_name,
+)
+from parser import parse_message
+from synthetic import product_block
+
+
+MAX_REPORTED = 20
+
+
+def sample_sheet_rows(count: int, seed: int = 0) -> dict:
+    """Synthetic products plus rows the writer has to escape or special-case."""
+    rng = random.Random(seed)
+    calcs = [
+        calculate_fields(parse_message(product_block(rng))) for _ in range(count)
+    ]
+    calcs += [
+        # XML special characters and surrounding whitespace
+        dict(calcs[0], brand='<A&B> "x"', address="  lead and trail "),
+        # a size without unit (Price / 100 unit header, plain formats)
+        dict(calcs[0], size_raw="12", size_ml=12.0),
+    ]
+    sheet_rows = {}
+    for calc in calcs:
+        sheet_rows.setdefault(choose_sheet_name(calc), []).append(_row_from_data(calc))
+    # a row without a Date sorts last
+    first = next(iter(sheet_rows.values()))
+    first.append(dict(first[0], Date=None))
+    return sheet_rows
+
+
+def _value(cell):
+    value = cell.value
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _style(cell) -> tuple:
+    font, fill, align, border = cell.font, cell.fill, cell.alignment, cell.border
+    return (
+        cell.number_format,
+        (font.b, font.sz, font.color.value if font.color is not None else None),
+        (fill.fill_type, fill.fgColor.rgb if fill.fill_type else None),
+        (align.horizontal, align.vertical, bool(align.wrap_text)),
+        tuple(getattr(border, side).style for side in ("left", "right", "top", "bottom")),
+    )
+
+
+def _width(ws, column: int):
+    for dim in ws.column_dimensions.values():
+        if dim.min and dim.max and dim.min <= column <= dim.max:
+            return dim.width
+    return None
+
+
+def _layout(ws) -> tuple:
+    return (
+        ws.max_row,
+        ws.max_column,
+        sorted(str(r) for r in ws.merged_cells.ranges),
+        ws.freeze_panes,
+        ws.auto_filter.ref,
+        ws.sheet_properties.tabColor.rgb if ws.sheet_properties.tabColor else None,
+        ws.row_dimensions[1].height,
+        ws.row_dimensions[2].height,
+        [_width(ws, c) for c in range(1, ws.max_column + 1)],
+    )
+
+
+def compare(sheet_rows: dict) -> list[str]:
+    """Differences between the two backends' workbooks, as messages."""
+    from openpyxl import load_workbook
+
+    expected = load_workbook(
+        io.BytesIO(build_excel_from_sheet_dict(sheet_rows, backend="openpyxl"))
+    )
+    actual = load_workbook(
+        io.BytesIO(build_excel_from_sheet_dict(sheet_rows, backend="native"))
+    )
+    if expected.sheetnames != actual.sheetnames:
+        return [f"sheets: {expected.sheetnames} != {actual.sheetnames}"]
+
+    diffs = []
+    for name in expected.sheetnames:
+        want, got = expected[name], actual[name]
+        if _layout(want) != _layout(got):
+            diffs.append(f"{name}: layout {_layout(want)} != {_layout(got)}")
+        for want_row, got_row in zip(want.iter_rows(), got.iter_rows()):
+            for a, b in zip(want_row, got_row):
+                if _value(a) != _value(b):
+                    diffs.append(f"{name}!{a.coordinate}: {_value(a)!r} != {_value(b)!r}")
+                elif _value(a) is not None and _style(a) != _style(b):
+                    diffs.append(f"{name}!{a.coordinate}: style {_style(a)} != {_style(b)}")
+    return diffs
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Native XLSX writer conformance check")
+    ap.add_argument("--count", type=int, default=500, help="synthetic products")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    sheet_rows = sample_sheet_rows(args.count, args.seed)
+    diffs = compare(sheet_rows)
+    rows = sum(len(r) for r in sheet_rows.values())
+    if diffs:
+        for diff in diffs[:MAX_REPORTED]:
+            print(diff)
+        print(f"FAIL: {len(diffs)} difference(s) in {rows} rows")
+        return 1
+    print(f"OK: {rows} rows in {len(sheet_rows)} sheets match")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,410 @@
+"""
+Streaming XLSX writer for the product workbook (XLSX_BACKEND=native).
+
+Writes the same layout as the openpyxl path of build_excel_from_sheet_dict
+- section headers, styled header row, formulas with number formats,
+merged cells, freeze pane, autofilter - but emits each worksheet's XML
+row by row straight into a zipfile entry. Nothing is kept per cell, so
+the working memory does not grow with the number of rows (the output
+bytes aside), and no pandas / openpyxl import is needed.
+
+The styles are a fixed table built at import; every cell just refers to
+its style index. Strings are written inline, like openpyxl does, so no
+shared-string table has to be collected first. xlsx_conformance.py checks
+that openpyxl reads back the same values, formulas and formats as from
+the openpyxl backend.
+"""
+import datetime
+import math
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from excel_builder import (
+    HEADERS,
+    KHR_FORMAT,
+    PERCENT_FORMAT,
+    SHEET_COLORS,
+    USD_FORMAT,
+    size_is_gram,
+    size_is_ml,
+    sort_rows,
+)
+
+
+DEFAULT_SHEET_COLOR = "FF4F4F4F"
+# rows collected before each write into the zip stream
+CHUNK_ROWS = 256
+
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+_XML_DECL = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+# characters XML 1.0 cannot carry (openpyxl refuses them)
+_ILLEGAL_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_EPOCH = datetime.datetime(1899, 12, 30)
+
+_LAST_COL = "AA"  # column letter of HEADERS[-1]
+_SECTIONS = (
+    ("A", "J", "PRODUCT INFO"),
+    ("K", "R", "WHOLESALE BUY-IN"),
+    ("S", "W", "WHOLESALE SELL-OUT"),
+    ("X", "AA", "RETAIL"),
+)
+
+
+def _col_letter(index: int) -> str:
+    """1-based column index -> letter(s)."""
+    letters = ""
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+_COLS = [_col_letter(i) for i in range(1, len(HEADERS) + 1)]
+assert _COLS[-1] == _LAST_COL
+
+
+# ---- styles --------------------------------------------------------------
+
+# built-in number formats need no <numFmt> entry
+_BUILTIN_FORMATS = {"General": 0, "0": 1, "#,##0": 3, PERCENT_FORMAT: 10}
+_CUSTOM_FORMATS = (
+    "yyyy-mm-dd",
+    "yyyy-mm-dd h:mm:ss",
+    '#,##0" ml"',
+    '#,##0" g"',
+    '#,##0" L"',
+    '#,##0" kg"',
+    USD_FORMAT,
+    KHR_FORMAT,
+)
+_FORMAT_IDS = dict(_BUILTIN_FORMATS)
+_FORMAT_IDS.update({fmt: 164 + i for i, fmt in enumerate(_CUSTOM_FORMATS)})
+
+# fonts as openpyxl writes them for the Font(...) used by the openpyxl path
+_FONTS = (
+    '<font><name val="Calibri"/><family val="2"/><color theme="1"/><sz val="11"/>'
+    '<scheme val="minor"/></font>',
+    '<font><b val="1"/><color rgb="00FFFFFF"/><sz val="11"/></font>',
+    '<font><b val="1"/><color rgb="00FFFFFF"/><sz val="10"/></font>',
+    '<font><color rgb="FFED3F1C"/></font>',
+)
+FONT_DEFAULT, FONT_SECTION, FONT_HEADER, FONT_RED = range(len(_FONTS))
+
+_FILL_COLORS = ["FF404040"] + list(
+    dict.fromkeys([*SHEET_COLORS.values(), DEFAULT_SHEET_COLOR])
+)
+# fills 0 and 1 are reserved (none, gray125)
+_FILL_IDS = {color: i + 2 for i, color in enumerate(_FILL_COLORS)}
+
+_ALIGN_SECTION = '<alignment horizontal="center" vertical="center"/>'
+_ALIGN_HEADER = '<alignment horizontal="center" vertical="center" wrapText="1"/>'
+_ALIGN_DATA = '<alignment horizontal="right" vertical="center"/>'
+
+_XFS = ['<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>']
+
+
+def _xf(fmt: str = "General", font: int = FONT_DEFAULT, fill: int = 0,
+        border: int = 1, alignment: str = _ALIGN_DATA) -> int:
+    _XFS.append(
+        f'<xf numFmtId="{_FORMAT_IDS[fmt]}" fontId="{font}" fillId="{fill}" '
+        f'borderId="{border}" xfId="0" applyNumberFormat="1" applyFont="1" '
+        f'applyFill="1" applyBorder="1" applyAlignment="1">{alignment}</xf>'
+    )
+    return len(_XFS) - 1
+
+
+_SECTION_XF = {
+    color: _xf(font=FONT_SECTION, fill=fill, border=0, alignment=_ALIGN_SECTION)
+    for color, fill in _FILL_IDS.items()
+}
+_HEADER_XF = _xf(
+    font=FONT_HEADER, fill=_FILL_IDS["FF404040"], alignment=_ALIGN_HEADER
+)
+XF_GENERAL = _xf()
+XF_DATE = _xf("yyyy-mm-dd")
+XF_DATETIME = _xf("yyyy-mm-dd h:mm:ss")
+XF_ID = _xf("0")
+XF_NUMBER = _xf("#,##0")
+XF_ML = _xf('#,##0" ml"')
+XF_G = _xf('#,##0" g"')
+XF_LITRE = _xf('#,##0" L"')
+XF_KG = _xf('#,##0" kg"')
+XF_USD = _xf(USD_FORMAT)
+XF_USD_RED = _xf(USD_FORMAT, font=FONT_RED)
+XF_PERCENT = _xf(PERCENT_FORMAT)
+XF_KHR = _xf(KHR_FORMAT)
+
+
+def _styles_xml() -> str:
+    num_fmts = "".join(
+        f'<numFmt numFmtId="{_FORMAT_IDS[fmt]}" formatCode="{escape(fmt, {chr(34): "&quot;"})}"/>'
+        for fmt in _CUSTOM_FORMATS
+    )
+    fills = '<fill><patternFill/></fill><fill><patternFill patternType="gray125"/></fill>'
+    fills += "".join(
+        f'<fill><patternFill patternType="solid"><fgColor rgb="{c}"/>'
+        f'<bgColor rgb="{c}"/></patternFill></fill>'
+        for c in _FILL_COLORS
+    )
+    thin = "".join(
+        f'<{side} style="thin"><color rgb="FF000000"/></{side}>'
+        for side in ("left", "right", "top", "bottom")
+    )
+    borders = (
+        "<border><left/><right/><top/><bottom/><diagonal/></border>"
+        f"<border>{thin}<diagonal/></border>"
+    )
+    return (
+        f'{_XML_DECL}<styleSheet xmlns="{_MAIN_NS}">'
+        f'<numFmts count="{len(_CUSTOM_FORMATS)}">{num_fmts}</numFmts>'
+        f'<fonts count="{len(_FONTS)}">{"".join(_FONTS)}</fonts>'
+        f'<fills count="{len(_FILL_COLORS) + 2}">{fills}</fills>'
+        f'<borders count="2">{borders}</borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/>'
+        "</cellStyleXfs>"
+        f'<cellXfs count="{len(_XFS)}">{"".join(_XFS)}</cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/>'
+        "</cellStyles></styleSheet>"
+    )
+
+
+_STYLES_XML = _styles_xml()
+
+
+# ---- cells ---------------------------------------------------------------
+
+def _number(value) -> str:
+    # same text as openpyxl, so both backends read back identical values
+    return "%.16g" % value
+
+
+def _text(value: str) -> str:
+    value = escape(_ILLEGAL_XML.sub("", value))
+    if value != value.strip():
+        return f'<t xml:space="preserve">{value}</t>'
+    return f"<t>{value}</t>"
+
+
+def _cell(ref: str, style: int, value) -> str:
+    """A value cell; dates become serial numbers, None an empty styled cell."""
+    if value is None or value == "":
+        return f'<c r="{ref}" s="{style}"/>'
+    if isinstance(value, bool):
+        return f'<c r="{ref}" s="{style}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        if math.isnan(value) or math.isinf(value):
+            return f'<c r="{ref}" s="{style}"/>'
+        return f'<c r="{ref}" s="{style}"><v>{_number(value)}</v></c>'
+    if isinstance(value, datetime.datetime):
+        serial = (value - _EPOCH).total_seconds() / 86400
+        return f'<c r="{ref}" s="{XF_DATETIME}"><v>{_number(serial)}</v></c>'
+    if isinstance(value, datetime.date):
+        serial = (value - _EPOCH.date()).days
+        return f'<c r="{ref}" s="{XF_DATE}"><v>{serial}</v></c>'
+    return f'<c r="{ref}" s="{style}" t="inlineStr"><is>{_text(str(value))}</is></c>'
+
+
+def _formula(ref: str, style: int, formula: str) -> str:
+    return f'<c r="{ref}" s="{style}"><f>{escape(formula)}</f></c>'
+
+
+def _weight_formula(r: int, per_1000: bool) -> str:
+    # Size = H, Packs = I; whole units, .6 and up round up
+    total = f"(H{r}*I{r})/1000" if per_1000 else f"H{r}*I{r}"
+    scaled = f"{total}*10" if per_1000 else f"H{r}*I{r}*10"
+    return (
+        f"IF(H{r}=0,0,IF(MOD(ROUND({scaled},0),10)>=6,"
+        f"ROUNDUP({total},0),ROUNDDOWN({total},0)))"
+    )
+
+
+def _row_xml(r: int, row: dict) -> str:
+    ml = size_is_ml(row)
+    gram = size_is_gram(row)
+    if ml:
+        size_xf, weight_xf = XF_ML, XF_LITRE
+    elif gram:
+        size_xf, weight_xf = XF_G, XF_KG
+    else:
+        size_xf, weight_xf = XF_NUMBER, XF_NUMBER
+
+    buy_in = row.get("Buy-in")
+    cells = (
+        _cell(f"A{r}", XF_GENERAL, row.get("Date")),
+        _cell(f"B{r}", XF_ID, r - 2),
+        _cell(f"C{r}", XF_GENERAL, row.get("Address")),
+        _cell(f"D{r}", XF_GENERAL, row.get("Category")),
+        _cell(f"E{r}", XF_GENERAL, row.get("Sub-Category")),
+        _cell(f"F{r}", XF_GENERAL, row.get("Brand")),
+        _cell(f"G{r}", XF_GENERAL, row.get("Packaging")),
+        _cell(f"H{r}", size_xf, row.get("Size")),
+        _cell(f"I{r}", XF_GENERAL, row.get("Packs")),
+        _formula(f"J{r}", weight_xf, _weight_formula(r, ml or gram)),
+        _cell(f"K{r}", XF_USD_RED, None if buy_in is None else float(buy_in)),
+        _cell(f"L{r}", XF_GENERAL, row.get("Scheme(base)")),
+        _cell(f"M{r}", XF_GENERAL, row.get("FOC")),
+        _formula(f"N{r}", XF_PERCENT, f"IF((L{r}+M{r})=0,0,M{r}/(L{r}+M{r}))"),
+        _formula(f"O{r}", XF_USD, f"ROUND(N{r}*K{r},2)"),
+        _cell(f"P{r}", XF_PERCENT, row.get("Direct Disc.(%)")),
+        _formula(f"Q{r}", XF_USD, f"ROUND(P{r}*K{r},2)"),
+        _formula(f"R{r}", XF_USD_RED, f"ROUND(K{r}-(O{r}+Q{r}),2)"),
+        _formula(f"S{r}", XF_USD, f"IF((H{r}*I{r})=0,0,ROUND(R{r}/((H{r}*I{r})/100),2))"),
+        _cell(f"T{r}", XF_USD, row.get("Mark - up")),
+        _formula(f"U{r}", XF_USD, f"ROUND(R{r}+T{r},2)"),
+        _cell(f"V{r}", XF_KHR, row.get("Exchange Rate")),
+        _formula(f"W{r}", XF_KHR, f"ROUND(U{r}*V{r},0)"),
+        _cell(f"X{r}", XF_KHR, row.get("Price Unit (KHR)")),
+        _formula(f"Y{r}", XF_KHR, f"ROUND(X{r}-(W{r}/I{r}),0)"),
+        _formula(f"Z{r}", XF_KHR, f"ROUND(X{r}*I{r},0)"),
+        _formula(f"AA{r}", XF_KHR, f"ROUND(Z{r}-W{r},0)"),
+    )
+    return f'<row r="{r}">{"".join(cells)}</row>'
+
+
+# ---- parts ---------------------------------------------------------------
+
+def _price_header(row: dict) -> str:
+    if size_is_gram(row):
+        return "Price / 100g"
+    if size_is_ml(row):
+        return "Price / 100ml"
+    return "Price / 100 unit"
+
+
+def _write_sheet(stream, name: str, rows: list, selected: bool) -> None:
+    color = SHEET_COLORS.get(name, DEFAULT_SHEET_COLOR)
+    last = len(rows) + 2
+
+    headers = list(HEADERS)
+    # like the openpyxl path, the last row decides the price column header
+    headers[HEADERS.index("Price / 100 unit")] = _price_header(rows[-1])
+
+    section = _SECTION_XF[color]
+    tab_selected = ' tabSelected="1"' if selected else ""
+    row1 = "".join(
+        f'<c r="{start}1" s="{section}" t="inlineStr"><is><t>{label}</t></is></c>'
+        for start, _end, label in _SECTIONS
+    )
+    row2 = "".join(
+        f'<c r="{col}2" s="{_HEADER_XF}" t="inlineStr"><is>{_text(header)}</is></c>'
+        for col, header in zip(_COLS, headers)
+    )
+    stream.write(
+        (
+            f'{_XML_DECL}<worksheet xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}">'
+            f'<sheetPr><tabColor rgb="{color}"/><outlinePr summaryBelow="1" '
+            'summaryRight="1"/><pageSetUpPr/></sheetPr>'
+            f'<dimension ref="A1:{_LAST_COL}{last}"/>'
+            f'<sheetViews><sheetView{tab_selected} workbookViewId="0">'
+            '<pane xSplit="11" ySplit="2" topLeftCell="L3" activePane="bottomRight" '
+            'state="frozen"/><selection pane="topRight"/>'
+            '<selection pane="bottomLeft"/>'
+            '<selection pane="bottomRight" activeCell="L3" sqref="L3"/>'
+            "</sheetView></sheetViews>"
+            '<sheetFormatPr baseColWidth="8" defaultRowHeight="15"/>'
+            f'<cols><col min="1" max="{len(HEADERS)}" width="14" customWidth="1"/></cols>'
+            "<sheetData>"
+            f'<row r="1" ht="25" customHeight="1">{row1}</row>'
+            f'<row r="2" ht="30" customHeight="1">{row2}</row>'
+        ).encode()
+    )
+
+    chunk = []
+    for r, row in enumerate(rows, start=3):
+        chunk.append(_row_xml(r, row))
+        if len(chunk) >= CHUNK_ROWS:
+            stream.write("".join(chunk).encode())
+            chunk.clear()
+    merges = "".join(
+        f'<mergeCell ref="{start}1:{end}1"/>' for start, end, _label in _SECTIONS
+    )
+    chunk.append(
+        "</sheetData>"
+        f'<autoFilter ref="A2:{_LAST_COL}2"/>'
+        f'<mergeCells count="{len(_SECTIONS)}">{merges}</mergeCells>'
+        '<pageMargins left="0.75" right="0.75" top="1" bottom="1" header="0.5" '
+        'footer="0.5"/></worksheet>'
+    )
+    stream.write("".join(chunk).encode())
+
+
+def _quote_sheet(name: str) -> str:
+    return "'" + name.replace("'", "''") + "'"
+
+
+def write_workbook(sheet_rows: dict, fileobj) -> None:
+    """
+    Write the workbook for sheet_rows ({sheet name: [row dict, ...]}, rows
+    as made by _row_from_data) as .xlsx into the binary file object.
+    """
+    sheets = [(name, rows) for name, rows in sheet_rows.items() if rows]
+    if not sheets:
+        # same as openpyxl saving a workbook without sheets
+        raise IndexError("At least one sheet must be visible")
+
+    with zipfile.ZipFile(fileobj, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i, (name, rows) in enumerate(sheets, start=1):
+            with zf.open(f"xl/worksheets/sheet{i}.xml", "w") as stream:
+                _write_sheet(stream, name, sort_rows(rows), selected=i == 1)
+
+        attr = {'"': "&quot;"}
+        sheet_entries = "".join(
+            f'<sheet name="{escape(name, attr)}" sheetId="{i}" r:id="rId{i}"/>'
+            for i, (name, _rows) in enumerate(sheets, start=1)
+        )
+        filters = "".join(
+            f'<definedName name="_xlnm._FilterDatabase" localSheetId="{i}" hidden="1">'
+            f"{escape(_quote_sheet(name))}!$A$2:${_LAST_COL}$2</definedName>"
+            for i, (name, _rows) in enumerate(sheets)
+        )
+        zf.writestr(
+            "xl/workbook.xml",
+            f'{_XML_DECL}<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}">'
+            '<workbookPr/><bookViews><workbookView activeTab="0"/></bookViews>'
+            f"<sheets>{sheet_entries}</sheets>"
+            f"<definedNames>{filters}</definedNames>"
+            '<calcPr calcId="124519" fullCalcOnLoad="1"/></workbook>',
+        )
+
+        sheet_rels = "".join(
+            f'<Relationship Id="rId{i}" Type="{_REL_NS}/worksheet" '
+            f'Target="worksheets/sheet{i}.xml"/>'
+            for i in range(1, len(sheets) + 1)
+        )
+        zf.writestr(
+            "xl/_rels/workbook.xml.rels",
+            f'{_XML_DECL}<Relationships xmlns="{_PKG_REL_NS}">{sheet_rels}'
+            f'<Relationship Id="rId{len(sheets) + 1}" Type="{_REL_NS}/styles" '
+            'Target="styles.xml"/></Relationships>',
+        )
+        zf.writestr("xl/styles.xml", _STYLES_XML)
+        zf.writestr(
+            "_rels/.rels",
+            f'{_XML_DECL}<Relationships xmlns="{_PKG_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>',
+        )
+
+        sheet_types = "".join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType='
+            '"application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in range(1, len(sheets) + 1)
+        )
+        zf.writestr(
+            "[Content_Types].xml",
+            f'{_XML_DECL}<Types xmlns="{_CT_NS}">'
+            '<Default Extension="rels" '
+            'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" ContentType='
+            '"application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" ContentType='
+            '"application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f"{sheet_types}</Types>",
+        )